@@ -0,0 +1,94 @@
+"""
+Compare startup time and memory of the streaming loader (webapp/loaders.py),
+with plain dicts and with the typed records of webapp/models.py, against the
+former `json.load` loaders.
+
+Usage : python -m benchmarks.bench_loaders --sizes 1000 100000 500000
+
+Each measure runs in a fresh interpreter so that peak RSS is not polluted by
+a previous run.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOADERS = ('json_load', 'streaming', 'typed')
+
+
+def write_clubs(path, size):
+    with open(path, 'w', encoding='utf-8') as json_file:
+        json_file.write('{"clubs":[\n')
+        for i in range(size):
+            if i:
+                json_file.write(',\n')
+            json.dump({"name": f"Club {i}", "email": f"secretary{i}@club{i}.example.com", "points": str(i % 30)},
+                      json_file)
+        json_file.write('\n]}')
+
+
+def current_rss_kb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize() // 1024
+
+
+def load_module(name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT_DIR, 'webapp', f'{name}.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def child(loader, path):
+    loaders = load_module('loaders')
+    models = load_module('models')
+    rss_before = current_rss_kb()
+    start = time.perf_counter()
+    if loader == 'json_load':
+        with open(path) as json_file:
+            records = json.load(json_file)['clubs']
+    elif loader == 'streaming':
+        records = loaders.load_records(path, 'clubs')
+    else:
+        records = loaders.load_records(path, 'clubs', models.Club.from_record)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'seconds': elapsed, 'records': len(records),
+                      'peak_rss_kb': peak, 'peak_delta_kb': peak - rss_before,
+                      'retained_kb': current_rss_kb() - rss_before}))
+
+
+def measure(loader, path):
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_loaders', '--child', loader, path],
+                            cwd=ROOT_DIR, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000])
+    parser.add_argument('--child', nargs=2, metavar=('LOADER', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+    print(f"{'clubs':>10} {'loader':>10} {'seconds':>9} {'peak MB':>9} {'retained MB':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            path = os.path.join(directory, f'clubs_{size}.json')
+            write_clubs(path, size)
+            for loader in LOADERS:
+                result = measure(loader, path)
+                print(f"{size:>10} {loader:>10} {result['seconds']:>9.3f} "
+                      f"{result['peak_delta_kb'] / 1024:>9.1f} {result['retained_kb'] / 1024:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+In-process benchmark of every route of the app, driven through the Flask
+test client on synthetic datasets (see benchmarks/datasets.py), without a
+running server.
+
+Usage : python -m benchmarks.bench_routes --sizes 10 1000 100000 1000000
+                                          --output results.json
+                                          --baseline benchmarks/baseline.json
+
+For each dataset size (as many clubs as competitions) the app is loaded in a
+fresh interpreter, then each route is requested `--requests` times after a
+warm-up. Reported per route : latency percentiles (ms), throughput (requests
+per second) and the memory allocated per request (peak and retained, KB,
+measured by tracemalloc on a separate pass so that tracing does not slow the
+timed one down). Requests are drawn from a seeded random generator, so two
+runs send the same requests.
+
+With --baseline, each route is compared to the stored results : the ones
+whose p50 or p99 grew by more than --threshold are reported as regressions
+and the exit status is 1. --update-baseline stores the results as the new
+baseline. benchmarks/baseline.json holds a run of the sizes 10, 1000 and
+100000 ; latencies depend on the machine, so store a baseline on the
+machine that compares to it before relying on the ratios :
+
+    python -m benchmarks.bench_routes --sizes 10 1000 100000
+                                      --baseline benchmarks/baseline.json
+                                      --update-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.datasets import club_email, club_name, competition_name, is_past, write_dataset
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = (10, 1000, 100000, 1000000)
+PERCENTILES = (50, 90, 99)
+
+
+def route_requests(size, generator):
+    """
+    Request factories by route name : each call returns the (method, url,
+    keyword arguments) of the next request to send
+    """
+    def club():
+        return generator.randrange(size)
+
+    def competition():
+        while True:
+            i = generator.randrange(size)
+            if not is_past(i):
+                return i
+
+    return {
+        'index': lambda: ('GET', '/', {}),
+        'showSummary': lambda: ('POST', '/showSummary', {'data': {'email': club_email(club())}}),
+        'book': lambda: ('GET', f'/book/{competition_name(competition())}/{club_name(club())}', {}),
+        'purchasePlaces': lambda: ('POST', '/purchasePlaces', {'data': {
+            'club': club_name(club()), 'competition': competition_name(competition()), 'places': '1'}}),
+        'purchasePlacesBatch': lambda: ('POST', '/purchasePlacesBatch', {'data': {
+            'club': club_name(club()), 'competition': [competition_name(competition()) for _ in range(2)],
+            'places': ['1', '1']}}),
+        'displayPoints': lambda: ('GET', '/displayPoints', {}),
+        'displayPoints_deep': lambda: ('GET', f'/displayPoints?sort=name&offset={size // 2}', {}),
+        'logout': lambda: ('GET', '/logout', {}),
+        'api_club': lambda: ('GET', f'/api/clubs/{club_name(club())}', {}),
+        'api_competitions': lambda: ('GET', f'/api/competitions?offset={generator.randrange(size)}', {}),
+        'api_points': lambda: ('GET', '/api/points', {}),
+        'api_booking': lambda: ('POST', '/api/bookings', {'json': {
+            'club': club_name(club()), 'competition': competition_name(competition()), 'places': 1}}),
+        'api_booking_batch': lambda: ('POST', '/api/bookings/batch', {'json': {
+            'club': club_name(club()),
+            'bookings': [{'competition': competition_name(competition()), 'places': 1} for _ in range(2)]}}),
+    }
+
+
+def percentile(sorted_values, rank):
+    index = min(len(sorted_values) - 1, max(0, round(rank / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def bench_route(client, next_request, requests, warmup, allocation_requests):
+    for _ in range(warmup):
+        method, url, kwargs = next_request()
+        client.open(url, method=method, **kwargs)
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        method, url, kwargs = next_request()
+        start = time.perf_counter()
+        client.open(url, method=method, **kwargs)
+        latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+    peaks = []
+    retained = []
+    tracemalloc.start()
+    for _ in range(allocation_requests):
+        method, url, kwargs = next_request()
+        tracemalloc.clear_traces()
+        client.open(url, method=method, **kwargs)
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak)
+        retained.append(current)
+    tracemalloc.stop()
+    latencies.sort()
+    result = {f'p{rank}_ms': percentile(latencies, rank) * 1000 for rank in PERCENTILES}
+    result.update({
+        'max_ms': latencies[-1] * 1000,
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'requests_per_second': requests / elapsed,
+        'alloc_peak_kb': sum(peaks) / len(peaks) / 1024,
+        'alloc_retained_kb': sum(retained) / len(retained) / 1024,
+    })
+    return result
+
+
+def child(size, clubs_path, competitions_path, requests, warmup, allocation_requests, seed):
+    os.environ['GUDLFT_CLUBS_FILE'] = clubs_path
+    os.environ['GUDLFT_COMPETITIONS_FILE'] = competitions_path
+    start = time.perf_counter()
+    from webapp import app
+    load_seconds = time.perf_counter() - start
+    client = app.test_client()
+    results = {}
+    for route, next_request in route_requests(size, random.Random(seed)).items():
+        results[route] = bench_route(client, next_request, requests, warmup, allocation_requests)
+    print(json.dumps({'load_seconds': load_seconds, 'routes': results}))
+
+
+def measure(size, directory, args):
+    clubs_path, competitions_path = write_dataset(directory, size, size, seed=args.seed)
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_routes', '--child', str(size),
+                             clubs_path, competitions_path, '--requests', str(args.requests),
+                             '--warmup', str(args.warmup), '--allocation-requests', str(args.allocation_requests),
+                             '--seed', str(args.seed)],
+                            cwd=ROOT_DIR, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the ratios to the baseline, returns the regressions
+    """
+    regressions = []
+    print(f"\n{'size':>8} {'route':>20} {'p50 ratio':>10} {'p99 ratio':>10}")
+    for size, measures in results['sizes'].items():
+        for route, result in measures['routes'].items():
+            reference = baseline.get('sizes', {}).get(size, {}).get('routes', {}).get(route)
+            if reference is None:
+                continue
+            ratios = [result[key] / reference[key] if reference[key] else 1.0 for key in ('p50_ms', 'p99_ms')]
+            regressed = any(ratio > threshold for ratio in ratios)
+            if regressed:
+                regressions.append((size, route))
+            print(f"{size:>8} {route:>20} {ratios[0]:>10.2f} {ratios[1]:>10.2f}"
+                  f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--allocation-requests', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="JSON file to save the results to")
+    parser.add_argument('--baseline', help="JSON results to compare to")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="p50 or p99 ratio to the baseline above which a route regressed")
+    parser.add_argument('--update-baseline', action='store_true', help="store the results as the baseline")
+    parser.add_argument('--child', nargs=3, metavar=('SIZE', 'CLUBS', 'COMPETITIONS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.baseline and not args.update_baseline and not os.path.exists(args.baseline):
+        parser.error(f"no baseline {args.baseline}, store one first with --update-baseline")
+    if args.child:
+        size, clubs_path, competitions_path = args.child
+        child(int(size), clubs_path, competitions_path, args.requests, args.warmup, args.allocation_requests,
+              args.seed)
+        return
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'requests': args.requests,
+        'seed': args.seed,
+        'sizes': {},
+    }
+    print(f"{'size':>8} {'route':>20} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'req/s':>9} "
+          f"{'peak KB':>9} {'kept KB':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            measures = measure(size, directory, args)
+        results['sizes'][str(size)] = measures
+        for route, result in measures['routes'].items():
+            print(f"{size:>8} {route:>20} {result['p50_ms']:>8.2f} {result['p90_ms']:>8.2f} "
+                  f"{result['p99_ms']:>8.2f} {result['requests_per_second']:>9.0f} "
+                  f"{result['alloc_peak_kb']:>9.1f} {result['alloc_retained_kb']:>8.1f}")
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+    regressions = []
+    if args.baseline and not args.update_baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above x{args.threshold}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Synthetic clubs.json / competitions.json files of any size, in the format of
+the files of webapp/.
+
+Numbered records (the benchmarks) : club i is "Club 0000042" with the email
+"secretary42@club42.example.com", competition i is "Competition 0000042".
+Every tenth competition (i % 10 == 9) took place in the past, the others are
+spread over the ten years from 2030 on.
+
+Realistic records (the load tests) : club names made of words and cities
+("Iron Temple Lyon") with matching emails, few points for most clubs and a
+lot for a few, competitions held mostly on week-ends at usual hours.
+
+Points, places and dates are drawn from a seeded random generator, so the
+same arguments always give the same files.
+"""
+import json
+import os
+import random
+import re
+from datetime import datetime, timedelta
+
+
+FUTURE_START = datetime(2030, 1, 1, 10, 0, 0)
+PAST_START = datetime(2015, 1, 1, 10, 0, 0)
+DATE_SPREAD_HOURS = 10 * 365 * 24
+
+
+def club_name(i):
+    return f"Club {i:07d}"
+
+
+def club_email(i):
+    return f"secretary{i}@club{i}.example.com"
+
+
+def competition_name(i):
+    return f"Competition {i:07d}"
+
+
+def is_past(i):
+    return i % 10 == 9
+
+
+def club_record(i, generator, points=(100, 1000)):
+    return {"name": club_name(i), "email": club_email(i), "points": str(generator.randrange(*points))}
+
+
+def competition_record(i, generator, places=(100, 1000)):
+    start = PAST_START if is_past(i) else FUTURE_START
+    date = start + timedelta(hours=generator.randrange(DATE_SPREAD_HOURS))
+    return {"name": competition_name(i), "date": date.strftime('%Y-%m-%d %H:%M:%S'),
+            "numberOfPlaces": str(generator.randrange(*places))}
+
+
+ADJECTIVES = ('Iron', 'Simply', 'Heavy', 'Golden', 'Mighty', 'Steel', 'Power', 'Strong', 'Titan', 'Atlas',
+              'Spartan', 'Olympic', 'Bold', 'Northern', 'Southern', 'Urban', 'Royal', 'Rising', 'Prime', 'Raw')
+NOUNS = ('Temple', 'Lift', 'Lifts', 'Barbell', 'Club', 'Gym', 'Strength', 'Forge', 'Warriors', 'Factory',
+         'Athletics', 'Academy', 'Plates', 'Kettlebell', 'Crew', 'Society', 'Union', 'House', 'Garage', 'Den')
+CITIES = ('Paris', 'Lyon', 'Marseille', 'Lille', 'Nantes', 'Bordeaux', 'Toulouse', 'Nice', 'Rennes', 'Brest',
+          'Dijon', 'Metz', 'Reims', 'Tours', 'Angers', 'Caen', 'Rouen', 'Nancy', 'Grenoble', 'Limoges')
+TLDS = ('com', 'co', 'fr', 'co.uk', 'org', 'net')
+EVENTS = ('Festival', 'Classic', 'Open', 'Cup', 'Challenge', 'Championship', 'Meet', 'Trophy', 'Games', 'Series')
+SEASONS = ('Spring', 'Summer', 'Fall', 'Winter', 'National', 'Regional', 'Masters', 'Junior', 'Open', 'Grand')
+HOURS = ((9, 0), (10, 0), (13, 30), (14, 0), (18, 0))
+
+
+def realistic_club_name(i):
+    """
+    Unique name of club i : every combination of adjective, noun and city
+    once, then the same again with a number
+    """
+    combinations = len(ADJECTIVES) * len(NOUNS) * len(CITIES)
+    rest, number = i % combinations, i // combinations
+    rest, adjective = divmod(rest, len(ADJECTIVES))
+    city, noun = divmod(rest, len(NOUNS))
+    name = f"{ADJECTIVES[adjective]} {NOUNS[noun]} {CITIES[city]}"
+    return f"{name} {number + 1}" if number else name
+
+
+def realistic_club_record(i, generator, max_points=60):
+    name = realistic_club_name(i)
+    slug = re.sub(r'[^a-z0-9]+', '', name.lower())
+    mailbox = generator.choice(('admin', 'contact', 'secretary', 'info'))
+    # most clubs have a few points, a few clubs have a lot of them
+    points = min(int(generator.paretovariate(1.2) * 3), max_points)
+    return {"name": name, "email": f"{mailbox}@{slug}.{generator.choice(TLDS)}", "points": str(points)}
+
+
+def realistic_competition_record(i, generator, start, past_ratio=0.1, days=730):
+    event = f"{SEASONS[generator.randrange(len(SEASONS))]} {EVENTS[generator.randrange(len(EVENTS))]}"
+    day = start + timedelta(days=generator.randrange(days))
+    if generator.random() < past_ratio:
+        day -= timedelta(days=days)
+    if generator.random() < 0.8:
+        # move to the next week-end
+        day += timedelta(days=(5 - day.weekday()) % 7 + generator.randrange(2))
+    hour, minute = generator.choice(HOURS)
+    date = day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    places = max(5, min(int(generator.lognormvariate(3, 0.6)), 200))
+    return {"name": f"{event} {date.year} {i}", "date": date.strftime('%Y-%m-%d %H:%M:%S'),
+            "numberOfPlaces": str(places)}
+
+
+def write_records(path, key, records):
+    """
+    Write {"key": [records]} one record per line, without building the list
+    """
+    with open(path, 'w', encoding='utf-8') as json_file:
+        json_file.write(f'{{"{key}": [\n')
+        for i, record in enumerate(records):
+            if i:
+                json_file.write(',\n')
+            json_file.write(json.dumps(record))
+        json_file.write('\n]}\n')
+
+
+def write_dataset(directory, clubs, competitions, seed=0, points=(100, 1000), places=(100, 1000)):
+    """
+    Write clubs.json and competitions.json in `directory`, returns their paths
+    """
+    generator = random.Random(seed)
+    clubs_path = os.path.join(directory, 'clubs.json')
+    competitions_path = os.path.join(directory, 'competitions.json')
+    write_records(clubs_path, 'clubs', (club_record(i, generator, points) for i in range(clubs)))
+    write_records(competitions_path, 'competitions',
+                  (competition_record(i, generator, places) for i in range(competitions)))
+    return clubs_path, competitions_path
+
+
+def write_realistic_dataset(directory, clubs, competitions, seed=0, start=None, past_ratio=0.1, max_points=60):
+    """
+    Write realistic clubs.json and competitions.json in `directory`, the
+    competitions being held in the two years from `start` (today by
+    default). Returns their paths.
+    """
+    generator = random.Random(seed)
+    start = start or datetime.now()
+    clubs_path = os.path.join(directory, 'clubs.json')
+    competitions_path = os.path.join(directory, 'competitions.json')
+    write_records(clubs_path, 'clubs', (realistic_club_record(i, generator, max_points) for i in range(clubs)))
+    write_records(competitions_path, 'competitions',
+                  (realistic_competition_record(i, generator, start, past_ratio) for i in range(competitions)))
+    return clubs_path, competitions_path
@@ -0,0 +1,38 @@
+"""
+Write realistic clubs.json and competitions.json files of any size (see
+benchmarks/datasets.py), to load-test the app at scale.
+
+Usage : python -m benchmarks.generate_dataset --clubs 100000 --competitions 5000 --output data
+
+Then serve them and load-test with the same files :
+
+    GUDLFT_CLUBS_FILE=data/clubs.json GUDLFT_COMPETITIONS_FILE=data/competitions.json python run.py
+    GUDLFT_CLUBS_FILE=data/clubs.json GUDLFT_COMPETITIONS_FILE=data/competitions.json locust ClubSecretary
+"""
+import argparse
+import os
+from datetime import datetime
+
+from benchmarks.datasets import write_realistic_dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clubs', type=int, default=10000)
+    parser.add_argument('--competitions', type=int, default=1000)
+    parser.add_argument('--output', default='.', help="directory of the files")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--start', type=datetime.fromisoformat, default=None,
+                        help="first day of the competitions (today by default)")
+    parser.add_argument('--past-ratio', type=float, default=0.1, help="share of past competitions")
+    parser.add_argument('--max-points', type=int, default=60)
+    args = parser.parse_args()
+    os.makedirs(args.output, exist_ok=True)
+    paths = write_realistic_dataset(args.output, args.clubs, args.competitions, seed=args.seed, start=args.start,
+                                    past_ratio=args.past_ratio, max_points=args.max_points)
+    for path in paths:
+        print(f"{path} : {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
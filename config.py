@@ -10,6 +10,109 @@ SECRET_KEY = "&,s]Qo&B`}G4;e'L],1tY?28"
 
 MAX_BOOKING_PLACES = 12
 
+# Data files, loaded in memory or imported into the SQLite storage
+CLUBS_FILE = os.environ.get('GUDLFT_CLUBS_FILE', os.path.join(BASE_DIR, 'webapp', 'clubs.json'))
+COMPETITIONS_FILE = os.environ.get('GUDLFT_COMPETITIONS_FILE', os.path.join(BASE_DIR, 'webapp', 'competitions.json'))
+
+# Storage of clubs and competitions : 'json' keeps the files in memory,
+# 'sqlite' queries the STORAGE_DB database (imported from the files when
+# empty, or with `flask import-json`). The SQLite storage is durable and
+# shared by the worker processes, BOOKING_JOURNAL and SHARED_STATE_DB are
+# then ignored.
+STORAGE = os.environ.get('GUDLFT_STORAGE', 'json')
+STORAGE_DB = os.environ.get('GUDLFT_STORAGE_DB', os.path.join(BASE_DIR, 'gudlft.db'))
+
+# Append-only booking journal replayed at startup on top of the JSON files.
+# Set a file path (e.g. os.path.join(BASE_DIR, 'bookings.journal')) to keep
+# bookings across restarts, None keeps them in memory only. A journal belongs
+# to a single process : it is ignored with SHARED_STATE_DB, whose database
+# keeps the bookings of all the workers.
+BOOKING_JOURNAL = os.environ.get('GUDLFT_BOOKING_JOURNAL')
+# Number of journaled bookings after which the journal is folded into a snapshot
+BOOKING_JOURNAL_COMPACT_EVERY = 1000
+
+# Ledger of the bookings, which bounds the places a club books in a
+# competition to MAX_BOOKING_PLACES over all its bookings and lists the
+# places each club booked. The last BOOKING_LEDGER_KEEP entries are kept in
+# memory, the older ones are appended to the BOOKING_LEDGER file (e.g.
+# os.path.join(BASE_DIR, 'bookings.ledger')), with the rest when the server
+# stops, and read back at startup ; they are dropped when it is None (the
+# totals are kept). The totals are made durable with each booking by the
+# BOOKING_JOURNAL. With SHARED_STATE_DB and the SQLite storage they are kept
+# in the database, written in the transaction of each booking and shared by
+# the worker processes, and the file is ignored.
+BOOKING_LEDGER = os.environ.get('GUDLFT_BOOKING_LEDGER')
+BOOKING_LEDGER_KEEP = 10000
+
+# SQLite database (WAL mode) holding the points and places shared by several
+# worker processes of a preforking server, e.g.
+# `GUDLFT_SHARED_STATE_DB=shared_state.db gunicorn -w 4 webapp:app`. None for a
+# single process. With the LIVE_FEED, besides the pull before each request,
+# each worker pulls the bookings of the others every
+# SHARED_STATE_PULL_INTERVAL seconds to push them to its feed (0 : before the
+# requests only).
+SHARED_STATE_DB = os.environ.get('GUDLFT_SHARED_STATE_DB')
+SHARED_STATE_PULL_INTERVAL = 1.0
+
+# Connection pool of the SQLite storage and shared state : at most
+# DB_POOL_SIZE connections, each caching DB_CACHED_STATEMENTS prepared
+# statements. See /api/pool for its statistics.
+DB_POOL_SIZE = 8
+DB_CACHED_STATEMENTS = 128
+
+# Serve with gevent (`python run.py --async`) : one greenlet per connection
+# instead of one thread, and the journal fsync runs in the gevent threadpool.
+GEVENT = os.environ.get('GUDLFT_GEVENT') == '1'
+GEVENT_MAX_CONNECTIONS = 10000
+
+# Opt-in profiling : fraction of the requests whose call stacks are traced
+# (0 disables it). The collapsed stacks are downloaded from /admin/profile,
+# or `flask profile` profiles requests in process.
+PROFILE_SAMPLE_RATE = float(os.environ.get('GUDLFT_PROFILE_SAMPLE_RATE', '0'))
+
+# Token expected in the X-Admin-Token header by the /admin routes, which are
+# refused while it is not set
+ADMIN_TOKEN = os.environ.get('GUDLFT_ADMIN_TOKEN')
+
+# Hot reload of CLUBS_FILE and COMPETITIONS_FILE : POST /admin/reload applies
+# what changed in the files since they were last read, and so does a watcher
+# every RELOAD_INTERVAL seconds when they were written (0 : on demand only).
+# Off by default, the reloader keeps the records of the files to diff them.
+RELOAD = os.environ.get('GUDLFT_RELOAD') == '1'
+RELOAD_INTERVAL = float(os.environ.get('GUDLFT_RELOAD_INTERVAL', '0'))
+
+# Directory of the compiled templates, shared by the workers so that a new
+# worker loads them instead of compiling them (fill it at build time with
+# `flask compile-templates`). None to compile in memory only.
+TEMPLATE_CACHE_DIR = os.environ.get('GUDLFT_TEMPLATE_CACHE_DIR', os.path.join(BASE_DIR, '.jinja_cache'))
+
+# Fingerprinted and precompressed copies of the static files, built with
+# `flask build-assets` and served with a one-year immutable Cache-Control.
+# Static files are served as they are while it holds no manifest.
+ASSETS_DIR = os.environ.get('GUDLFT_ASSETS_DIR', os.path.join(BASE_DIR, 'webapp', 'static', 'dist'))
+
+# Live feed (/events) of the points and places changed by the bookings, off
+# by default : number of events kept for the clients that reconnect, and
+# seconds between two keep-alive comments of an idle stream. Each open page
+# holds a stream, and so a connection, for as long as it stays open : serve
+# it with gevent (`python run.py --async`, `gunicorn -k gevent`) or threads
+# (`gunicorn -k gthread --threads 100`), never with sync workers, which it
+# would pin one per page.
+LIVE_FEED = os.environ.get('GUDLFT_LIVE_FEED') == '1'
+LIVE_FEED_HISTORY = 1000
+LIVE_FEED_KEEPALIVE = 15
+
+# Pagination of the points table and of the competitions list
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Number of rendered pages kept in memory (keyed by state version)
+PAGE_CACHE_SIZE = 128
+
+# Number of rendered competition rows of the welcome page kept in memory
+# (keyed by competition, its places and date, and club)
+FRAGMENT_CACHE_SIZE = 10000
+
 ENV = 'test'
 DEBUG =  False
 TESTING = True
@@ -1,5 +1,11 @@
 
-from locust import HttpUser, between, task
+import itertools
+import json
+import os
+import random
+from datetime import datetime
+
+from locust import HttpUser, SequentialTaskSet, between, events, task
 
 # from webapp import server
 
@@ -34,4 +40,89 @@ class SoftDeskPerf(HttpUser):
 
     @task
     def perf_logout(self):
-        self.client.get("/logout")
\ No newline at end of file
+        self.client.get("/logout")
+
+
+CLUBS_FILE = os.environ.get('GUDLFT_CLUBS_FILE', os.path.join(os.path.dirname(__file__), 'webapp', 'clubs.json'))
+COMPETITIONS_FILE = os.environ.get('GUDLFT_COMPETITIONS_FILE',
+                                   os.path.join(os.path.dirname(__file__), 'webapp', 'competitions.json'))
+# exponent of the Zipf law of popularity : the club (or competition) of rank
+# k is picked with a weight 1 / k ** s
+ZIPF_S = float(os.environ.get('GUDLFT_ZIPF_S', '1.1'))
+
+
+class ZipfPicker:
+    """
+    Picks items with a Zipf popularity : the order of the items is shuffled
+    once (seeded) and the item of rank k is weighted 1 / k ** s, so that a
+    few clubs and competitions get most of the traffic, as in real life.
+    """
+
+    def __init__(self, items, s=ZIPF_S, seed=0):
+        self.items = list(items)
+        random.Random(seed).shuffle(self.items)
+        self.cum_weights = list(itertools.accumulate(1 / rank ** s for rank in range(1, len(self.items) + 1)))
+
+    def pick(self):
+        return random.choices(self.items, cum_weights=self.cum_weights)[0]
+
+
+def load_pickers():
+    with open(CLUBS_FILE) as clubs_file:
+        clubs = [(club['name'], club['email']) for club in json.load(clubs_file)['clubs']]
+    with open(COMPETITIONS_FILE) as competitions_file:
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        # only the competitions still open for booking
+        competitions = [competition['name'] for competition in json.load(competitions_file)['competitions']
+                        if competition['date'] >= now and int(competition['numberOfPlaces']) > 0]
+    return ZipfPicker(clubs), ZipfPicker(competitions or ["Spring Festival 2021"], seed=1)
+
+
+clubs_picker, competitions_picker = None, None
+
+
+@events.init.add_listener
+def on_locust_init(**kwargs):
+    global clubs_picker, competitions_picker
+    clubs_picker, competitions_picker = load_pickers()
+
+
+class BookingFlow(SequentialTaskSet):
+    """
+    A club secretary logs in, opens the booking page of a competition,
+    books a few places and logs out
+    """
+
+    def on_start(self):
+        self.club, self.email = clubs_picker.pick()
+        self.competition = competitions_picker.pick()
+
+    @task
+    def login(self):
+        self.client.post("/showSummary", data={"email": self.email}, name="/showSummary")
+
+    @task
+    def book(self):
+        self.client.get(f"/book/{self.competition}/{self.club}", name="/book/[competition]/[club]")
+
+    @task
+    def purchase(self):
+        places = str(random.choice((1, 1, 1, 2, 2, 3, 4, 6)))
+        self.client.post("/purchasePlaces", data={"competition": self.competition, "club": self.club,
+                                                  "places": places}, name="/purchasePlaces")
+
+    @task
+    def logout(self):
+        self.client.get("/logout", name="/logout")
+        # the next flow is another secretary on another competition
+        self.on_start()
+
+
+class ClubSecretary(HttpUser):
+    """
+    Booking flows on the clubs and competitions of CLUBS_FILE and
+    COMPETITIONS_FILE (e.g. written by benchmarks/generate_dataset.py),
+    picked with a Zipf popularity. Run it alone with `locust ClubSecretary`.
+    """
+    wait_time = between(0.5, 5.0)
+    tasks = [BookingFlow]
@@ -1,6 +1,29 @@
+import argparse
 import os
-from webapp import app
+
+parser = argparse.ArgumentParser(description="Run the GUDLFT server")
+parser.add_argument('--async', dest='use_gevent', action='store_true',
+                    help="serve with gevent, one greenlet per connection")
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    if args.use_gevent:
+        # before anything imports threading, socket or time
+        from gevent import monkey
+        monkey.patch_all()
+        os.environ['GUDLFT_GEVENT'] = '1'
+    from webapp import app
+    if args.use_gevent:
+        from webapp.green import serve
+        serve(app, max_connections=app.config['GEVENT_MAX_CONNECTIONS'])
+    else:
+        os.environ['WERKZEUG_RUN_MAIN'] = 'true'
+        app.run(debug=False)
+
 
 if __name__ == "__main__":
-    os.environ['WERKZEUG_RUN_MAIN'] = 'true'
-    app.run(debug=False)
+    main()
+else:
+    # imported by a WSGI server (`gunicorn run:app`), whose arguments are not ours
+    from webapp import app  # noqa: F401
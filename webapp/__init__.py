@@ -1,3 +1,8 @@
-
 from flask import Flask
-from .server import app
+from .server import app, warm_up
+from .api import api
+from .admin import admin
+
+app.register_blueprint(api)
+app.register_blueprint(admin)
+warm_up()
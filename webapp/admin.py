@@ -0,0 +1,77 @@
+import hmac
+import click
+from flask import Blueprint, abort, request
+from .server import app, profiler, reload_data
+
+
+admin = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+@admin.before_request
+def check_admin_token():
+    token = app.config['ADMIN_TOKEN']
+    given = request.headers.get('X-Admin-Token', '')
+    if not token or not hmac.compare_digest(given.encode(), token.encode()):
+        abort(403)
+
+
+@admin.route('/profile')
+def profile():
+    """
+    Collapsed stacks of the sampled requests since the last reset
+    """
+    body = profiler.collapsed()
+    if request.args.get('reset'):
+        profiler.clear()
+    response = app.response_class(body, mimetype='text/plain')
+    response.headers['Content-Disposition'] = 'attachment; filename=gudlft.folded'
+    return response
+
+
+@admin.route('/profile', methods=['POST'])
+def profile_settings():
+    """
+    Change the sample rate of the profiler without a restart
+    """
+    try:
+        profiler.sample_rate = min(max(float(request.form['sample_rate']), 0.0), 1.0)
+    except (KeyError, ValueError):
+        abort(400)
+    return {'sample_rate': profiler.sample_rate, 'requests': profiler.requests}
+
+
+@admin.route('/reload', methods=['POST'])
+def reload():
+    """
+    Apply what changed in the clubs and competitions files
+    """
+    try:
+        changes = reload_data()
+    except (OSError, ValueError) as error:
+        return {'error': str(error)}, 400
+    if changes is None:
+        abort(404)
+    return changes
+
+
+@app.cli.command('profile')
+@click.argument('path')
+@click.option('--method', default='GET')
+@click.option('--form', multiple=True, metavar='KEY=VALUE', help="form field of the request")
+@click.option('--requests', '-n', default=100, help="number of requests")
+@click.option('--output', '-o', type=click.File('w'), default='-', help="collapsed stacks file")
+def profile_command(path, method, form, requests, output):
+    """
+    Profile requests to PATH in process and write their collapsed stacks
+    """
+    data = dict(field.split('=', 1) for field in form)
+    sample_rate = profiler.sample_rate
+    profiler.sample_rate = 1.0
+    profiler.clear()
+    try:
+        client = app.test_client()
+        for _ in range(requests):
+            client.open(path, method=method, data=data or None)
+    finally:
+        profiler.sample_rate = sample_rate
+    output.write(profiler.collapsed())
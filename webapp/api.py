@@ -0,0 +1,175 @@
+import json
+import threading
+from datetime import datetime
+from flask import Blueprint, request
+from .registry import CLUB_SORTS, COMPETITION_SORTS
+from .reload import data_reloaded
+from .sqlite_storage import SqliteRegistry
+from .server import (app, check_competition_date, engine, get_club_by_name, get_competition_by_name,
+                     get_listing_args, ledger, registry, store)
+
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+
+class FragmentSerializer:
+    """
+    Serializes records to compact JSON and keeps the result until the record
+    changes (see Record.revision), so that a listing is a join of ready-made
+    byte strings instead of a full json.dumps of every record.
+
+    Without `cache` (the SQLite storage, which builds new records for every
+    query) nothing is kept : a fragment could never be found again and the
+    cache would grow to the whole dataset.
+    """
+
+    def __init__(self, cache=True):
+        self.cache = cache
+        self._fragments = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def serialize(record):
+        return json.dumps({field: record[field] for field in record.FIELDS}, separators=(',', ':')).encode()
+
+    def fragment(self, record):
+        if not self.cache:
+            return self.serialize(record)
+        key = (type(record).__name__, record['name'])
+        cached = self._fragments.get(key)
+        if cached is not None and cached[0] is record and cached[1] == record.revision:
+            return cached[2]
+        revision = record.revision
+        fragment = self.serialize(record)
+        with self._lock:
+            self._fragments[key] = (record, revision, fragment)
+        return fragment
+
+    def forget(self, records):
+        with self._lock:
+            for record in records:
+                key = (type(record).__name__, record['name'])
+                cached = self._fragments.get(key)
+                if cached is not None and cached[0] is record:
+                    del self._fragments[key]
+
+    def listing(self, page):
+        header = json.dumps({'total': page.total, 'offset': page.offset, 'limit': page.limit,
+                             'sort': page.sort, 'order': page.order}, separators=(',', ':'))
+        return b''.join((header[:-1].encode(), b',"items":[',
+                         b','.join(self.fragment(record) for record in page.items), b']}'))
+
+
+serializer = FragmentSerializer(cache=not isinstance(registry, SqliteRegistry))
+
+
+@data_reloaded.connect
+def forget_removed_records(sender, clubs, competitions):
+    serializer.forget(clubs + competitions)
+
+
+def json_response(body, status=200):
+    if not isinstance(body, bytes):
+        body = json.dumps(body, separators=(',', ':')).encode()
+    return app.response_class(body, status=status, mimetype='application/json')
+
+
+def error_response(message, status):
+    return json_response({'error': message}, status)
+
+
+def listing_response(listing, sorts, default_sort, default_order='asc'):
+    """
+    Page of the `listing` ('clubs_page' or 'competitions_page') of a
+    snapshot of the registry, tagged with its version
+    """
+    sort, order, offset, limit = get_listing_args(sorts, default_sort, default_order)
+    snapshot = registry.snapshot()
+    etag = f'{request.endpoint}-{snapshot.version}'
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+    else:
+        page = getattr(snapshot, listing)(sort, offset, limit, reverse=order == 'desc')
+        response = json_response(serializer.listing(page))
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
+@api.route('/clubs/<name>')
+def club_summary(name):
+    try:
+        club = get_club_by_name(name)
+    except IndexError as index_error:
+        return error_response(str(index_error), 404)
+    return json_response(serializer.fragment(club))
+
+
+@api.route('/clubs/<name>/bookings')
+def club_bookings(name):
+    try:
+        club = get_club_by_name(name)
+    except IndexError as index_error:
+        return error_response(str(index_error), 404)
+    return json_response({'club': club['name'], 'total': ledger.club_total(club['name']),
+                          'competitions': ledger.club_bookings(club['name'])})
+
+
+@api.route('/competitions')
+def competitions():
+    registry.archive_past_competitions(datetime.now())
+    return listing_response('competitions_page', COMPETITION_SORTS, 'date')
+
+
+@api.route('/points')
+def points():
+    return listing_response('clubs_page', CLUB_SORTS, 'points', 'desc')
+
+
+@api.route('/bookings', methods=['POST'])
+def bookings():
+    data = request.get_json(silent=True) or request.form
+    try:
+        club = get_club_by_name(data['club'])
+        competition = get_competition_by_name(data['competition'])
+        places_required = int(data['places'])
+    except (KeyError, TypeError, ValueError):
+        return error_response("club, competition and places are required", 400)
+    except IndexError as index_error:
+        return error_response(str(index_error), 404)
+    try:
+        check_competition_date(competition)
+        engine.book(club, competition, places_required)
+    except (AssertionError, ValueError) as booking_error:
+        return error_response(str(booking_error), 400)
+    return json_response(b''.join((b'{"club":', serializer.fragment(club),
+                                   b',"competition":', serializer.fragment(competition), b'}')), 201)
+
+
+@api.route('/bookings/batch', methods=['POST'])
+def bookings_batch():
+    data = request.get_json(silent=True) or {}
+    try:
+        club = get_club_by_name(data['club'])
+        bookings = [(get_competition_by_name(booking['competition']), int(booking['places']))
+                    for booking in data['bookings']]
+    except (KeyError, TypeError, ValueError):
+        return error_response("club and bookings of competition and places are required", 400)
+    except IndexError as index_error:
+        return error_response(str(index_error), 404)
+    try:
+        for competition, _ in bookings:
+            check_competition_date(competition)
+        engine.book_many(club, bookings)
+    except (AssertionError, ValueError) as booking_error:
+        return error_response(str(booking_error), 400)
+    competitions = b','.join(serializer.fragment(competition) for competition, _ in engine.merge(bookings))
+    return json_response(b''.join((b'{"club":', serializer.fragment(club),
+                                   b',"competitions":[', competitions, b']}')), 201)
+
+
+@api.route('/pool')
+def pool_stats():
+    if store is None:
+        return error_response("No database connection pool", 404)
+    return json_response(store.pool.stats())
@@ -0,0 +1,112 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from flask import abort, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+MANIFEST = 'manifest.json'
+# one year : a fingerprinted file never changes, a new content gets a new name
+MAX_AGE = 31536000
+
+
+def fingerprinted_name(filename, content):
+    """
+    `css/main.css` -> `css/main.<12 hex digits of the SHA-256>.css`
+    """
+    root, extension = os.path.splitext(filename)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:12]}{extension}"
+
+
+def compressed_variants(content):
+    """
+    Precompressed copies of a file by Content-Encoding, kept when smaller
+    than the file. Brotli only when the `brotli` package is installed.
+    """
+    variants = {'gzip': ('.gz', gzip.compress(content, 9, mtime=0))}
+    if brotli is not None:
+        variants['br'] = ('.br', brotli.compress(content))
+    return {encoding: variant for encoding, variant in variants.items() if len(variant[1]) < len(content)}
+
+
+def build_assets(static_dir, output_dir):
+    """
+    Copy every file of `static_dir` to `output_dir` under its fingerprinted
+    name, next to its precompressed copies, and write the manifest. Returns
+    the manifest.
+    """
+    files = {}
+    encodings = {}
+    output_dir = os.path.abspath(output_dir)
+    for directory, subdirectories, filenames in os.walk(static_dir):
+        if os.path.abspath(directory) == output_dir:
+            subdirectories[:] = []
+            continue
+        for filename in sorted(filenames):
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, static_dir).replace(os.sep, '/')
+            with open(path, 'rb') as source:
+                content = source.read()
+            built = fingerprinted_name(name, content)
+            target = os.path.join(output_dir, *built.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as copy:
+                copy.write(content)
+            variants = compressed_variants(content)
+            for suffix, compressed in variants.values():
+                with open(target + suffix, 'wb') as copy:
+                    copy.write(compressed)
+            files[name] = built
+            encodings[built] = sorted(variants)
+    manifest = {'files': files, 'encodings': encodings}
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, MANIFEST), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    return manifest
+
+
+class AssetManifest:
+    """
+    Fingerprinted static files built by `flask build-assets`. Without a
+    manifest the static files are served as before.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.load()
+
+    def load(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST)) as manifest_file:
+                manifest = json.load(manifest_file)
+        except FileNotFoundError:
+            manifest = {'files': {}, 'encodings': {}}
+        self.files = manifest['files']
+        self.encodings = manifest['encodings']
+
+    def send(self, filename, accept_encodings):
+        """
+        Response for a fingerprinted file, precompressed (brotli, else gzip)
+        when the client accepts it
+        """
+        encodings = self.encodings.get(filename)
+        if encodings is None:
+            abort(404)
+        encoding = next((encoding for encoding in ('br', 'gzip')
+                         if encoding in encodings and accept_encodings[encoding]), None)
+        suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding, '')
+        response = send_from_directory(self.directory, filename + suffix,
+                                       mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        # the name of the compressed copy is not the name of the file
+        response.headers.pop('Content-Disposition', None)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = f'public, max-age={MAX_AGE}, immutable'
+        return response
@@ -0,0 +1,159 @@
+import threading
+import time
+from contextlib import ExitStack
+from blinker import Namespace
+from .profiling import phase
+
+
+_signals = Namespace()
+
+# Sent once a booking is applied (and journaled), with the club, the
+# competition and the number of places booked
+booking_completed = _signals.signal('booking-completed')
+# Sent once the locks of a booking are held, with the club and the seconds
+# spent waiting for them
+booking_locked = _signals.signal('booking-locked')
+# Sent when a booking is refused, with the club and the BookingError
+booking_failed = _signals.signal('booking-failed')
+
+
+class BookingError(AssertionError):
+    """
+    Raised when a booking is refused. It derives from AssertionError so the
+    views keep flashing the message exactly like the former inline asserts.
+    """
+
+
+class BookingEngine:
+    """
+    Books places for a club in a competition, atomically.
+
+    Every club and every competition owns its own lock. A booking holds the
+    club lock then the competition lock while it checks and decrements
+    points and places, so concurrent bookings on distinct competitions
+    never wait on each other and no booking can oversell a competition or
+    drive a club's points below zero. Locks are always taken in the same
+    order (club first, then competitions sorted by name) so that bookings
+    can never deadlock.
+
+    When a journal is given, each booking is journaled while its locks are
+    held and made durable once they are released.
+
+    When a store is given (the state shared by several worker processes or
+    the SQLite storage), the check and the write also run inside one of its
+    transactions : `refresh` re-reads the stored values into the records
+    before the check and `write` stores each booking.
+
+    When a ledger is given, each booking is recorded in it under the club
+    lock (and inside the transaction of the store, before the journal),
+    and `max_places` bounds the places a club books in a competition over
+    all its bookings instead of in each one.
+    """
+
+    def __init__(self, max_places, journal=None, store=None, ledger=None):
+        self.max_places = max_places
+        self.journal = journal
+        self.store = store
+        self.ledger = ledger
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, kind, name):
+        key = (kind, name)
+        lock = self._locks.get(key)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._locks.setdefault(key, threading.Lock())
+        return lock
+
+    def club_lock(self, club):
+        return self._lock('club', club['name'])
+
+    def competition_lock(self, competition):
+        return self._lock('competition', competition['name'])
+
+    def validate(self, club, bookings):
+        """
+        Check a list of (competition, places) for a club, all or nothing
+        """
+        prefix = len(bookings) > 1
+        for competition, places_required in bookings:
+            if places_required < 1:
+                raise BookingError(self._message(prefix, competition, "Number of places required is less than 1"))
+        if club['points'] < sum(places_required for _, places_required in bookings):
+            raise BookingError("Number of places required is greater than club's points")
+        for competition, places_required in bookings:
+            booked = self.ledger.booked(club['name'], competition['name']) if self.ledger is not None else 0
+            if self.max_places < booked + places_required:
+                message = f"Number of places required is greater than {self.max_places - booked}"
+                if booked:
+                    message += f" : {booked} of {self.max_places} already booked"
+                raise BookingError(self._message(prefix, competition, message))
+            if competition['numberOfPlaces'] < places_required:
+                raise BookingError(self._message(
+                    prefix, competition, "Number of places required is greater than competition's number of places"))
+
+    @staticmethod
+    def _message(prefix, competition, message):
+        return f"{competition['name']} : {message}" if prefix else message
+
+    @staticmethod
+    def merge(bookings):
+        """
+        Sum the places asked twice for a same competition and sort the
+        bookings by competition name, the order their locks are taken in
+        """
+        merged = {}
+        for competition, places_required in bookings:
+            if competition['name'] in merged:
+                places_required += merged[competition['name']][1]
+            merged[competition['name']] = (competition, places_required)
+        return [merged[name] for name in sorted(merged)]
+
+    def book(self, club, competition, places_required):
+        """
+        Check and apply a booking under the club and competition locks
+        """
+        self.book_many(club, [(competition, places_required)])
+
+    def book_many(self, club, bookings):
+        """
+        Check and apply atomically several bookings of a club : either all
+        of them are applied or none is
+        """
+        bookings = self.merge(bookings)
+        if not bookings:
+            booking_error = BookingError("No places required")
+            booking_failed.send(self, club=club, error=booking_error)
+            raise booking_error
+        seq = None
+        with ExitStack() as stack:
+            started = time.perf_counter()
+            stack.enter_context(self.club_lock(club))
+            for competition, _ in bookings:
+                stack.enter_context(self.competition_lock(competition))
+            if self.store is not None:
+                stack.enter_context(self.store.transaction())
+                self.store.refresh(club, [competition for competition, _ in bookings])
+            booking_locked.send(self, club=club, wait=time.perf_counter() - started)
+            try:
+                with phase('validation'):
+                    self.validate(club, bookings)
+                with phase('mutation'):
+                    for competition, places_required in bookings:
+                        competition['numberOfPlaces'] = competition['numberOfPlaces'] - places_required
+                        club['points'] = club['points'] - places_required
+                        if self.store is not None:
+                            self.store.write(club, competition, places_required)
+                        if self.ledger is not None:
+                            self.ledger.record(club['name'], competition['name'], places_required)
+                        if self.journal is not None:
+                            seq = self.journal.append(club, competition, places_required)
+            except BookingError as booking_error:
+                booking_failed.send(self, club=club, error=booking_error)
+                raise
+        if self.journal is not None:
+            with phase('mutation'):
+                self.journal.commit(seq)
+        for competition, places_required in bookings:
+            booking_completed.send(self, club=club, competition=competition, places=places_required)
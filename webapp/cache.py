@@ -0,0 +1,40 @@
+import threading
+from collections import OrderedDict
+
+
+class RenderedPageCache:
+    """
+    Thread-safe LRU cache of rendered pages.
+
+    Keys must contain the state version the page was rendered from, so a
+    booking (which bumps the version) makes every older entry unreachable ;
+    those entries are then evicted as new versions are cached.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,22 @@
+import gevent
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+
+
+def offload(function):
+    """
+    Run `function` in the threadpool of the gevent hub : the calling
+    greenlet waits for the result while the other ones keep running
+    """
+    def offloaded(*args):
+        return gevent.get_hub().threadpool.apply(function, args)
+    return offloaded
+
+
+def serve(app, host='127.0.0.1', port=5000, max_connections=10000):
+    """
+    Serve the app with one greenlet per connection, at most
+    `max_connections` of them at a time
+    """
+    server = WSGIServer((host, port), app, spawn=Pool(max_connections))
+    server.serve_forever()
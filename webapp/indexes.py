@@ -0,0 +1,301 @@
+import gc
+import random
+import threading
+from itertools import islice
+from operator import itemgetter
+
+
+class Node:
+    """
+    Node of a persistent treap : never modified once linked into a
+    published tree, a change copies the path from the root instead
+    """
+
+    __slots__ = ('key', 'row', 'priority', 'left', 'right', 'size')
+
+    def __init__(self, key, row, priority, left, right):
+        self.key = key
+        self.row = row
+        self.priority = priority
+        self.left = left
+        self.right = right
+        self.size = 1 + (left.size if left is not None else 0) + (right.size if right is not None else 0)
+
+
+def _size(node):
+    return node.size if node is not None else 0
+
+
+def _copy(node, left, right):
+    return Node(node.key, node.row, node.priority, left, right)
+
+
+def _split(node, key):
+    """
+    Trees of the keys below `key` and of the others
+    """
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        return _copy(node, node.left, left), right
+    left, right = _split(node.left, key)
+    return left, _copy(node, right, node.right)
+
+
+def _merge(left, right):
+    """
+    Tree of the keys of `left` then of `right`, all greater
+    """
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        return _copy(left, left.left, _merge(left.right, right))
+    return _copy(right, _merge(left, right.left), right.right)
+
+
+def _insert(node, key, row, priority):
+    if node is None or priority > node.priority:
+        left, right = _split(node, key)
+        return Node(key, row, priority, left, right)
+    if key < node.key:
+        return _copy(node, _insert(node.left, key, row, priority), node.right)
+    return _copy(node, node.left, _insert(node.right, key, row, priority))
+
+
+def _delete(node, key):
+    if node is None:
+        return None
+    if key == node.key:
+        return _merge(node.left, node.right)
+    if key < node.key:
+        return _copy(node, _delete(node.left, key), node.right)
+    return _copy(node, node.left, _delete(node.right, key))
+
+
+def _replace(node, key, row):
+    if key == node.key:
+        return Node(key, row, node.priority, node.left, node.right)
+    if key < node.key:
+        return _copy(node, _replace(node.left, key, row), node.right)
+    return _copy(node, node.left, _replace(node.right, key, row))
+
+
+def _find(node, key):
+    while node is not None and node.key != key:
+        node = node.left if key < node.key else node.right
+    return node
+
+
+def _build(decorated):
+    """
+    Treap of (key, row) pairs sorted by key, in linear time : the nodes
+    hanging off the right spine are popped while their priority is lower
+    than the new node's
+    """
+    spine = []
+    for key, row in decorated:
+        node = Node(key, row, random.random(), None, None)
+        last = None
+        while spine and spine[-1].priority < node.priority:
+            last = spine.pop()
+        node.left = last
+        if spine:
+            spine[-1].right = node
+        spine.append(node)
+    if not spine:
+        return None
+    root = spine[0]
+    # sizes, children before parents
+    nodes = []
+    pending = [root]
+    while pending:
+        node = pending.pop()
+        nodes.append(node)
+        pending.extend(child for child in (node.left, node.right) if child is not None)
+    for node in reversed(nodes):
+        node.size = 1 + _size(node.left) + _size(node.right)
+    return root
+
+
+def _iter_rows(node, rank=0, reverse=False):
+    """
+    Rows in key order (or reverse order) from the rank-th one
+    """
+    stack = []
+    while node is not None:
+        first, second = (node.right, node.left) if reverse else (node.left, node.right)
+        if rank < _size(first):
+            stack.append(node)
+            node = first
+        elif rank == _size(first):
+            stack.append(node)
+            break
+        else:
+            rank -= _size(first) + 1
+            node = second
+    while stack:
+        node = stack.pop()
+        yield node.row
+        child = node.left if reverse else node.right
+        while child is not None:
+            stack.append(child)
+            child = child.right if reverse else child.left
+
+
+class SortedSnapshot:
+    """
+    Immutable version of a SortedIndex : the tree it holds is never
+    modified, so it is read without any lock
+    """
+
+    __slots__ = ('root',)
+
+    def __init__(self, root):
+        self.root = root
+
+    def __len__(self):
+        return _size(self.root)
+
+    def __iter__(self):
+        return _iter_rows(self.root)
+
+    def first(self):
+        node = self.root
+        while node is not None and node.left is not None:
+            node = node.left
+        return node.row if node is not None else None
+
+    def page(self, offset, limit, reverse=False):
+        """
+        Rows offset to offset + limit in ascending (or descending) order
+        """
+        items = list(islice(_iter_rows(self.root, offset, reverse), limit)) if offset < len(self) else []
+        return Page(items, offset, limit, len(self))
+
+
+class SortedIndex:
+    """
+    Records kept sorted on `key(record)`.
+
+    The index is built once at load time and then maintained incrementally :
+    a record whose key changed (e.g. a club's points after a booking) is
+    moved in O(log n) instead of re-sorting the whole list on every request.
+    Keys must be unique, so they should end with the record name.
+
+    It is a persistent treap (ordered by key, heap-ordered by random
+    priorities, each node counting its subtree for the pages) : writers
+    copy the O(log n) nodes of the path they change and publish the new
+    root, so the trees already handed to readers never change. `snapshot()`
+    is that root, taken in O(1) without waiting for the writers.
+
+    The index holds `row(record)` (the record itself by default), e.g. the
+    read-only snapshot of the record, which is replaced when it changes.
+    """
+
+    def __init__(self, key, records=(), row=None):
+        self.key = key
+        self.row = row or (lambda record: record)
+        self._lock = threading.Lock()
+        self._current_keys = {}
+        # keys, rows and nodes hold no cycles : collecting while millions of
+        # them are created would only rescan them
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            decorated = sorted(((key(record), record) for record in records), key=itemgetter(0))
+            for sort_key, record in decorated:
+                self._current_keys[id(record)] = sort_key
+            self._root = _build((sort_key, self.row(record)) for sort_key, record in decorated)
+        finally:
+            if collecting:
+                gc.enable()
+
+    def snapshot(self):
+        return SortedSnapshot(self._root)
+
+    def __len__(self):
+        return _size(self._root)
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def first(self):
+        return self.snapshot().first()
+
+    def add(self, record):
+        with self._lock:
+            sort_key = self.key(record)
+            self._root = _insert(self._root, sort_key, self.row(record), random.random())
+            self._current_keys[id(record)] = sort_key
+
+    def discard(self, record):
+        with self._lock:
+            sort_key = self._current_keys.pop(id(record), None)
+            if sort_key is not None:
+                self._root = _delete(self._root, sort_key)
+
+    def update(self, record):
+        """
+        Move the record to its new position if its key changed, or replace
+        its row if only the row changed. The key and the row are read under
+        the lock, so that of two updates of a record the last one published
+        holds its latest values, whatever order they run in.
+        """
+        with self._lock:
+            sort_key = self.key(record)
+            row = self.row(record)
+            current_key = self._current_keys.get(id(record))
+            if current_key == sort_key:
+                if _find(self._root, sort_key).row is not row:
+                    self._root = _replace(self._root, sort_key, row)
+                return
+            root = self._root
+            if current_key is not None:
+                root = _delete(root, current_key)
+            self._root = _insert(root, sort_key, row, random.random())
+            self._current_keys[id(record)] = sort_key
+
+    def page(self, offset, limit, reverse=False):
+        """
+        Records offset to offset + limit in ascending (or descending) order
+        """
+        return self.snapshot().page(offset, limit, reverse)
+
+
+class Page:
+    """
+    One page of a sorted listing
+    """
+
+    def __init__(self, items, offset, limit, total, sort=None, order=None):
+        self.items = items
+        self.offset = offset
+        self.limit = limit
+        self.total = total
+        self.sort = sort
+        self.order = order
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_previous(self):
+        return self.offset > 0
+
+    @property
+    def has_next(self):
+        return self.offset + self.limit < self.total
+
+    @property
+    def previous_offset(self):
+        return max(self.offset - self.limit, 0)
+
+    @property
+    def next_offset(self):
+        return self.offset + self.limit
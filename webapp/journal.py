@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+import time
+
+
+class BookingJournal:
+    """
+    Append-only journal of booking events.
+
+    Each booking appends one JSON line holding the club and competition
+    values *after* the booking, so replaying an event twice is harmless.
+    `commit` makes an event durable with group commit: the first waiting
+    thread becomes the leader, writes every buffered event and pays a single
+    fsync for all of them while the others wait for it.
+
+    On startup `replay` applies the last snapshot then the journal on top of
+    the data loaded from the JSON files, and cuts off an event torn by a
+    crash. Every `compact_every` events the
+    live state is folded into a new snapshot by a background thread and the
+    events it covers are dropped from the journal, so the journal never
+    grows without bound and neither the snapshot nor the JSON files are
+    written on the booking path.
+
+    With a ledger, each event also holds the places booked so far by the
+    club in the competition, and each snapshot the totals of the ledger :
+    they are made durable by the same fsync as the booking and restored
+    into the ledger on replay.
+    """
+
+    def __init__(self, path, state, compact_every=1000, fsync=os.fsync, ledger=None):
+        self.path = path
+        self.snapshot_path = path + '.snapshot'
+        self.state = state
+        self.ledger = ledger
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._committed = threading.Condition()
+        self._flushing = False
+        self._buffer = []
+        self._seq = 0
+        self._durable_seq = 0
+        self._since_compaction = 0
+        self._compaction = None
+        self._file = None
+
+    def open(self):
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        if self._file is not None:
+            self.commit(self._seq)
+            compaction = self._compaction
+            if compaction is not None:
+                compaction.join()
+            self._file.close()
+            self._file = None
+
+    def _read_snapshot(self):
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as snapshot_file:
+                return json.load(snapshot_file)
+        except FileNotFoundError:
+            return {'seq': 0, 'clubs': {}, 'competitions': {}}
+
+    def _read_events(self):
+        # self._valid_size ends up at the end of the last complete event
+        self._valid_size = 0
+        try:
+            with open(self.path, 'rb') as journal_file:
+                for line in journal_file:
+                    if not line.endswith(b'\n'):
+                        # torn write of the last event before a crash
+                        return
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        return
+                    self._valid_size += len(line)
+                    yield event
+        except FileNotFoundError:
+            return
+
+    def replay(self, registry):
+        """
+        Apply the snapshot then the journal to the registry and open the
+        journal for appending. Returns the number of events replayed.
+        """
+        snapshot = self._read_snapshot()
+        for name, points in snapshot['clubs'].items():
+            if name in registry.clubs_by_name:
+                registry.update_club(registry.clubs_by_name[name], points=points)
+        for name, places in snapshot['competitions'].items():
+            if name in registry.competitions_by_name:
+                registry.update_competition(registry.competitions_by_name[name], numberOfPlaces=places)
+        if self.ledger is not None:
+            for club, bookings in snapshot.get('booked', {}).items():
+                for competition, booked in bookings.items():
+                    self.ledger.restore(club, competition, booked)
+        self._seq = snapshot['seq']
+        replayed = 0
+        for event in self._read_events():
+            if event['seq'] <= snapshot['seq']:
+                continue
+            if event['club'] in registry.clubs_by_name:
+                registry.update_club(registry.clubs_by_name[event['club']], points=event['points'])
+            if event['competition'] in registry.competitions_by_name:
+                registry.update_competition(registry.competitions_by_name[event['competition']],
+                                            numberOfPlaces=event['numberOfPlaces'])
+            if self.ledger is not None and 'booked' in event:
+                self.ledger.restore(event['club'], event['competition'], event['booked'])
+            self._seq = event['seq']
+            replayed += 1
+        self._durable_seq = self._seq
+        self._since_compaction = replayed
+        if os.path.exists(self.path) and os.path.getsize(self.path) > self._valid_size:
+            # cut the torn event off, the events appended next would follow it
+            # and be dropped by the next replay
+            with open(self.path, 'r+b') as journal_file:
+                journal_file.truncate(self._valid_size)
+                journal_file.flush()
+                self.fsync(journal_file.fileno())
+        self.open()
+        return replayed
+
+    def append(self, club, competition, places):
+        """
+        Buffer the event of a booking already applied to club and
+        competition (and recorded in the ledger). Must be called while
+        holding their booking locks so events of a same record are
+        journaled in the order they happened.
+        """
+        with self._lock:
+            self._seq += 1
+            event = {
+                'seq': self._seq,
+                'time': time.time(),
+                'club': club['name'],
+                'competition': competition['name'],
+                'places': places,
+                'points': club['points'],
+                'numberOfPlaces': competition['numberOfPlaces'],
+            }
+            if self.ledger is not None:
+                event['booked'] = self.ledger.booked(club['name'], competition['name'])
+            self._buffer.append(json.dumps(event) + '\n')
+            self._since_compaction += 1
+            return self._seq
+
+    def _flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+            last_seq = self._seq
+        if batch:
+            self._file.write(''.join(batch))
+            self._file.flush()
+            self.fsync(self._file.fileno())
+        self._durable_seq = last_seq
+
+    def commit(self, seq):
+        """
+        Block until the event `seq` is on disk
+        """
+        if self._durable_seq < seq:
+            # the waiters do not queue on the flush lock : they all wake up
+            # when a flush ends, and only one of those still not on disk
+            # leads the next one
+            with self._committed:
+                while self._durable_seq < seq and self._flushing:
+                    self._committed.wait()
+                leader = self._durable_seq < seq
+                self._flushing = self._flushing or leader
+            if leader:
+                try:
+                    with self._flush_lock:
+                        self._flush()
+                finally:
+                    with self._committed:
+                        self._flushing = False
+                        self._committed.notify_all()
+        if self._since_compaction >= self.compact_every:
+            with self._lock:
+                if self._compaction is not None or self._since_compaction < self.compact_every:
+                    return
+                self._compaction = threading.Thread(target=self._compact_in_background,
+                                                    name='gudlft-journal-compaction', daemon=True)
+            self._compaction.start()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        finally:
+            self._compaction = None
+
+    def compact(self):
+        """
+        Fold the journal into a new snapshot of the live state and drop the
+        events it covers. Only the copy of the state holds the lock taken by
+        `append` : the snapshot is written and fsynced without it, then the
+        journal is rewritten with the events appended in the meantime.
+        """
+        with self._lock:
+            # the live state reflects every event appended so far (and maybe
+            # some bookings not appended yet, whose events replay on top)
+            snapshot = dict(self.state(), seq=self._seq)
+            if self.ledger is not None:
+                # recorded before their events are appended, like the state
+                snapshot['booked'] = self.ledger.totals()
+            self._since_compaction = 0
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as snapshot_file:
+            json.dump(snapshot, snapshot_file)
+            snapshot_file.flush()
+            self.fsync(snapshot_file.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        with self._flush_lock:
+            # no event is written meanwhile, those still buffered are written
+            # to the new journal by the next commit
+            kept = [json.dumps(event) + '\n' for event in self._read_events() if event['seq'] > snapshot['seq']]
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as journal_file:
+                journal_file.write(''.join(kept))
+                journal_file.flush()
+                self.fsync(journal_file.fileno())
+            os.replace(tmp_path, self.path)
+            self._file.close()
+            self.open()
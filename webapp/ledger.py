@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    club TEXT NOT NULL,
+    competition TEXT NOT NULL,
+    places INTEGER NOT NULL,
+    PRIMARY KEY (club, competition)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bookings_competition ON bookings (competition);
+"""
+
+
+class BookingLedger:
+    """
+    Record of every booking : which club booked how many places in which
+    competition.
+
+    Running totals are kept by club and competition, by club and by
+    competition as each booking is recorded, so the places already booked
+    by a club in a competition (checked against MAX_BOOKING_PLACES) and the
+    bookings of a club are read without going through the entries.
+
+    Only the last `keep` entries stay in memory. Beyond that the oldest half
+    is appended to the file at `path` in one write (or dropped without a
+    path, the totals being kept either way). `close` writes the remaining
+    entries, and a ledger opened on an existing file adds its entries to
+    the totals. The totals are made durable with the bookings by the
+    journal, which holds them in its events and snapshots and `restore`s
+    them on replay.
+
+    With the `pool` of the SQLite storage or of the shared state, the
+    totals are kept in its `bookings` table instead : `record` writes them
+    inside the booking transaction, and every process reads the same
+    totals from the database.
+    """
+
+    def __init__(self, path=None, keep=10000, pool=None):
+        self.path = path
+        self.keep = keep
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._entries = deque()
+        self._by_club = {}
+        self._club_totals = {}
+        self._competition_totals = {}
+        self._seq = 0
+        self._file = None
+        if pool is not None:
+            with pool.connection() as connection:
+                connection.executescript(SCHEMA)
+        if path is not None:
+            for entry in self._read_spilled():
+                self._seq = entry['seq']
+                self._add(entry['club'], entry['competition'], entry['places'])
+            self._file = open(path, 'a', encoding='utf-8')
+
+    def _read_spilled(self, size=None):
+        try:
+            with open(self.path, encoding='utf-8') as ledger_file:
+                for line in ledger_file:
+                    if size is not None:
+                        size -= len(line.encode())
+                        if size < 0:
+                            return
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # torn write of the last entries before a crash
+                        return
+        except FileNotFoundError:
+            return
+
+    def _add(self, club, competition, places):
+        bookings = self._by_club.setdefault(club, {})
+        bookings[competition] = bookings.get(competition, 0) + places
+        self._club_totals[club] = self._club_totals.get(club, 0) + places
+        self._competition_totals[competition] = self._competition_totals.get(competition, 0) + places
+
+    def record(self, club, competition, places):
+        """
+        Record that `club` booked `places` in `competition` (names), returns
+        the sequence number of the entry
+        """
+        if self.pool is not None:
+            with self.pool.connection() as connection:
+                connection.execute('INSERT INTO bookings (club, competition, places) VALUES (?, ?, ?) '
+                                   'ON CONFLICT (club, competition) DO UPDATE SET places = places + excluded.places',
+                                   (club, competition, places))
+        with self._lock:
+            self._seq += 1
+            self._entries.append((self._seq, time.time(), club, competition, places))
+            if self.pool is None:
+                self._add(club, competition, places)
+            if len(self._entries) > self.keep:
+                self._spill(len(self._entries) - self.keep // 2)
+            return self._seq
+
+    def _spill(self, count):
+        lines = []
+        for _ in range(count):
+            seq, recorded, club, competition, places = self._entries.popleft()
+            lines.append(json.dumps({'seq': seq, 'time': recorded, 'club': club, 'competition': competition,
+                                     'places': places}) + '\n')
+        if self._file is not None:
+            self._file.write(''.join(lines))
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            with self._lock:
+                self._spill(len(self._entries))
+                self._file.close()
+                self._file = None
+
+    def restore(self, club, competition, booked):
+        """
+        Set the places booked by `club` in `competition` to those made
+        durable by the journal
+        """
+        with self._lock:
+            self._add(club, competition, booked - self.booked(club, competition))
+
+    def totals(self):
+        """
+        Places booked by club name and competition name
+        """
+        with self._lock:
+            return {club: dict(bookings) for club, bookings in self._by_club.items()}
+
+    def clear(self):
+        """
+        Forget every entry and total, the spilled ones included
+        """
+        if self.pool is not None:
+            with self.pool.connection() as connection:
+                connection.execute('DELETE FROM bookings')
+        with self._lock:
+            self._entries.clear()
+            self._by_club.clear()
+            self._club_totals.clear()
+            self._competition_totals.clear()
+            self._seq = 0
+            if self._file is not None:
+                self._file.truncate(0)
+                self._file.flush()
+
+    def _query(self, query, parameters):
+        with self.pool.connection() as connection:
+            return connection.execute(query, parameters).fetchall()
+
+    def booked(self, club, competition):
+        """
+        Places booked by `club` in `competition`
+        """
+        if self.pool is not None:
+            rows = self._query('SELECT places FROM bookings WHERE club = ? AND competition = ?', (club, competition))
+            return rows[0][0] if rows else 0
+        return self._by_club.get(club, {}).get(competition, 0)
+
+    def club_total(self, club):
+        if self.pool is not None:
+            return self._query('SELECT COALESCE(SUM(places), 0) FROM bookings WHERE club = ?', (club,))[0][0]
+        return self._club_totals.get(club, 0)
+
+    def competition_total(self, competition):
+        if self.pool is not None:
+            return self._query('SELECT COALESCE(SUM(places), 0) FROM bookings WHERE competition = ?',
+                               (competition,))[0][0]
+        return self._competition_totals.get(competition, 0)
+
+    def club_bookings(self, club):
+        """
+        Places booked by `club` by competition name
+        """
+        if self.pool is not None:
+            return dict(self._query('SELECT competition, places FROM bookings WHERE club = ?', (club,)))
+        return dict(self._by_club.get(club, {}))
+
+    def __len__(self):
+        return self._seq
+
+    def history(self, club=None, competition=None):
+        """
+        Entries in the order they were recorded, those on disk first,
+        optionally only those of a club or of a competition
+        """
+        with self._lock:
+            size = os.path.getsize(self.path) if self.path is not None else None
+            entries = list(self._entries)
+        spilled = self._read_spilled(size) if size is not None else ()
+        recent = ({'seq': seq, 'time': recorded, 'club': entry_club, 'competition': entry_competition,
+                   'places': places}
+                  for seq, recorded, entry_club, entry_competition, places in entries)
+        for source in (spilled, recent):
+            for entry in source:
+                if club is not None and entry['club'] != club:
+                    continue
+                if competition is not None and entry['competition'] != competition:
+                    continue
+                yield entry
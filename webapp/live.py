@@ -0,0 +1,98 @@
+import json
+import random
+import threading
+from collections import deque
+from itertools import islice
+
+
+class Broadcaster:
+    """
+    In-process fan-out of server-sent events.
+
+    A published event is encoded once and appended to a ring of the last
+    `history` events shared by every subscriber, then the subscribers are
+    woken up : publishing costs the same whatever their number. Each
+    subscriber only keeps the id of the last event it sent, and sends the
+    ones after it in one write. A subscriber that fell behind the ring, or
+    reconnects with a Last-Event-ID older than it, gets a `reset` event
+    instead of the events it missed.
+
+    Event ids are prefixed with an epoch drawn for each broadcaster, so that
+    an id issued by another worker process or before a restart is not taken
+    for one of this broadcaster : the client gets a `reset` event as well.
+    """
+
+    def __init__(self, history=1000, keepalive=15.0):
+        self.keepalive = keepalive
+        self.subscribers = 0
+        self.epoch = f'{random.getrandbits(32):08x}'
+        self._events = deque(maxlen=history)
+        self._last_id = 0
+        self._condition = threading.Condition()
+
+    @property
+    def last_id(self):
+        return self._event_id(self._last_id)
+
+    def _event_id(self, number):
+        return f'{self.epoch}-{number}'
+
+    def _number(self, event_id):
+        # number of an id issued by this broadcaster, None for any other id
+        epoch, _, number = event_id.partition('-')
+        if epoch != self.epoch or not number.isdigit() or int(number) > self._last_id:
+            return None
+        return int(number)
+
+    def publish(self, event, data):
+        """
+        Send `data` (JSON-encoded) as an `event` to every subscriber,
+        returns its id
+        """
+        data = json.dumps(data, separators=(',', ':'))
+        with self._condition:
+            self._last_id += 1
+            event_id = self._event_id(self._last_id)
+            self._events.append((self._last_id, f"id: {event_id}\nevent: {event}\ndata: {data}\n\n".encode()))
+            self._condition.notify_all()
+            return event_id
+
+    def _since(self, last_id):
+        # events after last_id, None when some of them already left the ring
+        first_id = self._events[0][0] if self._events else self._last_id + 1
+        if last_id + 1 < first_id:
+            return None
+        return [payload for _, payload in islice(self._events, last_id + 1 - first_id, None)]
+
+    def subscribe(self, last_id=None):
+        """
+        Encoded events published after `last_id` (from now on by default),
+        and a comment every `keepalive` seconds without event so that a
+        closed connection is noticed
+        """
+        with self._condition:
+            self.subscribers += 1
+            events = []
+            if last_id is None:
+                last_id = self._last_id
+            else:
+                last_id = self._number(last_id)
+                if last_id is None:
+                    events, last_id = None, self._last_id
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                if events is None:
+                    yield f"id: {self._event_id(last_id)}\nevent: reset\ndata: {{}}\n\n".encode()
+                elif events:
+                    yield b''.join(events)
+                with self._condition:
+                    if last_id == self._last_id:
+                        self._condition.wait(self.keepalive)
+                    events = self._since(last_id)
+                    last_id = self._last_id
+                if events == []:
+                    yield b": keepalive\n\n"
+        finally:
+            with self._condition:
+                self.subscribers -= 1
@@ -0,0 +1,216 @@
+import json
+import re
+import sys
+
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRUCTURE = re.compile(r'[\[\]{}"]')
+_STRING_END = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r'[ \t\n\r,\]}]')
+# longest literal (false), which scan_once refuses when the chunk cuts it
+_LITERAL_SIZE = 5
+
+
+def compact_record(record):
+    """
+    Default record factory : share one key string object between all the
+    records instead of keeping a fresh copy of each key in every dict
+    """
+    return {sys.intern(key): value for key, value in record.items()}
+
+
+class _ChunkReader:
+    """
+    Text of a JSON file read by chunks and a position in it, the text
+    before the position being dropped once it is longer than a chunk
+    """
+
+    def __init__(self, json_file, path, chunk_size):
+        self.json_file = json_file
+        self.path = path
+        self.chunk_size = chunk_size
+        self.scan_once = json.JSONDecoder().scan_once
+        self.buffer = ''
+        self.position = 0
+
+    def read_more(self):
+        """
+        Read the next chunk, False at the end of the file
+        """
+        if self.position > self.chunk_size:
+            self.buffer = self.buffer[self.position:]
+            self.position = 0
+        chunk = self.json_file.read(self.chunk_size)
+        self.buffer += chunk
+        return bool(chunk)
+
+    def error(self, message):
+        return ValueError(f"{message} in {self.path}")
+
+    def peek(self):
+        """
+        Next character after whitespace, '' at the end of the file
+        """
+        while True:
+            self.position = _WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read_more():
+                return ''
+
+    def expect(self, characters):
+        """
+        Consume the next character, which must be one of `characters`
+        """
+        character = self.peek()
+        if not character:
+            raise self.error("Truncated file")
+        if character not in characters:
+            raise self.error(f"Expected one of {characters!r} at {character!r}")
+        self.position += 1
+        return character
+
+    def value(self):
+        """
+        Decode the JSON value at the position
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.scan_once(self.buffer, self.position)
+            except StopIteration as stop:
+                # no value starts at stop.value (here or in the record),
+                # unless the end of the chunk cuts it
+                index = stop.value
+                if index + _LITERAL_SIZE < len(self.buffer) or not self.read_more():
+                    raise self.error(f"Expected a value at {self.buffer[index:index + 1]!r}") from None
+                continue
+            except ValueError:
+                # the value is cut by the end of the chunk, or malformed
+                if not self.read_more():
+                    raise self.error("Truncated or malformed value") from None
+                continue
+            if end == len(self.buffer) and self.read_more():
+                # a number may be cut by the end of the chunk
+                continue
+            self.position = end
+            return value
+
+    def skip_value(self):
+        """
+        Move past the JSON value at the position without decoding it
+        """
+        character = self.peek()
+        if character == '"':
+            self.position += 1
+            self._skip_string()
+        elif character in ('{', '['):
+            depth = 0
+            while True:
+                match = _STRUCTURE.search(self.buffer, self.position)
+                if match is None:
+                    self.position = len(self.buffer)
+                    if not self.read_more():
+                        raise self.error("Truncated value")
+                    continue
+                self.position = match.end()
+                if match.group() == '"':
+                    self._skip_string()
+                    continue
+                depth += 1 if match.group() in '[{' else -1
+                if not depth:
+                    return
+        elif character:
+            while True:
+                match = _SCALAR_END.search(self.buffer, self.position)
+                if match is not None or not self.read_more():
+                    break
+            end = match.start() if match is not None else len(self.buffer)
+            if end == self.position:
+                raise self.error(f"Expected a value at {character!r}")
+            self.position = end
+        else:
+            raise self.error("Truncated file")
+
+    def _skip_string(self):
+        while True:
+            match = _STRING_END.search(self.buffer, self.position)
+            if match is None or (match.group() == '\\' and match.end() == len(self.buffer)):
+                self.position = len(self.buffer) if match is None else match.start()
+                if not self.read_more():
+                    raise self.error("Truncated string")
+                continue
+            if match.group() == '"':
+                self.position = match.end()
+                return
+            # an escaped character
+            self.position = match.end() + 1
+
+
+def iter_records(path, key, factory=compact_record, chunk_size=CHUNK_SIZE):
+    """
+    Yield one by one the records of the array `key` of a JSON file such as
+    {"clubs": [{...}, {...}]}, reading the file by chunks so that neither
+    the whole text nor the whole list of records is ever held in memory.
+    Only a key of the top-level object is looked for, the values of the
+    other keys are skipped without being decoded. Raises ValueError for a
+    malformed file or an element of the array that is not an object.
+    """
+    token = json.dumps(key)
+    with open(path, encoding='utf-8') as json_file:
+        reader = _ChunkReader(json_file, path, chunk_size)
+        reader.expect('{')
+        if reader.peek() == '}':
+            raise reader.error(f"No array {token} found")
+        while True:
+            if reader.peek() != '"':
+                raise reader.error("Expected a key")
+            name = reader.value()
+            reader.expect(':')
+            if name == key:
+                break
+            reader.skip_value()
+            if reader.expect(',}') == '}':
+                raise reader.error(f"No array {token} found")
+        if reader.peek() != '[':
+            raise reader.error(f"{token} is not an array")
+        reader.position += 1
+        if reader.peek() == ']':
+            return
+        scan_once = reader.scan_once
+        failed_buffer = None
+        while True:
+            # the records up to the last '}' of the chunk are decoded as one
+            # array in one call, which only succeeds when that '}' ends a
+            # record : else, and for the record cut by the end of the
+            # chunk, one by one until the next chunk
+            buffer = reader.buffer
+            records = None
+            cut = buffer.rfind('}', reader.position) + 1
+            if buffer is not failed_buffer and cut > reader.position:
+                text = '[' + buffer[reader.position:cut] + ']'
+                try:
+                    records, end = scan_once(text, 0)
+                    if end != len(text):
+                        # the '}' of the top-level object, after the array
+                        records = None
+                except (StopIteration, ValueError):
+                    pass
+                if records is None or not all(isinstance(record, dict) for record in records):
+                    records, failed_buffer = None, buffer
+            if records is None:
+                records = [reader.value()]
+                if not isinstance(records[0], dict):
+                    raise reader.error(f"Element of array {token} is not an object")
+            else:
+                reader.position = cut
+            for record in records:
+                yield factory(record)
+            if reader.expect(',]') == ']':
+                return
+
+
+def load_records(path, key, factory=compact_record):
+    return list(iter_records(path, key, factory))
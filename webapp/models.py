@@ -0,0 +1,158 @@
+from datetime import datetime
+
+
+class Record:
+    """
+    Base class of the typed records.
+
+    Records keep their fields in `__slots__` (no per-instance dict) and hold
+    native values parsed once at load time. They still support the mapping
+    access used by the views and the templates (`club['points']`,
+    `'name' in club`) so that both keep working unchanged.
+
+    `revision` is incremented by every item assignment, so that anything
+    derived from a record (e.g. its serialized JSON) can be cached until the
+    record changes.
+
+    `snapshot()` is a read-only copy of the record as it is now, shared by
+    the sorted indexes : a listing renders rows that no booking can change
+    under it.
+    """
+
+    __slots__ = ('revision', '_row')
+    FIELDS = ()
+    # read-only class of the snapshots, and the slots they copy
+    ROW = None
+    COPIED = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.COPIED = tuple(slot for klass in reversed(cls.__mro__) for slot in getattr(klass, '__slots__', ())
+                           if slot != '_row')
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+        self.revision += 1
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def keys(self):
+        return self.FIELDS
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def snapshot(self):
+        row = self._row
+        if row is None or row.revision != self.revision:
+            row = object.__new__(self.ROW)
+            for slot in self.COPIED:
+                setattr(row, slot, getattr(self, slot))
+            self._row = row
+        return row
+
+    def to_dict(self):
+        """
+        Record as found in the JSON files, numbers written as strings
+        """
+        return {key: str(self[key]) for key in self.FIELDS}
+
+    def __repr__(self):
+        fields = ', '.join(f'{key}={self[key]!r}' for key in self.FIELDS)
+        return f'{type(self).__name__}({fields})'
+
+
+class Club(Record):
+
+    __slots__ = ('name', 'email', 'points')
+    FIELDS = ('name', 'email', 'points')
+
+    def __init__(self, name, email, points):
+        self.revision = 0
+        self._row = None
+        self.name = name
+        self.email = email
+        self.points = int(points)
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(record['name'], record['email'], record['points'])
+
+
+class Competition(Record):
+
+    __slots__ = ('name', '_date', 'numberOfPlaces', 'datetime', 'date_error')
+    FIELDS = ('name', 'date', 'numberOfPlaces')
+
+    def __init__(self, name, date, numberOfPlaces):
+        self.revision = 0
+        self._row = None
+        self.name = name
+        self.date = date
+        self.numberOfPlaces = int(numberOfPlaces)
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(record['name'], record['date'], record['numberOfPlaces'])
+
+    @property
+    def date(self):
+        return self._date
+
+    @date.setter
+    def date(self, value):
+        """
+        Keep the date as written in the file for display and parse it once
+        """
+        self._date = value
+        try:
+            self.datetime = datetime.fromisoformat(value)
+            self.date_error = None
+        except ValueError as date_exception:
+            self.datetime = None
+            self.date_error = str(date_exception)
+
+    def get_datetime(self):
+        """
+        Parsed date of the competition, raises ValueError when the date of the
+        file is not a valid ISO format date
+        """
+        if self.date_error is not None:
+            raise ValueError(self.date_error)
+        return self.datetime
+
+
+class Row:
+    """
+    Read-only snapshot of a record
+    """
+
+    __slots__ = ()
+
+    def __setitem__(self, key, value):
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    def snapshot(self):
+        return self
+
+
+class ClubRow(Row, Club):
+
+    __slots__ = ()
+
+
+class CompetitionRow(Row, Competition):
+
+    __slots__ = ()
+
+
+Club.ROW = ClubRow
+Competition.ROW = CompetitionRow
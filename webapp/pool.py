@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections.
+
+    A thread (a greenlet under gevent, whose monkey patching makes
+    `threading.get_ident` return the greenlet id) checks a connection out
+    for the duration of a `with pool.connection()` block ; nested blocks of
+    the same thread get the same connection back, so a transaction and the
+    queries run inside it share it. A released connection is handed back in
+    priority to the thread that used it last, whose statements are already
+    in its cache (`cached_statements` prepared statements per connection).
+    At most `size` connections are opened : beyond that, threads wait for
+    one to be released, and the time they waited is counted in the stats.
+    """
+
+    def __init__(self, path, size=8, cached_statements=128, timeout=30):
+        self.path = path
+        self.size = size
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = []
+        self._held = {}
+        self._last_owner = {}
+        self.connections = 0
+        self.checkouts = 0
+        self.misses = 0
+        self.affinity_hits = 0
+        self.waits = 0
+        self.wait_time = 0.0
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                     check_same_thread=False, cached_statements=self.cached_statements)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _acquire(self, owner):
+        with self._condition:
+            # connections must not cross a fork : workers open their own
+            if self._pid != os.getpid():
+                self._reset()
+            self.checkouts += 1
+            started = None
+            while not self._idle and self.connections >= self.size:
+                if started is None:
+                    started = time.perf_counter()
+                    self.waits += 1
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    self.wait_time += time.perf_counter() - started
+                    raise TimeoutError(f"No connection released within {self.timeout}s")
+            if started is not None:
+                self.wait_time += time.perf_counter() - started
+            for position, connection in enumerate(self._idle):
+                if self._last_owner.get(id(connection)) == owner:
+                    self.affinity_hits += 1
+                    return self._idle.pop(position)
+            if self._idle:
+                return self._idle.pop()
+            self.misses += 1
+            self.connections += 1
+        try:
+            return self._connect()
+        except BaseException:
+            with self._condition:
+                self.connections -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, owner, connection):
+        with self._condition:
+            self._last_owner[id(connection)] = owner
+            self._idle.append(connection)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        owner = threading.get_ident()
+        held = self._held.get(owner)
+        if held is not None and self._pid == os.getpid():
+            held[1] += 1
+            try:
+                yield held[0]
+            finally:
+                held[1] -= 1
+            return
+        connection = self._acquire(owner)
+        self._held[owner] = [connection, 1]
+        try:
+            yield connection
+        finally:
+            del self._held[owner]
+            self._release(owner, connection)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self.size,
+                'connections': self.connections,
+                'in_use': len(self._held),
+                'idle': len(self._idle),
+                'checkouts': self.checkouts,
+                'misses': self.misses,
+                'affinity_hits': self.affinity_hits,
+                'waits': self.waits,
+                'wait_time': self.wait_time,
+            }
+
+
+class PooledStore:
+    """
+    Store interface of the BookingEngine over the points of the `clubs`
+    table and the places of the `competitions` table of the database of
+    `self.pool`, shared by the SQLite storage and the shared state
+    """
+
+    pool = None
+
+    @contextmanager
+    def transaction(self):
+        with self.pool.connection() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            else:
+                connection.execute('COMMIT')
+
+    def refresh(self, club, competitions):
+        """
+        Load the stored values of a club and competitions into the records,
+        inside a booking transaction
+        """
+        with self.pool.connection() as connection:
+            row = connection.execute('SELECT points FROM clubs WHERE name = ?', (club['name'],)).fetchone()
+            if row is not None:
+                club['points'] = row[0]
+            for competition in competitions:
+                row = connection.execute('SELECT places FROM competitions WHERE name = ?',
+                                         (competition['name'],)).fetchone()
+                if row is not None:
+                    competition['numberOfPlaces'] = row[0]
@@ -0,0 +1,176 @@
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+try:
+    from greenlet import getcurrent as current_task
+except ImportError:
+    current_task = threading.current_thread
+
+
+# Profiles being recorded, by the greenlet (or the thread) of their request.
+# sys.setprofile hooks a whole OS thread, which runs many greenlets with
+# gevent : one hook per OS thread dispatches each event to the profile of
+# the greenlet it comes from.
+_profiles = {}
+_hooked_threads = Counter()
+_hooks_lock = threading.Lock()
+
+
+def _dispatch(frame, event, arg):
+    profile = _profiles.get(current_task())
+    if profile is not None:
+        profile._callback(frame, event, arg)
+
+
+class phase:
+    """
+    Label the time spent inside the block (lookup, validation, mutation,
+    render...) in the profile of the current request. Costs one dictionary
+    lookup when the request is not profiled.
+    """
+
+    __slots__ = ('name', 'previous', 'profile')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.profile = _profiles.get(current_task())
+        if self.profile is not None:
+            self.previous = self.profile.switch(self.name)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profile is not None:
+            self.profile.switch(self.previous)
+
+
+def set_phase(name):
+    """
+    Switch the phase of the current request without a block, returns the
+    previous one (None when the request is not profiled)
+    """
+    profile = _profiles.get(current_task())
+    return profile.switch(name) if profile is not None else None
+
+
+def frame_name(code):
+    module = code.co_filename.rsplit('/', 1)[-1]
+    return f"{code.co_name} ({module}:{code.co_firstlineno})"
+
+
+class RequestProfile:
+    """
+    Call stacks of one request, traced with sys.setprofile : the time
+    between two events is charged to the stack (prefixed by the current
+    phase) that was running, as in a collapsed-stack file where the weight
+    of a stack is its self time in microseconds.
+    """
+
+    def __init__(self, phase_name='request', clock=time.perf_counter):
+        self.clock = clock
+        self.phase = phase_name
+        self.stacks = Counter()
+        self._stack = []
+        self._keys = []
+        self._last = clock()
+
+    def _charge(self, now):
+        self.stacks[';'.join([self.phase] + self._stack)] += now - self._last
+        self._last = now
+
+    def _callback(self, frame, event, arg):
+        self._charge(self.clock())
+        if event == 'call':
+            self._stack.append(frame_name(frame.f_code))
+            self._keys.append(frame)
+        elif event == 'c_call':
+            self._stack.append(f"{getattr(arg, '__qualname__', arg)} (builtin)")
+            self._keys.append(arg)
+        elif self._keys and self._keys[-1] is (frame if event == 'return' else arg):
+            self._stack.pop()
+            self._keys.pop()
+        # leave the time spent in this callback out of the profile
+        self._last = self.clock()
+
+    def switch(self, name):
+        self._charge(self.clock())
+        previous, self.phase = self.phase, name
+        return previous
+
+    def start(self):
+        # frames already running, this one included
+        frame = sys._getframe()
+        while frame is not None:
+            self._stack.insert(0, frame_name(frame.f_code))
+            self._keys.insert(0, frame)
+            frame = frame.f_back
+        self._last = self.clock()
+        self._thread = threading.get_native_id()
+        _profiles[current_task()] = self
+        with _hooks_lock:
+            _hooked_threads[self._thread] += 1
+            if _hooked_threads[self._thread] == 1:
+                sys.setprofile(_dispatch)
+
+    def stop(self):
+        # the hook stays while another request of this OS thread is profiled
+        with _hooks_lock:
+            _hooked_threads[self._thread] -= 1
+            if not _hooked_threads[self._thread]:
+                del _hooked_threads[self._thread]
+                sys.setprofile(None)
+        _profiles.pop(current_task(), None)
+        self._charge(self.clock())
+        self._keys = []
+
+
+class SamplingProfiler:
+    """
+    Profiles a random fraction of the requests and adds up their stacks,
+    to be downloaded as a collapsed-stack file (flamegraph.pl, speedscope).
+    At most `max_stacks` distinct stacks are kept, the time of the others
+    is added to a truncated stack.
+    """
+
+    def __init__(self, sample_rate=0.0, max_stacks=100000, seed=None):
+        self.sample_rate = sample_rate
+        self.max_stacks = max_stacks
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+
+    def sample(self):
+        """
+        A started RequestProfile for a sampled request, None otherwise
+        """
+        if self.sample_rate <= 0 or self._random.random() >= self.sample_rate:
+            return None
+        profile = RequestProfile()
+        profile.start()
+        return profile
+
+    def add(self, profile):
+        with self._lock:
+            self.requests += 1
+            for stack, seconds in profile.stacks.items():
+                if stack not in self._stacks and len(self._stacks) >= self.max_stacks:
+                    stack = stack.split(';', 1)[0] + ';[truncated]'
+                self._stacks[stack] += seconds
+
+    def collapsed(self):
+        """
+        One `frame;frame;frame microseconds` line per stack
+        """
+        with self._lock:
+            stacks = sorted(self._stacks.items())
+        return ''.join(f"{stack} {round(seconds * 1e6)}\n" for stack, seconds in stacks if seconds >= 5e-7)
+
+    def clear(self):
+        with self._lock:
+            self.requests = 0
+            self._stacks.clear()
@@ -0,0 +1,276 @@
+import itertools
+import threading
+from datetime import datetime
+from .indexes import SortedIndex
+
+
+CLUB_SORTS = {
+    'name': lambda club: (club['name'],),
+    'points': lambda club: (club['points'], club['name']),
+}
+
+# only competitions with a valid date are indexed by date
+COMPETITION_SORTS = {
+    'name': lambda competition: (competition['name'],),
+    'date': lambda competition: (competition.datetime, competition['name']),
+}
+
+
+def _row(record):
+    return record.snapshot()
+
+
+class RegistrySnapshot:
+    """
+    Version of the standings and of the bookable competitions : the sorted
+    indexes as they were when it was taken, read without any lock while
+    bookings publish newer versions
+    """
+
+    __slots__ = ('version', 'club_indexes', 'competition_indexes')
+
+    def __init__(self, version, club_indexes, competition_indexes):
+        self.version = version
+        self.club_indexes = club_indexes
+        self.competition_indexes = competition_indexes
+
+    def clubs_page(self, sort, offset, limit, reverse=False):
+        page = self.club_indexes[sort].page(offset, limit, reverse)
+        page.sort, page.order = sort, 'desc' if reverse else 'asc'
+        return page
+
+    def competitions_page(self, sort, offset, limit, reverse=False):
+        page = self.competition_indexes[sort].page(offset, limit, reverse)
+        page.sort, page.order = sort, 'desc' if reverse else 'asc'
+        return page
+
+
+class Registry:
+    """
+    In-memory registry of clubs and competitions.
+
+    Keeps the loaded lists (in file order) alongside hash indexes on club
+    name, club email and competition name, so that every lookup done by the
+    views is a constant-time dict access instead of a linear scan.
+
+    Listings are served from sorted indexes (see CLUB_SORTS and
+    COMPETITION_SORTS) that are updated record by record. The competition
+    indexes only hold the bookable competitions : a valid date (flagged once
+    at load), not archived yet and places left. `upcoming` keeps every valid
+    competition not archived yet in time order, so that
+    `archive_past_competitions` only has to look at its head to move the
+    competitions that just started into `archived`.
+
+    `version` identifies the state of points and places : it is bumped by
+    every booking and is used to key the caches of rendered pages and the
+    ETags. When the state is shared by several processes `shared_version`
+    returns the last shared change applied, and the version is built from
+    it instead of a counter of the process, so that processes serving the
+    same state tag it the same.
+
+    Listings hold read-only rows (see Record.snapshot) and `snapshot()`
+    hands out, in O(1), the version and the trees of the sorted indexes :
+    a page is rendered from it while bookings go on, without blocking them
+    nor being blocked.
+    """
+
+    def __init__(self, clubs, competitions, now=None):
+        self._versions = itertools.count(1)
+        self.version = next(self._versions)
+        self.shared_version = None
+        # stamp of the files last applied by a hot reload, 0 for those loaded
+        # at startup
+        self.files_version = 0
+        self.clubs = []
+        self.competitions = []
+        self.clubs_by_name = {}
+        self.clubs_by_email = {}
+        self.competitions_by_name = {}
+        for club in clubs:
+            self._register_club(club)
+        for competition in competitions:
+            self._register_competition(competition)
+        self.club_indexes = {sort: SortedIndex(key, self.clubs, _row) for sort, key in CLUB_SORTS.items()}
+        self.now = now or datetime.now()
+        self.archived = {}
+        self._calendar_lock = threading.Lock()
+        upcoming = []
+        for competition in self.competitions:
+            if competition.datetime is None:
+                continue
+            if competition.datetime < self.now:
+                self.archived[competition['name']] = competition
+            else:
+                upcoming.append(competition)
+        self.upcoming = SortedIndex(COMPETITION_SORTS['date'], upcoming)
+        bookable = [competition for competition in upcoming if competition['numberOfPlaces'] > 0]
+        self.competition_indexes = {sort: SortedIndex(key, bookable, _row)
+                                    for sort, key in COMPETITION_SORTS.items()}
+
+    def _register_club(self, club):
+        self.clubs.append(club)
+        self.clubs_by_name[club['name']] = club
+        self.clubs_by_email[club['email']] = club
+
+    def _register_competition(self, competition):
+        self.competitions.append(competition)
+        self.competitions_by_name[competition['name']] = competition
+
+    def add_club(self, club):
+        self._register_club(club)
+        for index in self.club_indexes.values():
+            index.add(club)
+
+    def add_competition(self, competition):
+        self._register_competition(competition)
+        self.reindex_competition(competition)
+
+    def remove_club(self, club):
+        self.clubs.remove(club)
+        del self.clubs_by_name[club['name']]
+        if self.clubs_by_email.get(club['email']) is club:
+            del self.clubs_by_email[club['email']]
+        for index in self.club_indexes.values():
+            index.discard(club)
+
+    def remove_competition(self, competition):
+        self.competitions.remove(competition)
+        del self.competitions_by_name[competition['name']]
+        with self._calendar_lock:
+            self.archived.pop(competition['name'], None)
+            self.upcoming.discard(competition)
+            for index in self.competition_indexes.values():
+                index.discard(competition)
+
+    def reindex_club(self, club):
+        for index in self.club_indexes.values():
+            index.update(club)
+
+    def reindex_competition(self, competition):
+        """
+        Put the competition back in (or out of) the calendar and the bookable
+        indexes after its date or its places changed
+        """
+        with self._calendar_lock:
+            self.archived.pop(competition['name'], None)
+            if competition.datetime is None:
+                self.upcoming.discard(competition)
+            elif competition.datetime < self.now:
+                self.upcoming.discard(competition)
+                self.archived[competition['name']] = competition
+            else:
+                self.upcoming.update(competition)
+            bookable = competition['name'] not in self.archived and competition.datetime is not None \
+                and competition['numberOfPlaces'] > 0
+            for index in self.competition_indexes.values():
+                if bookable:
+                    index.update(competition)
+                else:
+                    index.discard(competition)
+
+    def archive_past_competitions(self, now=None):
+        """
+        Move the competitions started before `now` out of the bookable
+        indexes. Only the expired competitions are looked at. The version is
+        bumped when one moves, the listings being tagged with it.
+        """
+        now = now or datetime.now()
+        moved = False
+        with self._calendar_lock:
+            self.now = max(self.now, now)
+            while True:
+                competition = self.upcoming.first()
+                if competition is None or competition.datetime >= self.now:
+                    break
+                self.upcoming.discard(competition)
+                self.archived[competition['name']] = competition
+                for index in self.competition_indexes.values():
+                    index.discard(competition)
+                moved = True
+        if moved:
+            self.bump_version()
+
+    def is_archived(self, competition):
+        return competition['name'] in self.archived
+
+    def snapshot(self):
+        # the version first : the trees may be newer than it, never older,
+        # so a page cached under a version is never staler than the version
+        version = self.version
+        return RegistrySnapshot(version, {sort: index.snapshot() for sort, index in self.club_indexes.items()},
+                                {sort: index.snapshot() for sort, index in self.competition_indexes.items()})
+
+    def clubs_page(self, sort, offset, limit, reverse=False):
+        return self.snapshot().clubs_page(sort, offset, limit, reverse)
+
+    def competitions_page(self, sort, offset, limit, reverse=False):
+        return self.snapshot().competitions_page(sort, offset, limit, reverse)
+
+    def update_club(self, club, **fields):
+        """
+        Update fields of a registered club, keeping the indexes in sync when
+        the name or the email changes
+        """
+        if 'name' in fields and fields['name'] != club['name']:
+            del self.clubs_by_name[club['name']]
+            self.clubs_by_name[fields['name']] = club
+        if 'email' in fields and fields['email'] != club['email']:
+            del self.clubs_by_email[club['email']]
+            self.clubs_by_email[fields['email']] = club
+        for key, value in fields.items():
+            club[key] = value
+        self.reindex_club(club)
+
+    def update_competition(self, competition, **fields):
+        """
+        Update fields of a registered competition, keeping the name index in
+        sync when the name changes
+        """
+        if 'name' in fields and fields['name'] != competition['name']:
+            del self.competitions_by_name[competition['name']]
+            self.archived.pop(competition['name'], None)
+            self.competitions_by_name[fields['name']] = competition
+        for key, value in fields.items():
+            competition[key] = value
+        self.reindex_competition(competition)
+
+    def bump_version(self):
+        if self.shared_version is None:
+            self.version = next(self._versions)
+        else:
+            # the same in every process : the shared changes applied, the
+            # competitions archived (always the earliest ones) and the files
+            self.version = f'{self.shared_version()}.{len(self.archived)}.{self.files_version}'
+        return self.version
+
+    def state(self):
+        """
+        Booking-mutable state : points by club name and places by
+        competition name
+        """
+        return {
+            'clubs': {club['name']: club['points'] for club in self.clubs},
+            'competitions': {competition['name']: competition['numberOfPlaces']
+                             for competition in self.competitions},
+        }
+
+    # Lookups raise IndexError like the former `[...][0]` list scans did, so
+    # the views keep handling unknown names the same way.
+
+    def get_club_by_name(self, name):
+        try:
+            return self.clubs_by_name[name]
+        except KeyError:
+            raise IndexError(f"Unknown club {name}") from None
+
+    def get_club_by_email(self, email):
+        try:
+            return self.clubs_by_email[email]
+        except KeyError:
+            raise IndexError(f"Unknown email {email}") from None
+
+    def get_competition_by_name(self, name):
+        try:
+            return self.competitions_by_name[name]
+        except KeyError:
+            raise IndexError(f"Unknown competition {name}") from None
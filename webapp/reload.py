@@ -0,0 +1,260 @@
+import os
+import threading
+import zlib
+from contextlib import nullcontext
+from blinker import Namespace
+from .loaders import iter_records
+from .models import Club, Competition
+
+
+_signals = Namespace()
+
+# Sent once a reload is applied, with the removed clubs and competitions
+data_reloaded = _signals.signal('data-reloaded')
+
+
+class ReadWriteLock:
+    """
+    Many readers or one writer. Requests hold the read side, a reload holds
+    the write side, so a request sees the state before or after a reload
+    but never in between. A waiting writer stops new readers from entering,
+    so that a stream of requests cannot delay a reload forever.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._condition:
+            while self._writing or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        with self._condition:
+            self._writers_waiting += 1
+            try:
+                while self._writing or self._readers:
+                    self._condition.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writing = True
+
+    def release_write(self):
+        with self._condition:
+            self._writing = False
+            self._condition.notify_all()
+
+
+def read_file(path, key, record_class):
+    """
+    Field values of the records of a JSON file, as written in the file, by
+    record name. Raises ValueError for a malformed file.
+    """
+    try:
+        return {record['name']: tuple(str(record[field]) for field in record_class.FIELDS)
+                for record in iter_records(path, key)}
+    except (KeyError, TypeError) as error:
+        raise ValueError(f"Malformed record in {path} : {error!r}") from None
+
+
+def diff_records(previous, current):
+    """
+    Names of the added and removed records, and the changed fields (as in
+    the file) of the other ones by name
+    """
+    added = [name for name in current if name not in previous]
+    removed = [name for name in previous if name not in current]
+    changed = {}
+    for name, values in current.items():
+        old_values = previous.get(name)
+        if old_values is not None and old_values != values:
+            changed[name] = [position for position, (old, new) in enumerate(zip(old_values, values)) if old != new]
+    return added, removed, changed
+
+
+class DataReloader:
+    """
+    Applies the changes of the clubs and competitions files to the registry
+    without a restart.
+
+    The files are diffed against the files read last time, not against the
+    registry : points and places spent by bookings since then are kept,
+    only the records and the fields that changed in the files are applied.
+    Added records are registered, removed ones unregistered and changed
+    fields updated, each through the registry so that its hash and sorted
+    indexes are maintained record by record. The whole diff is applied
+    under the write side of `lock`, then the version is bumped so the
+    cached pages of the previous state are no longer served.
+
+    Points and places changed by the files are written to the shared state
+    (so that the other workers pull them instead of resyncing the previous
+    values) and the journal is compacted, so that a restart does not replay
+    the values of the bookings made before the reload over them.
+    """
+
+    def __init__(self, registry, clubs_path, competitions_path, lock=None, shared_state=None, engine=None,
+                 journal=None):
+        self.registry = registry
+        self.clubs_path = clubs_path
+        self.competitions_path = competitions_path
+        self.lock = lock or ReadWriteLock()
+        self.shared_state = shared_state
+        self.engine = engine
+        self.journal = journal
+        self._reload_lock = threading.Lock()
+        self._stamps = self._file_stamps()
+        self.clubs = read_file(clubs_path, 'clubs', Club)
+        self.competitions = read_file(competitions_path, 'competitions', Competition)
+        self.reloads = 0
+
+    def _file_stamps(self):
+        stamps = []
+        for path in (self.clubs_path, self.competitions_path):
+            stat = os.stat(path)
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+        return stamps
+
+    def changed(self):
+        """
+        True when a file was written since it was last read
+        """
+        return self._file_stamps() != self._stamps
+
+    def reload(self):
+        """
+        Read the files and apply what changed since the last read. Returns
+        the number of added, removed and changed records of each file.
+        Raises ValueError for a malformed file, nothing being applied then.
+        """
+        with self._reload_lock:
+            stamps = self._file_stamps()
+            clubs = read_file(self.clubs_path, 'clubs', Club)
+            competitions = read_file(self.competitions_path, 'competitions', Competition)
+            # parsed before the lock is taken, a bad value aborts the reload
+            club_changes = self._changes(diff_records(self.clubs, clubs), clubs, Club)
+            competition_changes = self._changes(diff_records(self.competitions, competitions), competitions,
+                                                Competition)
+            points = self._values(club_changes, 'points')
+            places = self._values(competition_changes, 'numberOfPlaces')
+            # one transaction for the SQLite storage, so that the other
+            # processes do not see a half-applied diff either
+            transaction = getattr(self.registry, 'transaction', nullcontext)
+            self.lock.acquire_write()
+            try:
+                with transaction():
+                    # the same in every process that applied the same files
+                    self.registry.files_version = zlib.crc32(repr(stamps).encode())
+                    removed_clubs = self._apply(club_changes, self.registry.get_club_by_name,
+                                                self.registry.add_club, self.registry.remove_club,
+                                                self.registry.update_club)
+                    removed_competitions = self._apply(competition_changes, self.registry.get_competition_by_name,
+                                                       self.registry.add_competition,
+                                                       self.registry.remove_competition,
+                                                       self.registry.update_competition)
+                    if self.shared_state is not None:
+                        # the shared points and places stay those of the
+                        # bookings, but for the ones the files changed
+                        self.shared_state.publish(points, places)
+                        self.shared_state.initialize(self.registry, self.engine)
+                    else:
+                        self.registry.bump_version()
+            finally:
+                self.lock.release_write()
+            if self.journal is not None and (points or places):
+                self.journal.compact()
+            self.clubs, self.competitions, self._stamps = clubs, competitions, stamps
+            self.reloads += 1
+        data_reloaded.send(self, clubs=removed_clubs, competitions=removed_competitions)
+        return {
+            'clubs': {kind: len(names) for kind, names in zip(('added', 'removed', 'changed'), club_changes)},
+            'competitions': {kind: len(names)
+                             for kind, names in zip(('added', 'removed', 'changed'), competition_changes)},
+        }
+
+    @staticmethod
+    def _changes(diff, records, record_class):
+        """
+        Added records, removed names and changed fields by name, with their
+        values parsed
+        """
+        added, removed, changed = diff
+        try:
+            added_records = [record_class(*records[name]) for name in added]
+            changed_fields = {}
+            for name, positions in changed.items():
+                parsed = record_class(*records[name])
+                changed_fields[name] = {record_class.FIELDS[position]: parsed[record_class.FIELDS[position]]
+                                        for position in positions}
+        except ValueError as error:
+            raise ValueError(f"Invalid {record_class.__name__.lower()} : {error}") from None
+        return added_records, removed, changed_fields
+
+    @staticmethod
+    def _values(changes, field):
+        """
+        Value of a field by record name, for the added records and the
+        changed ones whose field changed
+        """
+        added, removed, changed = changes
+        values = {record['name']: record[field] for record in added}
+        values.update((name, fields[field]) for name, fields in changed.items() if field in fields)
+        return values
+
+    @staticmethod
+    def _apply(changes, get, add, remove, update):
+        added, removed, changed = changes
+        removed_records = []
+        for name in removed:
+            try:
+                record = get(name)
+            except IndexError:
+                continue
+            remove(record)
+            removed_records.append(record)
+        for record in added:
+            try:
+                existing = get(record['name'])
+            except IndexError:
+                add(record)
+            else:
+                update(existing, **{field: record[field] for field in record.FIELDS})
+        for name, fields in changed.items():
+            try:
+                update(get(name), **fields)
+            except IndexError:
+                continue
+        return removed_records
+
+
+class ReloadWatcher(threading.Thread):
+    """
+    Reloads the files every `interval` seconds when they were written
+    """
+
+    def __init__(self, reloader, interval):
+        super().__init__(name='gudlft-reload', daemon=True)
+        self.reloader = reloader
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                if self.reloader.changed():
+                    self.reloader.reload()
+            except (OSError, ValueError):
+                # a file being written, the next check reads it again
+                continue
+
+    def stop(self):
+        self._stopped.set()
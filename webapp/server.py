@@ -1,8 +1,27 @@
+import atexit
 import os
-import json
 import logging
+import time
+import click
 from datetime import datetime
-from flask import Flask, flash, render_template, request, redirect, session, url_for
+from flask import (Flask, abort, before_render_template, flash, g, render_template, request, redirect, session,
+                   template_rendered, url_for)
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+from .assets import AssetManifest, build_assets
+from .booking import BookingEngine, booking_completed, booking_failed, booking_locked
+from .cache import RenderedPageCache
+from .journal import BookingJournal
+from .ledger import BookingLedger
+from .live import Broadcaster
+from .loaders import load_records
+from .metrics import MetricsRegistry
+from .profiling import SamplingProfiler, phase, set_phase
+from .models import Club, Competition
+from .registry import CLUB_SORTS, COMPETITION_SORTS, Registry
+from .reload import DataReloader, ReloadWatcher
+from .shared_state import PullWatcher, SharedState, changes_pulled
+from .sqlite_storage import SqliteRegistry
 
 
 app = Flask(__name__)
@@ -13,33 +32,335 @@ log = logging.getLogger('werkzeug')
 log.disabled = True
 app.logger.disabled = True
 
+if app.config['TEMPLATE_CACHE_DIR']:
+    os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR'])
+
 def loadClubs():
-    with open(os.path.join(app.config['BASE_DIR'], os.path.dirname(__file__), 'clubs.json')) as c:
-         listOfClubs = json.load(c)['clubs']
-         return listOfClubs
+    return load_records(app.config['CLUBS_FILE'], 'clubs', Club.from_record)
 
 
 def loadCompetitions():
-    with open(os.path.join(app.config['BASE_DIR'], os.path.dirname(__file__), 'competitions.json')) as comps:
-         listOfCompetitions = json.load(comps)['competitions']
-         return listOfCompetitions
+    return load_records(app.config['COMPETITIONS_FILE'], 'competitions', Competition.from_record)
+
+
+if app.config['STORAGE'] == 'sqlite':
+    registry = SqliteRegistry(app.config['STORAGE_DB'], pool_size=app.config['DB_POOL_SIZE'],
+                              cached_statements=app.config['DB_CACHED_STATEMENTS'])
+    if not len(registry.clubs):
+        registry.import_json(app.config['CLUBS_FILE'], app.config['COMPETITIONS_FILE'])
+else:
+    registry = Registry(loadClubs(), loadCompetitions())
+competitions = registry.competitions
+clubs = registry.clubs
+# the SQLite storage is durable and shared by the processes by itself
+store = registry if isinstance(registry, SqliteRegistry) else None
+shared_state = None
+if app.config['SHARED_STATE_DB'] and store is None:
+    shared_state = store = SharedState(app.config['SHARED_STATE_DB'], pool_size=app.config['DB_POOL_SIZE'],
+                                       cached_statements=app.config['DB_CACHED_STATEMENTS'])
+# with a store the totals of the ledger live in its database, otherwise the
+# journal makes them durable
+ledger = BookingLedger(app.config['BOOKING_LEDGER'] if store is None else None,
+                       keep=app.config['BOOKING_LEDGER_KEEP'], pool=store.pool if store is not None else None)
+atexit.register(ledger.close)
+journal = None
+# a journal belongs to one process, the store keeps the bookings of all of them
+if app.config['BOOKING_JOURNAL'] and store is None:
+    fsync = os.fsync
+    if app.config['GEVENT']:
+        from .green import offload
+        fsync = offload(os.fsync)
+    journal = BookingJournal(app.config['BOOKING_JOURNAL'], registry.state,
+                             compact_every=app.config['BOOKING_JOURNAL_COMPACT_EVERY'], fsync=fsync,
+                             ledger=ledger)
+    journal.replay(registry)
+engine = BookingEngine(app.config['MAX_BOOKING_PLACES'], journal=journal, store=store, ledger=ledger)
+if shared_state is not None:
+    shared_state.initialize(registry, engine)
+reloader = None
+reload_watcher = None
+if app.config['RELOAD']:
+    reloader = DataReloader(registry, app.config['CLUBS_FILE'], app.config['COMPETITIONS_FILE'],
+                            shared_state=shared_state, engine=engine, journal=journal)
+    if app.config['RELOAD_INTERVAL'] > 0:
+        reload_watcher = ReloadWatcher(reloader, app.config['RELOAD_INTERVAL'])
+        reload_watcher.start()
+pull_watcher = None
+if shared_state is not None and app.config['LIVE_FEED'] and app.config['SHARED_STATE_PULL_INTERVAL'] > 0:
+    pull_watcher = PullWatcher(shared_state, registry, engine, app.config['SHARED_STATE_PULL_INTERVAL'],
+                               lock=reloader.lock if reloader is not None else None)
+    pull_watcher.start()
+page_cache = RenderedPageCache(app.config['PAGE_CACHE_SIZE'])
+fragment_cache = RenderedPageCache(app.config['FRAGMENT_CACHE_SIZE'])
+broadcaster = Broadcaster(app.config['LIVE_FEED_HISTORY'], app.config['LIVE_FEED_KEEPALIVE'])
+# bytes of the pages that only depend on the templates, rendered on their
+# first request
+static_pages = {}
+assets = AssetManifest(app.config['ASSETS_DIR'])
+
+metrics = MetricsRegistry()
+request_seconds = metrics.histogram('gudlft_request_duration_seconds', "Time to handle a request",
+                                    ('endpoint', 'method'))
+requests_total = metrics.counter('gudlft_requests_total', "Requests handled", ('endpoint', 'method', 'status'))
+template_seconds = metrics.histogram('gudlft_template_render_seconds', "Time to render a template", ('template',))
+lookup_seconds = metrics.histogram('gudlft_lookup_duration_seconds', "Time to look up a club or a competition",
+                                   ('lookup',))
+lock_wait_seconds = metrics.histogram('gudlft_booking_lock_wait_seconds', "Time a booking waited for its locks")
+bookings_total = metrics.counter('gudlft_bookings_total',
+                                 "Competitions booked (success) and bookings refused (failure)", ('result',))
+profiler = SamplingProfiler(app.config['PROFILE_SAMPLE_RATE'])
+
+
+@booking_completed.connect_via(engine)
+def on_booking_completed(sender, club, competition, places):
+    registry.reindex_club(club)
+    registry.reindex_competition(competition)
+    registry.bump_version()
+    bookings_total.inc('success')
+    broadcaster.publish('booking', {'club': club['name'], 'points': club['points'],
+                                    'competition': competition['name'], 'places': competition['numberOfPlaces']})
+
+
+def on_changes_pulled(sender, changes):
+    # points and places booked through the other workers
+    for kind, name, value in changes:
+        if kind == 'club':
+            broadcaster.publish('booking', {'club': name, 'points': value})
+        else:
+            broadcaster.publish('booking', {'competition': name, 'places': value})
+
+
+if shared_state is not None:
+    changes_pulled.connect(on_changes_pulled, sender=shared_state)
+
+
+@booking_locked.connect_via(engine)
+def on_booking_locked(sender, club, wait):
+    lock_wait_seconds.observe(wait)
+
+
+@booking_failed.connect_via(engine)
+def on_booking_failed(sender, club, error):
+    bookings_total.inc('failure')
+
+
+@before_render_template.connect_via(app)
+def on_before_render_template(sender, template, context, **extra):
+    g.render_previous_phase = set_phase('render')
+    g.template_started = time.perf_counter()
+
+
+@template_rendered.connect_via(app)
+def on_template_rendered(sender, template, context, **extra):
+    started = g.pop('template_started', None)
+    if started is not None:
+        template_seconds.observe(time.perf_counter() - started, template.name)
+    previous_phase = g.pop('render_previous_phase', None)
+    if previous_phase is not None:
+        set_phase(previous_phase)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.profile = profiler.sample()
+
+
+@app.teardown_request
+def stop_request_profile(exception):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.stop()
+        profiler.add(profile)
+
+
+@app.after_request
+def record_request(response):
+    started = g.pop('request_started', None)
+    if started is not None and request.endpoint != 'metrics_endpoint':
+        endpoint = request.endpoint or 'unknown'
+        request_seconds.observe(time.perf_counter() - started, endpoint, request.method)
+        requests_total.inc(endpoint, request.method, str(response.status_code))
+    return response
+
+
+@app.before_request
+def hold_registry():
+    # a request sees the registry before or after a reload, never during it.
+    # The admin routes do not read it, and a reload must not wait for itself.
+    if reloader is not None and request.blueprint != 'admin':
+        reloader.lock.acquire_read()
+        g.holds_registry = True
+
+
+@app.teardown_request
+def release_registry(exception):
+    if g.pop('holds_registry', False):
+        reloader.lock.release_read()
+
+
+@app.before_request
+def pull_shared_state():
+    if shared_state is not None:
+        shared_state.pull(registry, engine)
+
+
+@app.cli.command('import-json')
+def import_json():
+    """
+    Import the clubs and competitions of the JSON files into the SQLite storage
+    """
+    if store is not registry:
+        raise click.UsageError("STORAGE is not 'sqlite'")
+    registry.import_json(app.config['CLUBS_FILE'], app.config['COMPETITIONS_FILE'])
+    click.echo(f"{len(registry.clubs)} clubs and {len(registry.competitions)} competitions in {registry.path}")
+
 
+@app.cli.command('compile-templates')
+def compile_templates():
+    """
+    Compile every template into TEMPLATE_CACHE_DIR
+    """
+    names = warm_up()
+    click.echo(f"{len(names)} templates compiled into {app.config['TEMPLATE_CACHE_DIR']}")
 
-competitions = loadCompetitions()
-clubs = loadClubs()
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """
+    Fingerprint and precompress the static files into ASSETS_DIR
+    """
+    manifest = build_assets(app.static_folder, app.config['ASSETS_DIR'])
+    assets.load()
+    static_pages.clear()
+    click.echo(f"{len(manifest['files'])} static files built into {app.config['ASSETS_DIR']}")
+
+
+@app.template_global()
+def asset_url(filename):
+    """
+    URL of the fingerprinted copy of a static file, or of the file itself
+    when the assets are not built
+    """
+    built = assets.files.get(filename)
+    if built is None:
+        return url_for('static', filename=filename)
+    return url_for('asset', filename=built)
+
+
+def reload_data():
+    """
+    Apply what changed in the JSON files, None when the hot reload is off
+    """
+    if reloader is None:
+        return None
+    return reloader.reload()
+
+
+@app.template_global()
+def competition_rows(competitions, club, bookings=None):
+    """
+    Rows of the competitions list of the welcome page, each rendered once
+    per club and per value of its places, date and places booked by the
+    club, then joined from the fragment cache. `bookings` are the places
+    booked by the club by competition name, read from the ledger (a query
+    with a store) once for all the rows.
+    """
+    if bookings is None:
+        bookings = ledger.club_bookings(club['name'])
+    template = app.jinja_env.get_template('competition_row.html')
+    fragments = []
+    for competition in competitions:
+        booked = bookings.get(competition['name'], 0)
+        key = (request.script_root, competition['name'], competition['date'], competition['numberOfPlaces'],
+               club['name'], booked)
+        fragment = fragment_cache.get(key)
+        if fragment is None:
+            fragment = template.render(comp=competition, club=club, booked=booked)
+            fragment_cache.set(key, fragment)
+        fragments.append(fragment)
+    return Markup('\n'.join(fragments))
+
+
+def warm_up():
+    """
+    Load every template (from the bytecode cache, or compiled and stored in
+    it) and build the URL map, so that the first request of a worker costs
+    the same as the next ones. Returns the template names.
+    """
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    with app.test_request_context():
+        url_for('index')
+    return names
 
 
 def get_club_by_name(name):
-    return [c for c in clubs if c['name'] == name][0]
+    with lookup_seconds.time('club_by_name'), phase('lookup'):
+        return registry.get_club_by_name(name)
+
+
+def get_club_by_email(email):
+    with lookup_seconds.time('club_by_email'), phase('lookup'):
+        return registry.get_club_by_email(email)
 
 
 def get_competition_by_name(name):
-    return [c for c in competitions if c['name'] == name][0]
+    with lookup_seconds.time('competition_by_name'), phase('lookup'):
+        return registry.get_competition_by_name(name)
+
+
+def get_listing_args(sorts, default_sort, default_order='asc'):
+    """
+    Sort, order, offset and limit of a listing from the query string
+    """
+    sort = request.args.get('sort', default_sort)
+    if sort not in sorts:
+        sort = default_sort
+    order = request.args.get('order', default_order)
+    if order not in ('asc', 'desc'):
+        order = default_order
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = request.args.get('limit', app.config['PAGE_SIZE'], type=int)
+    limit = min(max(limit, 1), app.config['MAX_PAGE_SIZE'])
+    return sort, order, offset, limit
+
+
+def check_competition_date(competition):
+    """
+    Raise ValueError for a non valid date and AssertionError for a past
+    competition
+    """
+    with phase('validation'):
+        competition.get_datetime()
+        registry.archive_past_competitions(datetime.now())
+        assert not registry.is_archived(competition), "Competition is no longer valid"
+
+
+def render_welcome(club):
+    registry.archive_past_competitions(datetime.now())
+    sort, order, offset, limit = get_listing_args(COMPETITION_SORTS, 'date')
+    page = registry.snapshot().competitions_page(sort, offset, limit, reverse=order == 'desc')
+    bookings = ledger.club_bookings(club['name'])
+    return render_template('welcome.html', club=club, competitions=page.items, page=page,
+                           bookings=bookings, booked=sum(bookings.values()))
 
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    if '_flashes' in session:
+        return render_template('index.html')
+    body = static_pages.get('index')
+    if body is None:
+        body = static_pages['index'] = render_template('index.html').encode()
+    return app.response_class(body)
+
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    return assets.send(filename, request.accept_encodings)
 
 
 @app.route('/showSummary', methods=['GET', 'POST'])
@@ -50,11 +371,11 @@ def showSummary():
         flash("Something went wrong-please try again", category='error')
         return redirect(url_for('index'))
     try:
-        club = [club for club in clubs if club['email'] == session['email']][0]
+        club = get_club_by_email(session['email'])
     except IndexError:
         flash(f"Sorry, that email {request.form['email']} was not found.", category='error')
         return redirect(url_for('index'))
-    return render_template('welcome.html', club=club, competitions=competitions)
+    return render_welcome(club)
 
 
 @app.route('/book/<competition>/<club>')
@@ -62,17 +383,16 @@ def book(competition, club):
     try:
         foundClub = get_club_by_name(club)
         foundCompetition = get_competition_by_name(competition)
-        competition_date = datetime.fromisoformat(foundCompetition['date'])
-        assert competition_date >= datetime.now(), "Competition is no longer valid"
+        check_competition_date(foundCompetition)
     except IndexError:
         flash("Something went wrong-please try again", category='error')
         return redirect(url_for('index'))
     except ValueError as date_exception:
         flash(f"Something went wrong : {date_exception}", category='error')
-        return render_template('welcome.html', club=foundClub, competitions=competitions)
+        return render_welcome(foundClub)
     except AssertionError as assertion_error:
         flash(assertion_error, category='error')
-        return render_template('welcome.html', club=foundClub, competitions=competitions)
+        return render_welcome(foundClub)
     else:
         return render_template('booking.html', club=foundClub, competition=foundCompetition)
 
@@ -83,9 +403,7 @@ def purchasePlaces():
         competition = get_competition_by_name(request.form['competition'])
         club = get_club_by_name(request.form['club'])
         places_required = int(request.form['places'])
-        points_allowed = int(club['points'])
-        assert points_allowed >= places_required, "Number of places required is greater than club's points"
-        assert app.config['MAX_BOOKING_PLACES'] >= places_required, f"Number of places required is greater than {app.config['MAX_BOOKING_PLACES']}"
+        engine.book(club, competition, places_required)
     except IndexError:
         flash("Something went wrong-please try again", category='error')
         return redirect(url_for('index'))
@@ -93,17 +411,55 @@ def purchasePlaces():
         flash(assertion_error, category='error')
         return render_template('booking.html', club=club, competition=competition)
     else:
-        competition['numberOfPlaces'] = int(competition['numberOfPlaces']) - places_required
-        # this bug is already fixed and tested in branch 02_bug_clubs_using_more_points_allowed
-        club['points'] = int(club['points']) - places_required
         flash('Great-booking complete!')
-        return render_template('welcome.html', club=club, competitions=competitions)
+        return render_welcome(club)
+
+
+@app.route('/purchasePlacesBatch', methods=['POST'])
+def purchasePlacesBatch():
+    try:
+        club = get_club_by_name(request.form['club'])
+        names, numbers = request.form.getlist('competition'), request.form.getlist('places')
+        if len(names) != len(numbers):
+            raise ValueError(f"{len(names)} competitions but {len(numbers)} numbers of places")
+        bookings = []
+        for name, places in zip(names, numbers):
+            if places.strip() in ('', '0'):
+                continue
+            competition = get_competition_by_name(name)
+            check_competition_date(competition)
+            bookings.append((competition, int(places)))
+        engine.book_many(club, bookings)
+    except IndexError:
+        flash("Something went wrong-please try again", category='error')
+        return redirect(url_for('index'))
+    except (AssertionError, ValueError) as booking_error:
+        flash(f"Nothing booked : {booking_error}", category='error')
+        return render_welcome(club)
+    else:
+        flash(f"Great-booking complete for {len(bookings)} competitions!")
+        return render_welcome(club)
 
 
-# TODO: Add route for points display
 @app.route('/displayPoints')
 def displayPoints():
-    return render_template("display_points.html", clubs=clubs)
+    listing = get_listing_args(CLUB_SORTS, 'name')
+    snapshot = registry.snapshot()
+    version = snapshot.version
+    etag = f'points-{version}'
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+    else:
+        body = page_cache.get(('displayPoints', version, listing))
+        if body is None:
+            sort, order, offset, limit = listing
+            page = snapshot.clubs_page(sort, offset, limit, reverse=order == 'desc')
+            body = render_template("display_points.html", clubs=page.items, page=page)
+            page_cache.set(('displayPoints', version, listing), body)
+        response = app.response_class(body)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
 
 
 @app.route('/logout')
@@ -111,3 +467,24 @@ def logout():
     session.pop('email', None)
     flash('You are logged out !')
     return redirect(url_for('index'))
+
+
+@app.route('/events')
+def events():
+    """
+    Server-sent events of the bookings : the points left to the club and the
+    places left in the competition
+    """
+    if not app.config['LIVE_FEED']:
+        abort(404)
+    last_id = request.headers.get('Last-Event-ID')
+    response = app.response_class(broadcaster.subscribe(last_id), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # tell a buffering proxy (nginx) to pass the events through
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return app.response_class(metrics.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
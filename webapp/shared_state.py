@@ -0,0 +1,207 @@
+import sqlite3
+import threading
+from blinker import Namespace
+from .pool import ConnectionPool, PooledStore
+
+
+_signals = Namespace()
+
+# Sent after a pull or a resync with the (kind, name, value) of the points and
+# places it changed in the registry, that is the changes of the other workers
+changes_pulled = _signals.signal('changes-pulled')
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clubs (
+    name TEXT PRIMARY KEY,
+    points INTEGER NOT NULL CHECK (points >= 0)
+);
+CREATE TABLE IF NOT EXISTS competitions (
+    name TEXT PRIMARY KEY,
+    places INTEGER NOT NULL CHECK (places >= 0)
+);
+CREATE TABLE IF NOT EXISTS changes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class SharedState(PooledStore):
+    """
+    Points and places shared by several worker processes through a SQLite
+    database in WAL mode.
+
+    Every worker keeps serving reads from its in-memory registry. A booking
+    runs inside an IMMEDIATE transaction (one writer at a time across all
+    the processes) : the values of the club and the competitions are first
+    re-read from the database, then checked, decremented and written back
+    with one row per change in the `changes` table. Before each request a
+    worker pulls the changes made by the other workers since the last one it
+    has seen, so all workers converge on the same points and places.
+    """
+
+    def __init__(self, path, keep_changes=100000, pool_size=8, cached_statements=128):
+        self.path = path
+        self.keep_changes = keep_changes
+        self.last_change = 0
+        self._writes = 0
+        self.pool = ConnectionPool(path, pool_size, cached_statements)
+        self._pull_lock = threading.Lock()
+
+    def initialize(self, registry, engine):
+        """
+        Create the tables, seed them with the records loaded from the JSON
+        files if they are not there yet, then load the shared values. The
+        version of the registry is then built from the last change applied.
+        """
+        registry.shared_version = lambda: self.last_change
+        with self.pool.connection() as connection:
+            connection.executescript(SCHEMA)
+        with self.transaction() as connection:
+            connection.executemany('INSERT OR IGNORE INTO clubs (name, points) VALUES (?, ?)',
+                                   ((club['name'], club['points']) for club in registry.clubs))
+            connection.executemany('INSERT OR IGNORE INTO competitions (name, places) VALUES (?, ?)',
+                                   ((competition['name'], competition['numberOfPlaces'])
+                                    for competition in registry.competitions))
+        self.resync(registry, engine)
+
+    def write(self, club, competition, places):
+        """
+        Write the values of a booking, inside a booking transaction
+        """
+        with self.pool.connection() as connection:
+            connection.execute('INSERT INTO clubs (name, points) VALUES (?, ?) '
+                               'ON CONFLICT (name) DO UPDATE SET points = excluded.points',
+                               (club['name'], club['points']))
+            connection.execute('INSERT INTO competitions (name, places) VALUES (?, ?) '
+                               'ON CONFLICT (name) DO UPDATE SET places = excluded.places',
+                               (competition['name'], competition['numberOfPlaces']))
+            connection.execute('INSERT INTO changes (kind, name, value) VALUES (?, ?, ?)',
+                               ('club', club['name'], club['points']))
+            change_id = connection.execute('INSERT INTO changes (kind, name, value) VALUES (?, ?, ?)',
+                                           ('competition', competition['name'],
+                                            competition['numberOfPlaces'])).lastrowid
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                # forget the oldest changes, workers that missed them resync fully
+                connection.execute('DELETE FROM changes WHERE id <= ?', (change_id - self.keep_changes,))
+
+    def publish(self, clubs, competitions):
+        """
+        Write points by club name and places by competition name changed
+        outside of the bookings (a hot reload of the files), with their
+        changes so that the other workers pull them
+        """
+        with self.transaction() as connection:
+            for kind, table, column, values in (('club', 'clubs', 'points', clubs),
+                                                 ('competition', 'competitions', 'places', competitions)):
+                for name, value in values.items():
+                    connection.execute(f'INSERT INTO {table} (name, {column}) VALUES (?, ?) '
+                                       f'ON CONFLICT (name) DO UPDATE SET {column} = excluded.{column}',
+                                       (name, value))
+                    connection.execute('INSERT INTO changes (kind, name, value) VALUES (?, ?, ?)',
+                                       (kind, name, value))
+
+    @staticmethod
+    def _apply(registry, engine, kind, name, value):
+        # under the booking lock of the record, so that a booking in progress
+        # never sees its values change between its check and its write.
+        # Returns whether the value changed : the changes of this worker are
+        # already in its registry.
+        if kind == 'club':
+            club = registry.clubs_by_name.get(name)
+            if club is not None:
+                with engine.club_lock(club):
+                    if club['points'] != value:
+                        registry.update_club(club, points=value)
+                        return True
+        else:
+            competition = registry.competitions_by_name.get(name)
+            if competition is not None:
+                with engine.competition_lock(competition):
+                    if competition['numberOfPlaces'] != value:
+                        registry.update_competition(competition, numberOfPlaces=value)
+                        return True
+        return False
+
+    def resync(self, registry, engine):
+        """
+        Load every shared value into the registry
+        """
+        with self._pull_lock:
+            # the connection goes back to the pool before the booking locks are taken
+            with self.pool.connection() as connection:
+                self.last_change = connection.execute('SELECT COALESCE(MAX(id), 0) FROM changes').fetchone()[0]
+                clubs = connection.execute('SELECT name, points FROM clubs').fetchall()
+                competitions = connection.execute('SELECT name, places FROM competitions').fetchall()
+            changes = [('club', name, points) for name, points in clubs]
+            changes += [('competition', name, places) for name, places in competitions]
+            changes = [change for change in changes if self._apply(registry, engine, *change)]
+        registry.bump_version()
+        if changes:
+            changes_pulled.send(self, changes=changes)
+
+    def pull(self, registry, engine):
+        """
+        Apply to the registry the changes committed since the last pull.
+        Returns the number of changes applied.
+        """
+        with self._pull_lock:
+            with self.pool.connection() as connection:
+                rows = connection.execute('SELECT id, kind, name, value FROM changes WHERE id > ? ORDER BY id',
+                                          (self.last_change,)).fetchall()
+            if not rows:
+                return 0
+            # change ids have no gaps unless the changes we missed were pruned
+            missed = rows[0][0] > self.last_change + 1
+            if not missed:
+                # only the last value of each record, the earlier ones of a
+                # record booked since by this worker would be pushed back
+                latest = {(kind, name): value for _, kind, name, value in rows}
+                changes = [(kind, name, value) for (kind, name), value in latest.items()
+                           if self._apply(registry, engine, kind, name, value)]
+                self.last_change = rows[-1][0]
+        if missed:
+            self.resync(registry, engine)
+        else:
+            registry.bump_version()
+            if changes:
+                changes_pulled.send(self, changes=changes)
+        return len(rows)
+
+
+class PullWatcher(threading.Thread):
+    """
+    Pulls the shared state every `interval` seconds, so that a worker
+    without requests (its clients only listening to the live feed) still
+    applies and pushes the bookings of the others. The read side of `lock`
+    (the lock of the reloader) is held during a pull, as in a request.
+    """
+
+    def __init__(self, shared_state, registry, engine, interval, lock=None):
+        super().__init__(name='gudlft-shared-state', daemon=True)
+        self.shared_state = shared_state
+        self.registry = registry
+        self.engine = engine
+        self.interval = interval
+        self.lock = lock
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            if self.lock is not None:
+                self.lock.acquire_read()
+            try:
+                self.shared_state.pull(self.registry, self.engine)
+            except sqlite3.OperationalError:
+                # database locked longer than the timeout, the next pull catches up
+                continue
+            finally:
+                if self.lock is not None:
+                    self.lock.release_read()
+
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,304 @@
+import sqlite3
+from datetime import datetime
+from .booking import BookingError
+from .indexes import Page
+from .loaders import iter_records
+from .models import Club, Competition
+from .pool import ConnectionPool, PooledStore
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clubs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    email TEXT NOT NULL,
+    points INTEGER NOT NULL CHECK (points >= 0)
+);
+CREATE INDEX IF NOT EXISTS clubs_email ON clubs (email);
+CREATE INDEX IF NOT EXISTS clubs_points ON clubs (points, name);
+CREATE TABLE IF NOT EXISTS competitions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    date TEXT NOT NULL,
+    datetime TEXT,
+    places INTEGER NOT NULL CHECK (places >= 0)
+);
+CREATE INDEX IF NOT EXISTS competitions_date ON competitions (datetime, name);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 1);
+"""
+
+# ORDER BY columns of the listings, same sort names as CLUB_SORTS and
+# COMPETITION_SORTS
+CLUB_ORDERS = {'name': ('name',), 'points': ('points', 'name')}
+COMPETITION_ORDERS = {'name': ('name',), 'date': ('datetime', 'name')}
+
+CLUB_COLUMNS = 'name, email, points'
+COMPETITION_COLUMNS = 'name, date, places'
+
+
+def sortable_datetime(value):
+    """
+    Fixed-width text of a datetime, so that SQLite orders and compares the
+    dates as strings. None for the competitions without a valid date.
+    """
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f') if value is not None else None
+
+
+def order_by(columns, reverse):
+    direction = ' DESC' if reverse else ''
+    return ', '.join(column + direction for column in columns)
+
+
+class Table:
+    """
+    Read-only view of a table standing for the `clubs` and `competitions`
+    lists of the in-memory registry : its length is a COUNT and iterating
+    it streams the rows as records.
+    """
+
+    def __init__(self, storage, table, columns, factory):
+        self.storage = storage
+        self.table = table
+        self.columns = columns
+        self.factory = factory
+
+    def __len__(self):
+        with self.storage.pool.connection() as connection:
+            return connection.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def __iter__(self):
+        with self.storage.pool.connection() as connection:
+            for row in connection.execute(f'SELECT {self.columns} FROM {self.table} ORDER BY id'):
+                yield self.factory(*row)
+
+
+class SqliteRegistry(PooledStore):
+    """
+    Registry of clubs and competitions stored in a SQLite database, for
+    datasets larger than the memory and bookings that survive crashes.
+
+    It has the interface of Registry : lookups go through the indexes on
+    club name, club email and competition name, listings are LIMIT/OFFSET
+    range queries on the indexes on points and on date (their totals counted
+    once per version), and bookings are
+    UPDATEs run in a transaction where the CHECK constraints refuse negative
+    points or places. Records are built from the rows on each lookup, so
+    nothing but the current pages is held in memory. Passed to the
+    BookingEngine as its store.
+
+    The version lives in the database too, so every process serving the
+    same database sees the bookings made by the others.
+    """
+
+    def __init__(self, path, now=None, pool_size=8, cached_statements=128):
+        self.path = path
+        self.now = now or datetime.now()
+        self.pool = ConnectionPool(path, pool_size, cached_statements)
+        with self.pool.connection() as connection:
+            connection.executescript(SCHEMA)
+        self.clubs = Table(self, 'clubs', CLUB_COLUMNS, Club)
+        # totals of the listings by query, each with the version it was counted at
+        self._totals = {}
+        self.competitions = Table(self, 'competitions', COMPETITION_COLUMNS, Competition)
+
+    def import_json(self, clubs_path, competitions_path):
+        """
+        Insert (or update) the records of the JSON files, read one by one
+        """
+        with self.transaction() as connection:
+            connection.executemany(
+                'INSERT INTO clubs (name, email, points) VALUES (?, ?, ?) '
+                'ON CONFLICT (name) DO UPDATE SET email = excluded.email, points = excluded.points',
+                ((club['name'], club['email'], club['points'])
+                 for club in iter_records(clubs_path, 'clubs', Club.from_record)))
+            connection.executemany(
+                'INSERT INTO competitions (name, date, datetime, places) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (name) DO UPDATE SET date = excluded.date, datetime = excluded.datetime, '
+                'places = excluded.places',
+                ((competition['name'], competition['date'], sortable_datetime(competition.datetime),
+                  competition['numberOfPlaces'])
+                 for competition in iter_records(competitions_path, 'competitions', Competition.from_record)))
+            connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def add_club(self, club):
+        with self.pool.connection() as connection:
+            connection.execute('INSERT INTO clubs (name, email, points) VALUES (?, ?, ?)',
+                               (club['name'], club['email'], club['points']))
+        self._totals.clear()
+
+    def add_competition(self, competition):
+        with self.pool.connection() as connection:
+            connection.execute('INSERT INTO competitions (name, date, datetime, places) VALUES (?, ?, ?, ?)',
+                               (competition['name'], competition['date'],
+                                sortable_datetime(competition.datetime), competition['numberOfPlaces']))
+        self._totals.clear()
+
+    def remove_club(self, club):
+        with self.pool.connection() as connection:
+            connection.execute('DELETE FROM clubs WHERE name = ?', (club['name'],))
+        self._totals.clear()
+
+    def remove_competition(self, competition):
+        with self.pool.connection() as connection:
+            connection.execute('DELETE FROM competitions WHERE name = ?', (competition['name'],))
+        self._totals.clear()
+
+    # SQLite maintains its indexes on every UPDATE
+
+    def reindex_club(self, club):
+        pass
+
+    def reindex_competition(self, competition):
+        pass
+
+    def archive_past_competitions(self, now=None):
+        """
+        Competitions started before `now` drop out of the listings, which
+        only query the dates from `now` on. The version is bumped when one
+        started since the last call, the listings being tagged with it.
+        """
+        previous = self.now
+        now = max(previous, now or datetime.now())
+        if now == previous:
+            return
+        with self.pool.connection() as connection:
+            started = connection.execute('SELECT 1 FROM competitions WHERE datetime >= ? AND datetime < ? LIMIT 1',
+                                         (sortable_datetime(previous), sortable_datetime(now))).fetchone()
+        self.now = now
+        if started is not None:
+            self.bump_version()
+
+    def is_archived(self, competition):
+        return competition.datetime is not None and competition.datetime < self.now
+
+    def snapshot(self):
+        """
+        SQLite readers already read a snapshot of the database (WAL mode),
+        the registry stands for its own snapshot
+        """
+        return self
+
+    def _total(self, connection, query, parameters=()):
+        # COUNT(*) scans a whole index : counted once per version (which
+        # every booking, reload or new day of competitions bumps)
+        version = self.version
+        key = (query, parameters)
+        counted = self._totals.get(key)
+        if counted is None or counted[0] != version:
+            counted = (version, connection.execute(query, parameters).fetchone()[0])
+            self._totals[key] = counted
+        return counted[1]
+
+    def clubs_page(self, sort, offset, limit, reverse=False):
+        with self.pool.connection() as connection:
+            total = self._total(connection, 'SELECT COUNT(*) FROM clubs')
+            rows = connection.execute(f'SELECT {CLUB_COLUMNS} FROM clubs '
+                                      f'ORDER BY {order_by(CLUB_ORDERS[sort], reverse)} LIMIT ? OFFSET ?',
+                                      (limit, offset))
+            return Page([Club(*row) for row in rows], offset, limit, total,
+                        sort, 'desc' if reverse else 'asc')
+
+    def competitions_page(self, sort, offset, limit, reverse=False):
+        """
+        Bookable competitions : valid date from `now` on and places left
+        """
+        with self.pool.connection() as connection:
+            now = sortable_datetime(self.now)
+            total = self._total(connection, 'SELECT COUNT(*) FROM competitions WHERE datetime >= ? AND places > 0',
+                                (now,))
+            rows = connection.execute(f'SELECT {COMPETITION_COLUMNS} FROM competitions '
+                                      f'WHERE datetime >= ? AND places > 0 '
+                                      f'ORDER BY {order_by(COMPETITION_ORDERS[sort], reverse)} LIMIT ? OFFSET ?',
+                                      (now, limit, offset))
+            return Page([Competition(*row) for row in rows], offset, limit, total,
+                        sort, 'desc' if reverse else 'asc')
+
+    def update_club(self, club, **fields):
+        """
+        Update fields of a stored club and of its record
+        """
+        columns = {'name': fields.get('name', club['name']), 'email': fields.get('email', club['email']),
+                   'points': fields.get('points', club['points'])}
+        with self.pool.connection() as connection:
+            connection.execute('UPDATE clubs SET name = ?, email = ?, points = ? WHERE name = ?',
+                               (columns['name'], columns['email'], columns['points'], club['name']))
+        for key, value in fields.items():
+            club[key] = value
+
+    def update_competition(self, competition, **fields):
+        """
+        Update fields of a stored competition and of its record
+        """
+        name = competition['name']
+        for key, value in fields.items():
+            competition[key] = value
+        with self.pool.connection() as connection:
+            connection.execute('UPDATE competitions SET name = ?, date = ?, datetime = ?, places = ? '
+                               'WHERE name = ?',
+                               (competition['name'], competition['date'], sortable_datetime(competition.datetime),
+                                competition['numberOfPlaces'], name))
+        self._totals.clear()
+
+    @property
+    def version(self):
+        with self.pool.connection() as connection:
+            return connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def bump_version(self):
+        with self.pool.connection() as connection:
+            connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        return self.version
+
+    def state(self):
+        """
+        Booking-mutable state : points by club name and places by
+        competition name
+        """
+        with self.pool.connection() as connection:
+            return {
+                'clubs': dict(connection.execute('SELECT name, points FROM clubs')),
+                'competitions': dict(connection.execute('SELECT name, places FROM competitions')),
+            }
+
+    # store interface of the BookingEngine, besides the transaction and the
+    # refresh of PooledStore
+
+    def write(self, club, competition, places):
+        """
+        Store a booking, inside a booking transaction
+        """
+        with self.pool.connection() as connection:
+            try:
+                connection.execute('UPDATE competitions SET places = places - ? WHERE name = ?',
+                                   (places, competition['name']))
+                connection.execute('UPDATE clubs SET points = points - ? WHERE name = ?', (places, club['name']))
+            except sqlite3.IntegrityError:
+                raise BookingError("Number of places required is greater than the stored places or points") from None
+
+    # Lookups raise IndexError like Registry
+
+    def get_club_by_name(self, name):
+        with self.pool.connection() as connection:
+            row = connection.execute(f'SELECT {CLUB_COLUMNS} FROM clubs WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            raise IndexError(f"Unknown club {name}")
+        return Club(*row)
+
+    def get_club_by_email(self, email):
+        with self.pool.connection() as connection:
+            row = connection.execute(f'SELECT {CLUB_COLUMNS} FROM clubs WHERE email = ?', (email,)).fetchone()
+        if row is None:
+            raise IndexError(f"Unknown email {email}")
+        return Club(*row)
+
+    def get_competition_by_name(self, name):
+        with self.pool.connection() as connection:
+            row = connection.execute(f'SELECT {COMPETITION_COLUMNS} FROM competitions WHERE name = ?',
+                                     (name,)).fetchone()
+        if row is None:
+            raise IndexError(f"Unknown competition {name}")
+        return Competition(*row)
@@ -0,0 +1,34 @@
+// Keep the points and the places of the page up to date from the server-sent
+// events of the bookings, instead of reloading the page. A booking pulled
+// from another worker only has the club or the competition. The page is
+// reloaded when the events it missed are lost (reset).
+let live_feed_url = document.currentScript.dataset.eventsUrl
+let live_feed_reset_url = document.currentScript.dataset.resetUrl
+
+function update_all(attribute, name, value) {
+    document.querySelectorAll("[" + attribute + "=\"" + CSS.escape(name) + "\"]").forEach(function(element) {
+        if (element.tagName === "INPUT") {
+            element.max = value
+        } else {
+            element.textContent = value
+        }
+    })
+}
+
+if (window.EventSource && live_feed_url) {
+    let live_feed = new EventSource(live_feed_url)
+    live_feed.addEventListener("booking", function(e) {
+        let booking = JSON.parse(e.data)
+        if (booking.club !== undefined) {
+            update_all("data-club-points", booking.club, booking.points)
+        }
+        if (booking.competition !== undefined) {
+            update_all("data-competition-places", booking.competition, booking.places)
+        }
+    })
+    live_feed.addEventListener("reset", function() {
+        if (live_feed_reset_url) {
+            window.location.replace(live_feed_reset_url)
+        }
+    })
+}
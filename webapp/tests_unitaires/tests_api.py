@@ -0,0 +1,139 @@
+import unittest
+from parameterized import parameterized
+from webapp import server
+from webapp.api import FragmentSerializer
+from webapp.models import Club
+
+
+class ApiUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.app = server.app
+        self.app.config['TESTING'] = True
+        self.test_client = self.app.test_client()
+
+    def test_club_summary(self):
+        """
+        Test route /api/clubs/<name>
+        """
+        response = self.test_client.get("/api/clubs/Simply Lift")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(response.get_json()['email'], "john@simplylift.co")
+        self.assertEqual(self.test_client.get("/api/clubs/Unknown").status_code, 404)
+
+    def test_club_bookings(self):
+        """
+        Test route /api/clubs/<name>/bookings lists the places booked by a club
+        """
+        server.ledger.clear()
+        server.ledger.record("Simply Lift", "Spring Festival", 2)
+        server.ledger.record("Simply Lift", "Fall Classic", 1)
+        server.ledger.record("Simply Lift", "Spring Festival", 3)
+        try:
+            response = self.test_client.get("/api/clubs/Simply Lift/bookings")
+            self.assertEqual(response.get_json(), {'club': "Simply Lift", 'total': 6,
+                                                   'competitions': {"Spring Festival": 5, "Fall Classic": 1}})
+            self.assertEqual(self.test_client.get("/api/clubs/Unknown/bookings").status_code, 404)
+        finally:
+            server.ledger.clear()
+
+    def test_serializer_without_cache(self):
+        """
+        Test a serializer without cache keeps no fragment, as for the records built by every SQLite query
+        """
+        serializer = FragmentSerializer(cache=False)
+        club = Club("Simply Lift", "john@simplylift.co", "13")
+        self.assertEqual(serializer.fragment(club), FragmentSerializer().fragment(club))
+        self.assertEqual(serializer._fragments, {})
+
+    def test_pool_stats(self):
+        """
+        Test route /api/pool answers 404 without a database store
+        """
+        self.assertEqual(self.test_client.get("/api/pool").status_code, 200 if server.store is not None else 404)
+
+    def test_points(self):
+        """
+        Test route /api/points lists clubs by descending points
+        """
+        response = self.test_client.get("/api/points?limit=2")
+        data = response.get_json()
+        self.assertEqual(data['total'], len(server.clubs))
+        self.assertEqual(len(data['items']), 2)
+        self.assertGreaterEqual(data['items'][0]['points'], data['items'][1]['points'])
+        etag = response.headers['ETag']
+        self.assertEqual(self.test_client.get("/api/points?limit=2", headers={'If-None-Match': etag}).status_code,
+                         304)
+
+    def test_competitions(self):
+        """
+        Test route /api/competitions lists bookable competitions only
+        """
+        data = self.test_client.get("/api/competitions").get_json()
+        bookable = [competition['name'] for competition in server.registry.competitions_page('date', 0, 50)]
+        self.assertEqual([competition['name'] for competition in data['items']], bookable)
+
+    @parameterized.expand([
+        ({"club": "Simply Lift", "competition": "Spring Festival", "places": 1}, 400, "no longer valid"),
+        ({"club": "Simply Lift", "competition": "Date Error 01", "places": 1}, 400, "Invalid isoformat"),
+        ({"club": "Simply Lift", "competition": "Unknown", "places": 1}, 404, "Unknown competition"),
+        ({"club": "Simply Lift"}, 400, "required"),
+    ])
+    def test_bookings_refused(self, data, status_code, message):
+        """
+        Test route /api/bookings refuses non valid bookings
+        """
+        response = self.test_client.post("/api/bookings", json=data)
+        self.assertEqual(response.status_code, status_code)
+        self.assertIn(message, response.get_json()['error'])
+
+    def test_bookings(self):
+        """
+        Test route /api/bookings books places in an upcoming competition
+        """
+        club = server.registry.get_club_by_name("She Lifts")
+        competition = server.registry.get_competition_by_name("Fall Classic 2021")
+        points, places, date = club['points'], competition['numberOfPlaces'], competition['date']
+        try:
+            server.registry.update_competition(competition, date="2100-01-01 10:00:00")
+            response = self.test_client.post("/api/bookings", json={"club": "She Lifts",
+                                                                    "competition": "Fall Classic 2021",
+                                                                    "places": 2})
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.get_json()['club']['points'], points - 2)
+            self.assertEqual(response.get_json()['competition']['numberOfPlaces'], places - 2)
+            self.assertEqual(self.test_client.get("/api/clubs/She Lifts").get_json()['points'], points - 2)
+        finally:
+            server.registry.update_club(club, points=points)
+            server.registry.update_competition(competition, date=date, numberOfPlaces=places)
+
+    def test_bookings_batch(self):
+        """
+        Test route /api/bookings/batch books several competitions at once
+        """
+        club = server.registry.get_club_by_name("She Lifts")
+        competitions = [server.registry.get_competition_by_name(name)
+                        for name in ("Fall Classic 2021", "Spring Festival 2021")]
+        saved = [(competition['date'], competition['numberOfPlaces']) for competition in competitions]
+        points = club['points']
+        try:
+            for competition in competitions:
+                server.registry.update_competition(competition, date="2100-01-01 10:00:00")
+            bookings = [{"competition": "Fall Classic 2021", "places": 2},
+                        {"competition": "Spring Festival 2021", "places": 1}]
+            response = self.test_client.post("/api/bookings/batch", json={"club": "She Lifts", "bookings": bookings})
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.get_json()['club']['points'], points - 3)
+            bookings.append({"competition": "Spring Festival", "places": 1})
+            response = self.test_client.post("/api/bookings/batch", json={"club": "She Lifts", "bookings": bookings})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(club['points'], points - 3)
+        finally:
+            server.registry.update_club(club, points=points)
+            for competition, (date, number_of_places) in zip(competitions, saved):
+                server.registry.update_competition(competition, date=date, numberOfPlaces=number_of_places)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import gzip
+import os
+import tempfile
+import unittest
+from webapp import assets, server
+from webapp.assets import AssetManifest, build_assets, fingerprinted_name
+
+
+class AssetsUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.static_dir = os.path.join(self.directory.name, 'static')
+        self.output_dir = os.path.join(self.static_dir, 'dist')
+        os.makedirs(os.path.join(self.static_dir, 'css'))
+        self.content = b"body { margin: 0; }\n" * 100
+        with open(os.path.join(self.static_dir, 'css', 'main.css'), 'wb') as css_file:
+            css_file.write(self.content)
+        with open(os.path.join(self.static_dir, 'tiny.js'), 'wb') as js_file:
+            js_file.write(b"x")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_fingerprinted_name(self):
+        """
+        Test the name of a file changes with its content only
+        """
+        name = fingerprinted_name('css/main.css', b"a")
+        self.assertRegex(name, r'^css/main\.[0-9a-f]{12}\.css$')
+        self.assertEqual(fingerprinted_name('css/main.css', b"a"), name)
+        self.assertNotEqual(fingerprinted_name('css/main.css', b"b"), name)
+
+    def test_build_assets(self):
+        """
+        Test every static file is copied with its precompressed copies when smaller
+        """
+        manifest = build_assets(self.static_dir, self.output_dir)
+        self.assertEqual(set(manifest['files']), {'css/main.css', 'tiny.js'})
+        built = manifest['files']['css/main.css']
+        with open(os.path.join(self.output_dir, built), 'rb') as built_file:
+            self.assertEqual(built_file.read(), self.content)
+        with open(os.path.join(self.output_dir, built + '.gz'), 'rb') as gzip_file:
+            self.assertEqual(gzip.decompress(gzip_file.read()), self.content)
+        self.assertIn('gzip', manifest['encodings'][built])
+        self.assertEqual('br' in manifest['encodings'][built], assets.brotli is not None)
+        self.assertEqual(manifest['encodings'][manifest['files']['tiny.js']], [])
+        # a second build does not fingerprint its own output
+        self.assertEqual(build_assets(self.static_dir, self.output_dir), manifest)
+
+    def test_serve_assets(self):
+        """
+        Test fingerprinted files are served precompressed with immutable caching
+        """
+        manifest = build_assets(self.static_dir, self.output_dir)
+        built = manifest['files']['css/main.css']
+        saved_assets = server.assets
+        server.assets = AssetManifest(self.output_dir)
+        try:
+            with server.app.test_request_context():
+                self.assertEqual(server.asset_url('css/main.css'), f'/assets/{built}')
+                self.assertEqual(server.asset_url('js/other.js'), '/static/js/other.js')
+            client = server.app.test_client()
+            response = client.get(f'/assets/{built}', headers={'Accept-Encoding': 'gzip'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+            self.assertEqual(response.headers['Cache-Control'], 'public, max-age=31536000, immutable')
+            self.assertEqual(response.mimetype, 'text/css')
+            self.assertEqual(gzip.decompress(response.get_data()), self.content)
+            response.close()
+            response = client.get(f'/assets/{built}')
+            self.assertNotIn('Content-Encoding', response.headers)
+            self.assertEqual(response.get_data(), self.content)
+            response.close()
+            self.assertEqual(client.get('/assets/css/main.css').status_code, 404)
+        finally:
+            server.assets = saved_assets
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -14,6 +14,8 @@ class ServerUnitTests(unittest.TestCase):
         self.response = None
         self.template = None
         self.context = None
+        server.static_pages.clear()
+        server.ledger.clear()
 
     def tearDown(self) -> None:
         pass
@@ -103,6 +105,22 @@ class ServerUnitTests(unittest.TestCase):
             self.verify_response_template_context(url, status_code,
                                                   template_name, templates)
 
+    def test_index_pre_rendered(self):
+        """
+        Test the index page without messages is rendered once, then served as bytes
+        """
+        first = self.app.test_client().get("/")
+        with self.captured_templates() as templates:
+            second = self.app.test_client().get("/")
+        self.assertEqual(templates, [])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        with self.captured_templates() as templates:
+            response = self.app.test_client().get("/logout", follow_redirects=True)
+        self.assertEqual(len(templates), 1)
+        self.assertIn(b"You are logged out !", response.data)
+        self.assertNotIn(b"You are logged out !", server.static_pages['index'])
+
     @parameterized.expand([
         ("/showSummary", 200, "index.html", "john.doe@gmail.com"),
     ])
@@ -324,6 +342,36 @@ class ServerUnitTests(unittest.TestCase):
             self.assertEqual(number_of_places_before - number_of_places_after, int(data['places']))
             self.assertIn(b"Great-booking complete!", self.response.data)
 
+    @parameterized.expand([
+        (["2", "0", "3"], 200, "Great-booking complete for 2 competitions!", 5),
+        (["2", "0", "12"], 200, "Nothing booked : Number of places required is greater than club's points", 0),
+        (["0", "0", "13"], 200, "Nothing booked : Number of places required is greater than 12", 0),
+        (["2", "3"], 200, "Nothing booked : 3 competitions but 2 numbers of places", 0),
+    ])
+    def test_purchase_places_batch(self, places, status_code, message, places_booked):
+        """
+        Test function server.purchasePlacesBatch() books several competitions
+        all or nothing
+        """
+        club = server.get_club_by_name("Simply Lift")
+        names = ["Spring Festival 2021", "Spring Festival", "Fall Classic 2021"]
+        competitions = [server.get_competition_by_name(name) for name in names]
+        saved = [(competition['date'], competition['numberOfPlaces']) for competition in competitions]
+        points_before = club['points']
+        try:
+            for competition in (competitions[0], competitions[2]):
+                server.registry.update_competition(competition, date="2100-01-01 10:00:00")
+            with self.captured_templates() as templates:
+                self.verify_response_template_context("/purchasePlacesBatch", status_code, "welcome.html",
+                                                      templates, "POST", club="Simply Lift",
+                                                      competition=names, places=places)
+            self.assertIn(message, self.response.data.decode().replace("&#39;", "'"))
+            self.assertEqual(points_before - club['points'], places_booked)
+        finally:
+            server.registry.update_club(club, points=points_before)
+            for competition, (date, number_of_places) in zip(competitions, saved):
+                server.registry.update_competition(competition, date=date, numberOfPlaces=number_of_places)
+
     @parameterized.expand([
         ("/displayPoints", 200, "display_points.html"),
     ])
@@ -332,6 +380,40 @@ class ServerUnitTests(unittest.TestCase):
             self.verify_response_template_context(url, status_code,
                                                   template_name, templates)
 
+    @parameterized.expand([
+        ("/displayPoints?sort=points&order=desc&limit=2", ["Simply Lift", "She Lifts"], True),
+        ("/displayPoints?sort=name&offset=1&limit=5", ["She Lifts", "Simply Lift"], False),
+    ])
+    def test_display_points_listing(self, url, club_names, has_next):
+        """
+        Test function server.displayPoints() sorts and paginates the clubs
+        """
+        try:
+            with self.captured_templates() as templates:
+                self.verify_response_template_context(url, 200, "display_points.html", templates)
+                self.assertEqual([club['name'] for club in self.context['clubs']], club_names)
+                self.assertEqual(self.context['page'].has_next, has_next)
+        finally:
+            server.page_cache.clear()
+
+    def test_display_points_etag(self):
+        """
+        Test function server.displayPoints() answers 304 to a known ETag until
+        a booking changes the points
+        """
+        try:
+            test_client = self.app.test_client()
+            response = test_client.get("/displayPoints")
+            etag = response.headers['ETag']
+            self.assertEqual(test_client.get("/displayPoints", headers={'If-None-Match': etag}).status_code, 304)
+            self.assertEqual(test_client.get("/displayPoints").data, response.data)
+            test_client.post("/purchasePlaces", data=dict(club="She Lifts", competition="Spring Festival", places="1"))
+            response = test_client.get("/displayPoints", headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.headers['ETag'], etag)
+        finally:
+            server.page_cache.clear()
+
     @parameterized.expand([
         ("/logout", 200, "index.html"),
     ])
@@ -0,0 +1,131 @@
+import threading
+import unittest
+from parameterized import parameterized
+from webapp.booking import BookingEngine, BookingError
+from webapp.ledger import BookingLedger
+from webapp.models import Club, Competition
+
+
+NB_THREADS = 32
+NB_ATTEMPTS = 200
+
+
+class BookingEngineUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.engine = BookingEngine(max_places=12)
+
+    def test_book(self):
+        """
+        Test a valid booking decrements points and places
+        """
+        club = Club("Simply Lift", "john@simplylift.co", "13")
+        competition = Competition("Spring Festival", "2020-03-27 10:00:00", "25")
+        self.engine.book(club, competition, 3)
+        self.assertEqual(club['points'], 10)
+        self.assertEqual(competition['numberOfPlaces'], 22)
+
+    @parameterized.expand([
+        (13, 25, 14, "club's points"),
+        (20, 25, 13, "greater than 12"),
+        (13, 2, 3, "competition's number of places"),
+        (13, 25, 0, "less than 1"),
+    ])
+    def test_book_refused(self, points, number_of_places, places, message):
+        """
+        Test a refused booking leaves points and places untouched
+        """
+        club = Club("Simply Lift", "john@simplylift.co", points)
+        competition = Competition("Spring Festival", "2020-03-27 10:00:00", number_of_places)
+        with self.assertRaises(BookingError) as context:
+            self.engine.book(club, competition, places)
+        self.assertIn(message, str(context.exception))
+        self.assertEqual(club['points'], points)
+        self.assertEqual(competition['numberOfPlaces'], number_of_places)
+
+    def test_max_places_over_bookings(self):
+        """
+        Test with a ledger the places of a club in a competition are bounded over all its bookings
+        """
+        ledger = BookingLedger()
+        engine = BookingEngine(max_places=12, ledger=ledger)
+        club = Club("Simply Lift", "john@simplylift.co", 30)
+        competition = Competition("Spring Festival", "2030-03-27 10:00:00", 25)
+        engine.book(club, competition, 8)
+        with self.assertRaises(BookingError) as context:
+            engine.book(club, competition, 5)
+        self.assertEqual(str(context.exception),
+                         "Number of places required is greater than 4 : 8 of 12 already booked")
+        engine.book(club, competition, 4)
+        self.assertEqual(ledger.booked("Simply Lift", "Spring Festival"), 12)
+        self.assertEqual(club['points'], 18)
+        engine.book(Club("Iron Temple", "admin@irontemple.com", 4), competition, 4)
+        self.assertEqual(ledger.competition_total("Spring Festival"), 16)
+
+    def test_book_many(self):
+        """
+        Test a batch booking applies every booking, summing a same competition
+        """
+        club = Club("Simply Lift", "john@simplylift.co", 13)
+        spring = Competition("Spring Festival", "2030-03-27 10:00:00", 25)
+        fall = Competition("Fall Classic", "2030-10-22 13:30:00", 13)
+        self.engine.book_many(club, [(spring, 2), (fall, 3), (spring, 4)])
+        self.assertEqual(club['points'], 4)
+        self.assertEqual(spring['numberOfPlaces'], 19)
+        self.assertEqual(fall['numberOfPlaces'], 10)
+
+    @parameterized.expand([
+        ([5, 5, 5], "club's points"),
+        ([1, 13], "Fall Classic : Number of places required is greater than 12"),
+        ([1, 0], "Fall Classic : Number of places required is less than 1"),
+    ])
+    def test_book_many_refused(self, places, message):
+        """
+        Test a batch booking is all or nothing
+        """
+        club = Club("Simply Lift", "john@simplylift.co", 14)
+        competitions = [Competition("Spring Festival", "2030-03-27 10:00:00", 25),
+                        Competition("Fall Classic", "2030-10-22 13:30:00", 25),
+                        Competition("Winter Cup", "2030-12-22 13:30:00", 25)]
+        with self.assertRaises(BookingError) as context:
+            self.engine.book_many(club, list(zip(competitions, places)))
+        self.assertIn(message, str(context.exception))
+        self.assertEqual(club['points'], 14)
+        self.assertEqual([competition['numberOfPlaces'] for competition in competitions], [25, 25, 25])
+
+    def test_concurrent_bookings(self):
+        """
+        Stress test : many threads booking concurrently never oversell a
+        competition nor drive a club's points below zero
+        """
+        clubs = [Club(f"Club {i}", f"club{i}@example.com", 40) for i in range(4)]
+        competitions = [Competition(f"Competition {i}", "2030-01-01 10:00:00", 30) for i in range(3)]
+        booked = []
+        barrier = threading.Barrier(NB_THREADS)
+
+        def worker(index):
+            barrier.wait()
+            for attempt in range(NB_ATTEMPTS):
+                club = clubs[(index + attempt) % len(clubs)]
+                competition = competitions[(index * attempt) % len(competitions)]
+                try:
+                    self.engine.book(club, competition, 1 + attempt % 3)
+                except BookingError:
+                    continue
+                booked.append(1 + attempt % 3)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(NB_THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for club in clubs:
+            self.assertGreaterEqual(club['points'], 0)
+        for competition in competitions:
+            self.assertGreaterEqual(competition['numberOfPlaces'], 0)
+        self.assertEqual(sum(booked), 4 * 40 - sum(club['points'] for club in clubs))
+        self.assertEqual(sum(booked), 3 * 30 - sum(c['numberOfPlaces'] for c in competitions))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import importlib
+import sys
+import time
+import unittest
+import gevent
+from gevent import socket
+from webapp import server
+from webapp.green import offload, serve
+
+
+class OffloadUnitTests(unittest.TestCase):
+
+    def test_offload(self):
+        """
+        Test an offloaded blocking call returns its result without blocking the other greenlets
+        """
+        progress = []
+
+        def ticker():
+            for _ in range(5):
+                progress.append(time.monotonic())
+                gevent.sleep(0.02)
+
+        slow = offload(lambda value: time.sleep(0.2) or value)
+        start = time.monotonic()
+        greenlets = [gevent.spawn(slow, 1), gevent.spawn(slow, 2), gevent.spawn(ticker)]
+        gevent.joinall(greenlets)
+        self.assertEqual([greenlet.value for greenlet in greenlets[:2]], [1, 2])
+        self.assertEqual(len(progress), 5)
+        self.assertLess(progress[-1] - start, 0.2)
+        self.assertLess(time.monotonic() - start, 0.4)
+
+
+class ServeUnitTests(unittest.TestCase):
+
+    def test_serve(self):
+        """
+        Test the gevent server serves the app
+        """
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        port = listener.getsockname()[1]
+        listener.close()
+        greenlet = gevent.spawn(serve, server.app, port=port, max_connections=10)
+        try:
+            gevent.sleep(0.1)
+            connection = socket.create_connection(('127.0.0.1', port), timeout=5)
+            connection.sendall(b'GET / HTTP/1.0\r\nHost: localhost\r\n\r\n')
+            response = b''
+            while True:
+                data = connection.recv(65536)
+                if not data:
+                    break
+                response += data
+            connection.close()
+            self.assertTrue(response.startswith(b'HTTP/1.1 200'))
+            self.assertIn(b'<html', response.lower())
+        finally:
+            greenlet.kill()
+
+    def test_run_imported(self):
+        """
+        Test run.py imported by a WSGI server leaves its arguments alone and exposes the app
+        """
+        argv = sys.argv
+        sys.argv = ['gunicorn', '-w', '4', '-k', 'gevent', 'run:app']
+        try:
+            run = importlib.import_module('run')
+        finally:
+            sys.argv = argv
+        self.assertIs(run.app, server.app)
+
+
+if __name__ == "__main__":
+    unittest.main()
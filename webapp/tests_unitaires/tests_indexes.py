@@ -0,0 +1,121 @@
+import random
+import threading
+import time
+import unittest
+from parameterized import parameterized
+from webapp.indexes import SortedIndex
+from webapp.models import Club
+
+
+def points_key(club):
+    return (club['points'], club['name'])
+
+
+class SortedIndexUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.clubs = [Club(f"Club {i:02d}", f"club{i}@example.com", (i * 7) % 20) for i in range(20)]
+        self.index = SortedIndex(points_key, self.clubs)
+
+    def expected(self):
+        return sorted(self.clubs, key=points_key)
+
+    @parameterized.expand([
+        (0, 5, False),
+        (15, 10, False),
+        (0, 5, True),
+        (17, 5, True),
+        (30, 5, True),
+    ])
+    def test_page(self, offset, limit, reverse):
+        """
+        Test a page holds the records offset to offset + limit of the order
+        """
+        page = self.index.page(offset, limit, reverse)
+        expected = self.expected()[::-1] if reverse else self.expected()
+        self.assertEqual(page.items, expected[offset:offset + limit])
+        self.assertEqual(page.total, 20)
+        self.assertEqual(page.has_next, offset + limit < 20)
+
+    def test_update(self):
+        """
+        Test records move to their new position when their key changes
+        """
+        generator = random.Random(11)
+        for _ in range(200):
+            club = generator.choice(self.clubs)
+            club['points'] = generator.randrange(30)
+            self.index.update(club)
+        self.assertEqual(list(self.index), self.expected())
+
+    def test_add_discard(self):
+        """
+        Test records can be added and removed
+        """
+        club = Club("Club new", "new@example.com", 5)
+        self.clubs.append(club)
+        self.index.add(club)
+        self.assertEqual(list(self.index), self.expected())
+        self.clubs.remove(club)
+        self.index.discard(club)
+        self.assertEqual(list(self.index), self.expected())
+        self.assertEqual(len(self.index), 20)
+
+    def test_snapshot(self):
+        """
+        Test a snapshot keeps its order while the index changes, and is read without the writer lock
+        """
+        snapshot = self.index.snapshot()
+        expected = self.expected()
+        for club in self.clubs[:10]:
+            self.index.discard(club)
+        self.assertEqual(list(snapshot), expected)
+        self.assertEqual(len(self.index), 10)
+        with self.index._lock:
+            self.assertEqual(self.index.page(0, 20).items, sorted(self.clubs[10:], key=points_key))
+
+    def test_rows(self):
+        """
+        Test the index holds the rows of the records, replaced when they change
+        """
+        index = SortedIndex(lambda club: (club['name'],), self.clubs, lambda club: club.snapshot())
+        club = self.clubs[3]
+        row = index.page(3, 1).items[0]
+        club['points'] = 99
+        self.assertEqual(row['points'], (3 * 7) % 20)
+        index.update(club)
+        self.assertEqual(index.page(3, 1).items[0]['points'], 99)
+        self.assertEqual(len(index), 20)
+
+    def test_concurrent_updates(self):
+        """
+        Test an update that read the values of a record before a newer update cannot publish them after it
+        """
+        club = self.clubs[3]
+        read, resume = threading.Event(), threading.Event()
+
+        def slow_row(record):
+            row = record.snapshot()
+            if threading.current_thread().name == 'first' and not read.is_set():
+                read.set()
+                resume.wait(5)
+            return row
+
+        index = SortedIndex(points_key, self.clubs, slow_row)
+        club['points'] = 12
+        first = threading.Thread(target=index.update, args=(club,), name='first')
+        first.start()
+        read.wait(5)
+        club['points'] = 10
+        second = threading.Thread(target=index.update, args=(club,))
+        second.start()
+        time.sleep(0.05)
+        resume.set()
+        first.join()
+        second.join()
+        rows = [row for row in index if row['name'] == club['name']]
+        self.assertEqual([row['points'] for row in rows], [10])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,206 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+from webapp.booking import BookingEngine
+from webapp.journal import BookingJournal
+from webapp.ledger import BookingLedger
+from webapp.models import Club, Competition
+from webapp.registry import Registry
+
+
+def make_registry():
+    clubs = [Club("Simply Lift", "john@simplylift.co", "13"), Club("She Lifts", "kate@shelifts.co.uk", "12")]
+    competitions = [Competition("Spring Festival", "2030-03-27 10:00:00", "25")]
+    return Registry(clubs, competitions)
+
+
+def book_then_crash(path):
+    registry = make_registry()
+    ledger = BookingLedger()
+    journal = BookingJournal(path, registry.state, ledger=ledger)
+    journal.replay(registry)
+    engine = BookingEngine(12, journal=journal, ledger=ledger)
+    club = registry.get_club_by_name("Simply Lift")
+    competition = registry.get_competition_by_name("Spring Festival")
+    engine.book(club, competition, 2)
+    engine.book(club, competition, 3)
+    journal.compact()
+    engine.book(club, competition, 1)
+    # neither the journal nor the ledger is closed
+    os._exit(0)
+
+
+class BookingJournalUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'bookings.journal')
+        self.fsyncs = 0
+        self.fsync_delay = 0
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def counting_fsync(self, fd):
+        self.fsyncs += 1
+        time.sleep(self.fsync_delay)
+        os.fsync(fd)
+
+    def start(self, compact_every=1000):
+        registry = make_registry()
+        journal = BookingJournal(self.path, registry.state, compact_every=compact_every,
+                                 fsync=self.counting_fsync)
+        journal.replay(registry)
+        return registry, journal, BookingEngine(12, journal=journal)
+
+    def test_replay(self):
+        """
+        Test bookings survive a restart
+        """
+        registry, journal, engine = self.start()
+        engine.book(registry.get_club_by_name("Simply Lift"), registry.get_competition_by_name("Spring Festival"), 3)
+        engine.book(registry.get_club_by_name("She Lifts"), registry.get_competition_by_name("Spring Festival"), 2)
+        journal.close()
+        registry, journal, engine = self.start()
+        self.assertEqual(registry.get_club_by_name("Simply Lift")['points'], 10)
+        self.assertEqual(registry.get_club_by_name("She Lifts")['points'], 10)
+        self.assertEqual(registry.get_competition_by_name("Spring Festival")['numberOfPlaces'], 20)
+        journal.close()
+
+    def test_ledger_after_crash(self):
+        """
+        Test the places booked by a club in a competition survive a crash, from the snapshot and the events
+        """
+        process = multiprocessing.Process(target=book_then_crash, args=(self.path,))
+        process.start()
+        process.join(60)
+        self.assertEqual(process.exitcode, 0)
+        registry = make_registry()
+        ledger = BookingLedger()
+        journal = BookingJournal(self.path, registry.state, ledger=ledger)
+        self.assertEqual(journal.replay(registry), 1)
+        self.assertEqual(ledger.booked("Simply Lift", "Spring Festival"), 6)
+        self.assertEqual(ledger.club_total("Simply Lift"), 6)
+        engine = BookingEngine(12, journal=journal, ledger=ledger)
+        with self.assertRaisesRegex(AssertionError, "greater than 6 : 6 of 12 already booked"):
+            engine.book(registry.get_club_by_name("Simply Lift"), registry.get_competition_by_name("Spring Festival"), 7)
+        journal.close()
+
+    def test_compaction(self):
+        """
+        Test the journal is folded into a snapshot and truncated
+        """
+        registry, journal, engine = self.start(compact_every=2)
+        club = registry.get_club_by_name("Simply Lift")
+        competition = registry.get_competition_by_name("Spring Festival")
+        for _ in range(3):
+            engine.book(club, competition, 1)
+        journal.close()
+        with open(journal.snapshot_path) as snapshot_file:
+            snapshot_seq = json.load(snapshot_file)['seq']
+        self.assertGreaterEqual(snapshot_seq, 2)
+        with open(self.path) as journal_file:
+            self.assertEqual([json.loads(line)['seq'] for line in journal_file], list(range(snapshot_seq + 1, 4)))
+        registry, journal, engine = self.start()
+        self.assertEqual(registry.get_club_by_name("Simply Lift")['points'], 10)
+        self.assertEqual(registry.get_competition_by_name("Spring Festival")['numberOfPlaces'], 22)
+        journal.close()
+
+    def test_compaction_off_booking_path(self):
+        """
+        Test bookings are journaled while a compaction writes the snapshot, and kept by it
+        """
+        registry, journal, engine = self.start()
+        club = registry.get_club_by_name("Simply Lift")
+        competition = registry.get_competition_by_name("Spring Festival")
+        engine.book(club, competition, 1)
+        writing, release = threading.Event(), threading.Event()
+
+        def slow_fsync(fd):
+            writing.set()
+            release.wait(5)
+            os.fsync(fd)
+
+        journal.fsync = slow_fsync
+        compaction = threading.Thread(target=journal.compact)
+        compaction.start()
+        self.assertTrue(writing.wait(5))
+        journal.fsync = os.fsync
+        booking = threading.Thread(target=engine.book, args=(club, competition, 2))
+        booking.start()
+        booking.join(5)
+        self.assertFalse(booking.is_alive())
+        release.set()
+        compaction.join(5)
+        journal.close()
+        with open(self.path) as journal_file:
+            self.assertEqual([json.loads(line)['seq'] for line in journal_file], [2])
+        registry, journal, engine = self.start()
+        self.assertEqual(registry.get_club_by_name("Simply Lift")['points'], 10)
+        journal.close()
+
+    def test_torn_write(self):
+        """
+        Test a partially written last event is ignored on replay
+        """
+        registry, journal, engine = self.start()
+        engine.book(registry.get_club_by_name("Simply Lift"), registry.get_competition_by_name("Spring Festival"), 1)
+        journal.close()
+        with open(self.path, 'a') as journal_file:
+            journal_file.write('{"seq": 2, "club"')
+        registry, journal, engine = self.start()
+        self.assertEqual(registry.get_club_by_name("Simply Lift")['points'], 12)
+        journal.close()
+
+    def test_booking_after_torn_write(self):
+        """
+        Test the torn event is cut off on replay, so the bookings made after the restart are replayed next time
+        """
+        registry, journal, engine = self.start()
+        engine.book(registry.get_club_by_name("Simply Lift"), registry.get_competition_by_name("Spring Festival"), 1)
+        journal.close()
+        with open(self.path, 'a') as journal_file:
+            journal_file.write('{"seq": 2, "club"')
+        registry, journal, engine = self.start()
+        engine.book(registry.get_club_by_name("Simply Lift"), registry.get_competition_by_name("Spring Festival"), 5)
+        journal.close()
+        registry, journal, engine = self.start()
+        self.assertEqual(registry.get_club_by_name("Simply Lift")['points'], 7)
+        self.assertEqual(registry.get_competition_by_name("Spring Festival")['numberOfPlaces'], 19)
+        journal.close()
+
+    def test_group_commit(self):
+        """
+        Test concurrent bookings share fsyncs
+        """
+        # a slow disk : the bookings made during an fsync share the next one
+        self.fsync_delay = 0.01
+        registry, journal, engine = self.start()
+        club = registry.get_club_by_name("Simply Lift")
+        competition = registry.get_competition_by_name("Spring Festival")
+        club['points'] = 1000
+        competition['numberOfPlaces'] = 1000
+        nb_threads, nb_bookings = 8, 50
+
+        def worker():
+            for _ in range(nb_bookings):
+                engine.book(club, competition, 1)
+
+        threads = [threading.Thread(target=worker) for _ in range(nb_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        journal.close()
+        self.assertLess(self.fsyncs, nb_threads * nb_bookings // 2)
+        registry, journal, engine = self.start()
+        self.assertEqual(registry.get_club_by_name("Simply Lift")['points'], 1000 - nb_threads * nb_bookings)
+        journal.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
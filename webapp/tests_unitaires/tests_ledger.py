@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from webapp.ledger import BookingLedger
+from webapp.pool import ConnectionPool
+
+
+class BookingLedgerUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'bookings.ledger')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_totals(self):
+        """
+        Test the totals by club and competition, by club and by competition
+        """
+        ledger = BookingLedger()
+        ledger.record("Simply Lift", "Spring Festival", 2)
+        ledger.record("Simply Lift", "Fall Classic", 3)
+        ledger.record("Iron Temple", "Spring Festival", 1)
+        ledger.record("Simply Lift", "Spring Festival", 4)
+        self.assertEqual(ledger.booked("Simply Lift", "Spring Festival"), 6)
+        self.assertEqual(ledger.booked("Iron Temple", "Fall Classic"), 0)
+        self.assertEqual(ledger.club_total("Simply Lift"), 9)
+        self.assertEqual(ledger.competition_total("Spring Festival"), 7)
+        self.assertEqual(ledger.club_bookings("Simply Lift"), {"Spring Festival": 6, "Fall Classic": 3})
+        self.assertEqual(ledger.club_bookings("She Lifts"), {})
+        self.assertEqual(len(ledger), 4)
+
+    def test_spill(self):
+        """
+        Test the oldest entries are written to the file, and the history reads them back first
+        """
+        ledger = BookingLedger(self.path, keep=4)
+        for places in range(1, 7):
+            ledger.record("Simply Lift", "Spring Festival", places)
+        self.assertEqual(len(ledger._entries), 3)
+        with open(self.path) as ledger_file:
+            self.assertEqual(len(ledger_file.readlines()), 3)
+        self.assertEqual([entry['places'] for entry in ledger.history()], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(ledger.booked("Simply Lift", "Spring Festival"), 21)
+        ledger.record("Iron Temple", "Fall Classic", 2)
+        self.assertEqual([entry['seq'] for entry in ledger.history(club="Iron Temple")], [7])
+        ledger.close()
+
+    def test_spill_without_file(self):
+        """
+        Test without a file the oldest entries are dropped but the totals are kept
+        """
+        ledger = BookingLedger(keep=4)
+        for places in range(1, 7):
+            ledger.record("Simply Lift", "Spring Festival", places)
+        self.assertEqual([entry['places'] for entry in ledger.history()], [4, 5, 6])
+        self.assertEqual(ledger.club_total("Simply Lift"), 21)
+
+    def test_reopen(self):
+        """
+        Test a ledger opened on the file of a closed one gets its totals back
+        """
+        ledger = BookingLedger(self.path, keep=4)
+        for places in range(1, 7):
+            ledger.record("Simply Lift", "Spring Festival", places)
+        ledger.close()
+        ledger = BookingLedger(self.path, keep=4)
+        self.assertEqual(ledger.booked("Simply Lift", "Spring Festival"), 21)
+        self.assertEqual(ledger.record("Simply Lift", "Fall Classic", 1), 7)
+        ledger.clear()
+        self.assertEqual(ledger.club_total("Simply Lift"), 0)
+        self.assertEqual(list(ledger.history()), [])
+        ledger.close()
+
+    def test_restore(self):
+        """
+        Test restored totals replace those of the club in the competition
+        """
+        ledger = BookingLedger()
+        ledger.record("Simply Lift", "Spring Festival", 2)
+        ledger.restore("Simply Lift", "Spring Festival", 5)
+        ledger.restore("Iron Temple", "Fall Classic", 1)
+        self.assertEqual(ledger.booked("Simply Lift", "Spring Festival"), 5)
+        self.assertEqual(ledger.club_total("Simply Lift"), 5)
+        self.assertEqual(ledger.competition_total("Fall Classic"), 1)
+        self.assertEqual(ledger.totals(), {"Simply Lift": {"Spring Festival": 5}, "Iron Temple": {"Fall Classic": 1}})
+
+    def test_pool(self):
+        """
+        Test with a database the totals are shared by the ledgers on it and kept without closing them
+        """
+        path = os.path.join(self.directory.name, 'gudlft.db')
+        ledger_1 = BookingLedger(pool=ConnectionPool(path))
+        ledger_2 = BookingLedger(pool=ConnectionPool(path))
+        ledger_1.record("Simply Lift", "Spring Festival", 2)
+        ledger_2.record("Simply Lift", "Spring Festival", 3)
+        ledger_2.record("Simply Lift", "Fall Classic", 1)
+        ledger_1.record("Iron Temple", "Spring Festival", 4)
+        for ledger in (ledger_1, ledger_2, BookingLedger(pool=ConnectionPool(path))):
+            self.assertEqual(ledger.booked("Simply Lift", "Spring Festival"), 5)
+            self.assertEqual(ledger.club_total("Simply Lift"), 6)
+            self.assertEqual(ledger.competition_total("Spring Festival"), 9)
+            self.assertEqual(ledger.club_bookings("Simply Lift"), {"Spring Festival": 5, "Fall Classic": 1})
+        ledger_1.clear()
+        self.assertEqual(ledger_2.club_total("Simply Lift"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import json
+import threading
+import unittest
+from webapp import server
+from webapp.booking import booking_completed
+from webapp.live import Broadcaster
+
+
+def parse(chunk):
+    """
+    Events of a chunk of the stream as (event, data) pairs
+    """
+    events = []
+    for block in chunk.decode().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line and line[0] != ':')
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class BroadcasterUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.broadcaster = Broadcaster(history=3, keepalive=0.01)
+
+    def test_subscribe(self):
+        """
+        Test a subscriber receives the events published after it subscribed, in one write
+        """
+        self.broadcaster.publish('booking', {'club': 'Before'})
+        stream = self.broadcaster.subscribe()
+        self.assertEqual(next(stream), b"retry: 3000\n\n")
+        self.assertEqual(self.broadcaster.subscribers, 1)
+        self.broadcaster.publish('booking', {'club': 'A'})
+        self.broadcaster.publish('booking', {'club': 'B'})
+        self.assertEqual(parse(next(stream)), [('booking', {'club': 'A'}), ('booking', {'club': 'B'})])
+        self.assertEqual(next(stream), b": keepalive\n\n")
+        stream.close()
+        self.assertEqual(self.broadcaster.subscribers, 0)
+
+    def test_wakes_up(self):
+        """
+        Test a waiting subscriber is woken up by a publication from another thread
+        """
+        self.broadcaster.keepalive = 5
+        stream = self.broadcaster.subscribe()
+        next(stream)
+        threading.Timer(0.05, self.broadcaster.publish, ('booking', {'club': 'A'})).start()
+        self.assertEqual(parse(next(stream)), [('booking', {'club': 'A'})])
+        stream.close()
+
+    def test_reconnect(self):
+        """
+        Test a client reconnecting gets the events it missed, or a reset when they left the history
+        """
+        first = self.broadcaster.publish('booking', {'club': 'A'})
+        self.broadcaster.publish('booking', {'club': 'B'})
+        stream = self.broadcaster.subscribe(first)
+        next(stream)
+        self.assertEqual(parse(next(stream)), [('booking', {'club': 'B'})])
+        stream.close()
+        for name in 'CDE':
+            self.broadcaster.publish('booking', {'club': name})
+        stream = self.broadcaster.subscribe(first)
+        next(stream)
+        self.assertEqual(parse(next(stream)), [('reset', {})])
+        stream.close()
+
+    def test_unknown_id(self):
+        """
+        Test a client reconnecting with an id this broadcaster did not issue gets a reset
+        """
+        last_id = self.broadcaster.publish('booking', {'club': 'A'})
+        other = Broadcaster().publish('booking', {'club': 'B'})
+        ahead = last_id.replace('-1', '-5')
+        for event_id in (other, ahead, '12', 'garbage'):
+            stream = self.broadcaster.subscribe(event_id)
+            next(stream)
+            self.assertEqual(parse(next(stream)), [('reset', {})])
+            stream.close()
+        stream = self.broadcaster.subscribe(last_id)
+        next(stream)
+        self.broadcaster.publish('booking', {'club': 'C'})
+        self.assertEqual(parse(next(stream)), [('booking', {'club': 'C'})])
+        stream.close()
+
+
+class EventsRouteUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        server.app.config['LIVE_FEED'] = True
+
+    def tearDown(self) -> None:
+        server.app.config['LIVE_FEED'] = False
+
+    def test_live_feed_off(self):
+        """
+        Test without LIVE_FEED the pages do not open the stream and /events is not served
+        """
+        server.app.config['LIVE_FEED'] = False
+        client = server.app.test_client()
+        self.assertNotIn(b'live-feed', client.get('/displayPoints').data)
+        self.assertEqual(client.get('/events').status_code, 404)
+        server.app.config['LIVE_FEED'] = True
+        self.assertIn(b'live-feed', client.get('/displayPoints?limit=7').data)
+
+    def test_reset_url(self):
+        """
+        Test the page reloaded on reset is the normalized listing, not the query string of the first request
+        """
+        client = server.app.test_client()
+        client.get('/displayPoints?offset=-5&tracking=1&limit=3')
+        body = client.get('/displayPoints?limit=3').data.decode()
+        self.assertIn('data-reset-url="/displayPoints?sort=name&amp;order=asc&amp;offset=0&amp;limit=3"', body)
+
+    def test_booking_event(self):
+        """
+        Test a completed booking is pushed to the /events stream with the points and places left
+        """
+        club = server.registry.get_club_by_name("Simply Lift")
+        competition = server.registry.get_competition_by_name("Spring Festival")
+        last_id = server.broadcaster.last_id
+        booking_completed.send(server.engine, club=club, competition=competition, places=0)
+        response = server.app.test_client().get('/events', headers={'Last-Event-ID': str(last_id)}, buffered=False)
+        try:
+            self.assertEqual(response.mimetype, 'text/event-stream')
+            self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+            stream = iter(response.response)
+            next(stream)
+            self.assertEqual(parse(next(stream)), [('booking', {
+                'club': "Simply Lift", 'points': club['points'],
+                'competition': "Spring Festival", 'places': competition['numberOfPlaces']})])
+        finally:
+            response.close()
+
+    def test_pulled_event(self):
+        """
+        Test points and places pulled from another worker are pushed to the /events stream
+        """
+        last_id = server.broadcaster.last_id
+        server.on_changes_pulled(None, [('club', "Simply Lift", 4), ('competition', "Spring Festival", 7)])
+        stream = server.broadcaster.subscribe(last_id)
+        try:
+            next(stream)
+            self.assertEqual(parse(next(stream)), [('booking', {'club': "Simply Lift", 'points': 4}),
+                                                   ('booking', {'competition': "Spring Festival", 'places': 7})])
+        finally:
+            stream.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+import unittest
+from parameterized import parameterized
+from webapp.loaders import iter_records, load_records
+
+
+class LoadersUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'clubs.json')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write(self, text):
+        with open(self.path, 'w', encoding='utf-8') as json_file:
+            json_file.write(text)
+
+    @parameterized.expand([
+        (1,),
+        (7,),
+        (4096,),
+    ])
+    def test_iter_records(self, chunk_size):
+        """
+        Test records are the same as with json.load whatever the chunk size
+        """
+        clubs = [{"name": f"Club \"{i}\" é", "email": f"club{i}@example.com", "points": str(i)} for i in range(50)]
+        text = json.dumps({"version": {"clubs": "not this one"}, "clubs": clubs}, indent=4)
+        self.write(text)
+        self.assertEqual(list(iter_records(self.path, 'clubs', chunk_size=chunk_size)), clubs)
+
+    @parameterized.expand([
+        (1,),
+        (37,),
+        (64,),
+        (4096,),
+    ])
+    def test_iter_records_nested(self, chunk_size):
+        """
+        Test records holding objects and braces in strings, whose last '}' in a chunk may not end a record
+        """
+        clubs = [{"name": f"Club {i} }}, {{", "meta": {"tags": [{"id": i}, "}]"], "x": {}}} for i in range(40)]
+        self.write(json.dumps({"clubs": clubs, "after": {"a": 1}}))
+        self.assertEqual(list(iter_records(self.path, 'clubs', chunk_size=chunk_size)), clubs)
+
+    @parameterized.expand([
+        (1,),
+        (4096,),
+    ])
+    def test_top_level_key(self, chunk_size):
+        """
+        Test only the array of the top-level key is read, nested values being skipped
+        """
+        self.write('{"meta": {"clubs": [{"a": 1}], "note": "\\"clubs\\": ["}, "count": 2, "ok": true, '
+                   '"clubs": [{"b": 2}, {"b": 3}]}')
+        self.assertEqual(list(iter_records(self.path, 'clubs', chunk_size=chunk_size)), [{"b": 2}, {"b": 3}])
+
+    @parameterized.expand([
+        ('{"clubs": [{"a": 1} {"a": 2}]}',),
+        ('{"clubs": [{"a": 1},, {"a": 2}]}',),
+        ('{"clubs": [{"a": 1},]}',),
+        ('{"clubs": [1, 2, 3]}',),
+        ('{"clubs": {"a": 1}}',),
+        ('["clubs", [{"a": 1}]]',),
+        ('{"meta": {"clubs": [{"a": 1}]}}',),
+    ])
+    def test_load_records_malformed(self, text):
+        """
+        Test a malformed array, a non-object element or a nested-only key raise ValueError
+        """
+        self.write(text)
+        for chunk_size in (1, 4096):
+            with self.assertRaises(ValueError):
+                list(iter_records(self.path, 'clubs', chunk_size=chunk_size))
+
+    def test_load_records_empty_array(self):
+        """
+        Test an empty array gives an empty list
+        """
+        self.write('{"clubs" : [ ]}')
+        self.assertEqual(load_records(self.path, 'clubs'), [])
+
+    def test_load_records_missing_key(self):
+        """
+        Test a missing array raises ValueError
+        """
+        self.write('{"competitions": []}')
+        with self.assertRaises(ValueError):
+            load_records(self.path, 'clubs')
+
+    def test_load_records_truncated(self):
+        """
+        Test a truncated file raises ValueError
+        """
+        self.write('{"clubs": [{"name": "Simply Lift", "points"')
+        with self.assertRaises(ValueError):
+            load_records(self.path, 'clubs')
+
+
+if __name__ == "__main__":
+    unittest.main()
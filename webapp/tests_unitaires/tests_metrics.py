@@ -0,0 +1,84 @@
+import unittest
+from webapp import server
+from webapp.metrics import MetricsRegistry
+
+
+class MetricsUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.metrics = MetricsRegistry()
+
+    def test_counter(self):
+        """
+        Test a counter is exposed once per combination of labels
+        """
+        counter = self.metrics.counter('bookings_total', "Bookings", ('result',))
+        counter.inc('success')
+        counter.inc('success')
+        counter.inc('failure')
+        text = self.metrics.expose()
+        self.assertIn('# TYPE bookings_total counter\n', text)
+        self.assertIn('bookings_total{result="success"} 2\n', text)
+        self.assertIn('bookings_total{result="failure"} 1\n', text)
+
+    def test_histogram(self):
+        """
+        Test histogram buckets are cumulative and end with +Inf, sum and count
+        """
+        histogram = self.metrics.histogram('latency_seconds', "Latency", ('endpoint',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, 'index')
+        text = self.metrics.expose()
+        self.assertIn('latency_seconds_bucket{endpoint="index",le="0.1"} 2\n', text)
+        self.assertIn('latency_seconds_bucket{endpoint="index",le="1.0"} 3\n', text)
+        self.assertIn('latency_seconds_bucket{endpoint="index",le="+Inf"} 4\n', text)
+        self.assertIn('latency_seconds_sum{endpoint="index"} 3.65\n', text)
+        self.assertIn('latency_seconds_count{endpoint="index"} 4\n', text)
+
+    def test_label_escaping(self):
+        """
+        Test quotes and backslashes of label values are escaped
+        """
+        counter = self.metrics.counter('requests_total', "Requests", ('endpoint',))
+        counter.inc('say "hi"\\')
+        self.assertIn('requests_total{endpoint="say \\"hi\\"\\\\"} 1\n', self.metrics.expose())
+
+
+class MetricsEndpointUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.app = server.app
+        self.app.config['TESTING'] = True
+        self.test_client = self.app.test_client()
+
+    def test_metrics(self):
+        """
+        Test route /metrics exposes the request, template and lookup metrics
+        """
+        count = server.request_seconds.count('index', 'GET')
+        self.test_client.get("/")
+        self.test_client.get("/book/Spring Festival/Unknown club")
+        self.assertEqual(server.request_seconds.count('index', 'GET'), count + 1)
+        response = self.test_client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        text = response.get_data(as_text=True)
+        self.assertIn('gudlft_request_duration_seconds_bucket{endpoint="index",method="GET",le="+Inf"}', text)
+        self.assertIn('gudlft_requests_total{endpoint="index",method="GET",status="200"}', text)
+        self.assertIn('gudlft_template_render_seconds_count{template="index.html"}', text)
+        self.assertIn('gudlft_lookup_duration_seconds_count{lookup="club_by_name"}', text)
+        self.assertNotIn('endpoint="metrics_endpoint"', text)
+
+    def test_booking_metrics(self):
+        """
+        Test refused bookings are counted
+        """
+        failures = server.bookings_total.value('failure')
+        self.test_client.post("/purchasePlaces", data={"club": "Simply Lift", "competition": "Spring Festival",
+                                                       "places": "0"})
+        self.assertEqual(server.bookings_total.value('failure'), failures + 1)
+        self.assertGreater(server.lock_wait_seconds.count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
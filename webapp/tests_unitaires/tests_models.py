@@ -0,0 +1,63 @@
+import unittest
+from datetime import datetime
+from parameterized import parameterized
+from webapp.models import Club, Competition
+
+
+class ModelsUnitTests(unittest.TestCase):
+
+    def test_club(self):
+        """
+        Test a club parses its points once and keeps the mapping access
+        """
+        club = Club.from_record({"name": "Simply Lift", "email": "john@simplylift.co", "points": "13"})
+        self.assertEqual(club['points'], 13)
+        self.assertTrue('email' in club)
+        self.assertFalse('__dict__' in dir(club))
+        self.assertEqual(club.to_dict(), {"name": "Simply Lift", "email": "john@simplylift.co", "points": "13"})
+        with self.assertRaises(KeyError):
+            club['unknown']
+
+    def test_competition(self):
+        """
+        Test a competition parses its date and places once
+        """
+        competition = Competition.from_record({"name": "Spring Festival", "date": "2020-03-27 10:00:00",
+                                               "numberOfPlaces": "25"})
+        self.assertEqual(competition['numberOfPlaces'], 25)
+        self.assertEqual(competition['date'], "2020-03-27 10:00:00")
+        self.assertEqual(competition.get_datetime(), datetime(2020, 3, 27, 10))
+
+    def test_snapshot(self):
+        """
+        Test a snapshot is a read-only copy kept until the record changes
+        """
+        competition = Competition("Spring Festival", "2020-03-27 10:00:00", "25")
+        row = competition.snapshot()
+        self.assertIs(competition.snapshot(), row)
+        self.assertEqual(row['date'], "2020-03-27 10:00:00")
+        self.assertEqual(row.datetime, datetime(2020, 3, 27, 10, 0))
+        competition['numberOfPlaces'] = 20
+        self.assertEqual(row['numberOfPlaces'], 25)
+        self.assertEqual(competition.snapshot()['numberOfPlaces'], 20)
+        with self.assertRaises(TypeError):
+            row['numberOfPlaces'] = 0
+
+    @parameterized.expand([
+        ("05-12-2021 13:30:00",),
+        ("2021-02-29 13:30:00",),
+    ])
+    def test_competition_date_error(self, date):
+        """
+        Test a non valid date is flagged at load and raises ValueError on use
+        """
+        competition = Competition("Date Error", date, "13")
+        self.assertIsNotNone(competition.date_error)
+        with self.assertRaises(ValueError):
+            competition.get_datetime()
+        competition['date'] = "2021-03-01 13:30:00"
+        self.assertEqual(competition.get_datetime(), datetime(2021, 3, 1, 13, 30))
+
+
+if __name__ == "__main__":
+    unittest.main()
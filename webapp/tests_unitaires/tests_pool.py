@@ -0,0 +1,105 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from webapp.pool import ConnectionPool
+
+
+class ConnectionPoolUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'pool.db')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_nested(self):
+        """
+        Test nested blocks of a thread share its connection
+        """
+        pool = ConnectionPool(self.path, size=2)
+        with pool.connection() as outer:
+            with pool.connection() as inner:
+                self.assertIs(inner, outer)
+            self.assertEqual(pool.stats()['in_use'], 1)
+        self.assertEqual(pool.stats()['in_use'], 0)
+        self.assertEqual(pool.stats()['checkouts'], 1)
+
+    def test_affinity(self):
+        """
+        Test a thread gets back the connection it used last
+        """
+        pool = ConnectionPool(self.path, size=2)
+        released = threading.Event()
+
+        def other():
+            with pool.connection():
+                released.wait(5)
+
+        thread = threading.Thread(target=other)
+        thread.start()
+        with pool.connection() as first:
+            pass
+        released.set()
+        thread.join()
+        with pool.connection() as again:
+            self.assertIs(again, first)
+        stats = pool.stats()
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['affinity_hits'], 1)
+
+    def test_bounded(self):
+        """
+        Test threads wait for a connection once `size` of them are in use
+        """
+        pool = ConnectionPool(self.path, size=2)
+        in_use = []
+        peak = []
+        lock = threading.Lock()
+
+        def work():
+            with pool.connection() as connection:
+                with lock:
+                    in_use.append(connection)
+                    peak.append(len(in_use))
+                connection.execute('SELECT 1').fetchone()
+                time.sleep(0.02)
+                with lock:
+                    in_use.remove(connection)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = pool.stats()
+        self.assertLessEqual(max(peak), 2)
+        self.assertEqual(stats['connections'], 2)
+        self.assertGreater(stats['waits'], 0)
+        self.assertGreater(stats['wait_time'], 0)
+
+    def test_timeout(self):
+        """
+        Test a thread gives up when no connection is released in time
+        """
+        pool = ConnectionPool(self.path, size=1, timeout=0.05)
+        errors = []
+
+        def other():
+            try:
+                with pool.connection():
+                    pass
+            except TimeoutError as timeout_error:
+                errors.append(timeout_error)
+
+        with pool.connection():
+            thread = threading.Thread(target=other)
+            thread.start()
+            thread.join()
+        self.assertEqual(len(errors), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
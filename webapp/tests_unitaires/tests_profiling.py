@@ -0,0 +1,130 @@
+import sys
+import unittest
+from greenlet import greenlet
+from webapp import server
+from webapp.profiling import RequestProfile, SamplingProfiler, phase
+
+
+def leaf():
+    return sum(range(1000))
+
+
+def other():
+    return sum(range(1000))
+
+
+def later():
+    return sum(range(1000))
+
+
+def work():
+    with phase('lookup'):
+        leaf()
+    with phase('render'):
+        leaf()
+
+
+class ProfilingUnitTests(unittest.TestCase):
+
+    def test_request_profile(self):
+        """
+        Test stacks are charged to the phase they ran in
+        """
+        profile = RequestProfile()
+        profile.start()
+        work()
+        profile.stop()
+        phases = {stack.split(';', 1)[0] for stack, _ in profile.stacks.items() if 'leaf' in stack}
+        self.assertEqual(phases, {'lookup', 'render'})
+        for stack in profile.stacks:
+            if stack.endswith('sum (builtin)'):
+                self.assertIn(';work (tests_profiling.py:', stack)
+
+    def test_greenlets(self):
+        """
+        Test requests profiled in greenlets of one thread only record their own frames
+        """
+        profiles = [RequestProfile(), RequestProfile()]
+
+        def first():
+            profiles[0].start()
+            second_greenlet.switch()
+            leaf()
+            profiles[0].stop()
+            second_greenlet.switch()
+
+        def second():
+            profiles[1].start()
+            other()
+            first_greenlet.switch()
+            # still profiled once the first request stopped
+            later()
+            profiles[1].stop()
+
+        first_greenlet, second_greenlet = greenlet(first), greenlet(second)
+        first_greenlet.switch()
+        self.assertIsNone(sys.getprofile())
+        first_stacks, second_stacks = (' '.join(profile.stacks) for profile in profiles)
+        self.assertIn('leaf (', first_stacks)
+        self.assertNotIn('other (', first_stacks)
+        self.assertNotIn('leaf (', second_stacks)
+        self.assertIn('other (', second_stacks)
+        self.assertIn('later (', second_stacks)
+
+    def test_sample_rate(self):
+        """
+        Test no request is profiled with a zero sample rate, all with 1
+        """
+        self.assertIsNone(SamplingProfiler(0).sample())
+        profiler = SamplingProfiler(1.0)
+        profile = profiler.sample()
+        work()
+        profile.stop()
+        profiler.add(profile)
+        self.assertEqual(profiler.requests, 1)
+        lines = profiler.collapsed().splitlines()
+        self.assertTrue(any(line.startswith('lookup;') for line in lines))
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in lines))
+        profiler.clear()
+        self.assertEqual(profiler.collapsed(), '')
+
+
+class AdminProfileUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.app = server.app
+        self.app.config['TESTING'] = True
+        self.app.config['ADMIN_TOKEN'] = 'secret'
+        self.test_client = self.app.test_client()
+        self.sample_rate = server.profiler.sample_rate
+
+    def tearDown(self) -> None:
+        self.app.config['ADMIN_TOKEN'] = None
+        server.profiler.sample_rate = self.sample_rate
+        server.profiler.clear()
+
+    def test_token(self):
+        """
+        Test admin routes are refused without the admin token
+        """
+        self.assertEqual(self.test_client.get("/admin/profile").status_code, 403)
+        self.assertEqual(self.test_client.get("/admin/profile", headers={'X-Admin-Token': 'wrong'}).status_code, 403)
+
+    def test_profile(self):
+        """
+        Test sampled requests are downloaded as collapsed stacks split by phase
+        """
+        headers = {'X-Admin-Token': 'secret'}
+        response = self.test_client.post("/admin/profile", data={'sample_rate': '1'}, headers=headers)
+        self.assertEqual(response.get_json()['sample_rate'], 1.0)
+        self.test_client.post("/showSummary", data={'email': "john@simplylift.co"})
+        server.profiler.sample_rate = 0
+        response = self.test_client.get("/admin/profile?reset=1", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        phases = {line.split(';', 1)[0] for line in response.get_data(as_text=True).splitlines()}
+        self.assertTrue({'lookup', 'render', 'request'} <= phases)
+        self.assertEqual(server.profiler.requests, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
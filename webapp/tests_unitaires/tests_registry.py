@@ -0,0 +1,135 @@
+import unittest
+from datetime import datetime
+from parameterized import parameterized
+from webapp.models import Club, Competition
+from webapp.registry import Registry
+
+
+CLUBS = [
+    {"name": "Simply Lift", "email": "john@simplylift.co", "points": "13"},
+    {"name": "Iron Temple", "email": "admin@irontemple.com", "points": "4"},
+]
+
+COMPETITIONS = [
+    {"name": "Spring Festival", "date": "2020-03-27 10:00:00", "numberOfPlaces": "25"},
+]
+
+
+class RegistryUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.registry = Registry([Club.from_record(c) for c in CLUBS],
+                                 [Competition.from_record(c) for c in COMPETITIONS])
+
+    def test_lookups(self):
+        """
+        Test lookups by club name, club email and competition name
+        """
+        self.assertEqual(self.registry.get_club_by_name("Iron Temple")['points'], 4)
+        self.assertEqual(self.registry.get_club_by_email("john@simplylift.co")['name'], "Simply Lift")
+        self.assertEqual(self.registry.get_competition_by_name("Spring Festival")['numberOfPlaces'], 25)
+
+    @parameterized.expand([
+        ("get_club_by_name", "Unknown"),
+        ("get_club_by_email", "john.doe@example.com"),
+        ("get_competition_by_name", "Fall"),
+    ])
+    def test_lookup_index_error(self, method, key):
+        """
+        Test that unknown keys raise IndexError like the former list scans
+        """
+        with self.assertRaises(IndexError):
+            getattr(self.registry, method)(key)
+
+    def test_update_club(self):
+        """
+        Test that renaming a club keeps the indexes in sync
+        """
+        club = self.registry.get_club_by_name("Iron Temple")
+        self.registry.update_club(club, name="Iron Temple II", email="iron@temple.com")
+        self.assertIs(self.registry.get_club_by_name("Iron Temple II"), club)
+        self.assertIs(self.registry.get_club_by_email("iron@temple.com"), club)
+        with self.assertRaises(IndexError):
+            self.registry.get_club_by_name("Iron Temple")
+        with self.assertRaises(IndexError):
+            self.registry.get_club_by_email("admin@irontemple.com")
+
+    def test_remove_club(self):
+        """
+        Test that a removed club leaves the lookups and the listings
+        """
+        club = self.registry.get_club_by_name("Iron Temple")
+        self.registry.remove_club(club)
+        with self.assertRaises(IndexError):
+            self.registry.get_club_by_email("admin@irontemple.com")
+        self.assertEqual([c['name'] for c in self.registry.clubs], ["Simply Lift"])
+        self.assertEqual([c['name'] for c in self.registry.clubs_page('points', 0, 10).items], ["Simply Lift"])
+
+    def test_snapshot(self):
+        """
+        Test a snapshot keeps the version and the standings it was taken at
+        """
+        snapshot = self.registry.snapshot()
+        club = self.registry.get_club_by_name("Iron Temple")
+        self.registry.update_club(club, points=20)
+        self.registry.bump_version()
+        self.assertEqual([(c['name'], c['points']) for c in snapshot.clubs_page('points', 0, 10, reverse=True)],
+                         [("Simply Lift", 13), ("Iron Temple", 4)])
+        latest = self.registry.snapshot()
+        self.assertGreater(latest.version, snapshot.version)
+        self.assertEqual([(c['name'], c['points']) for c in latest.clubs_page('points', 0, 10, reverse=True)],
+                         [("Iron Temple", 20), ("Simply Lift", 13)])
+
+
+class CalendarUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        competitions = [
+            Competition("Spring Festival", "2020-03-27 10:00:00", "25"),
+            Competition("Fall Classic 2021", "2021-12-22 13:30:00", "13"),
+            Competition("Spring Festival 2021", "2021-12-27 10:00:00", "25"),
+            Competition("Full", "2021-12-30 10:00:00", "0"),
+            Competition("Date Error 01", "05-12-2021 13:30:00", "13"),
+        ]
+        self.registry = Registry([Club.from_record(c) for c in CLUBS], competitions, now=datetime(2021, 12, 1))
+
+    def bookable(self, sort='date'):
+        return [competition['name'] for competition in self.registry.competitions_page(sort, 0, 10)]
+
+    def test_bookable(self):
+        """
+        Test only upcoming competitions with places left are listed
+        """
+        self.assertEqual(self.bookable(), ["Fall Classic 2021", "Spring Festival 2021"])
+        self.assertTrue(self.registry.is_archived(self.registry.get_competition_by_name("Spring Festival")))
+        self.assertFalse(self.registry.is_archived(self.registry.get_competition_by_name("Full")))
+
+    def test_archive_past_competitions(self):
+        """
+        Test competitions leave the listing as the clock moves
+        """
+        version = self.registry.version
+        self.registry.archive_past_competitions(datetime(2021, 12, 25))
+        self.assertEqual(self.bookable(), ["Spring Festival 2021"])
+        self.assertGreater(self.registry.version, version)
+        version = self.registry.version
+        self.registry.archive_past_competitions(datetime(2021, 12, 25, 1))
+        self.assertEqual(self.registry.version, version)
+        self.assertTrue(self.registry.is_archived(self.registry.get_competition_by_name("Fall Classic 2021")))
+        self.registry.archive_past_competitions(datetime(2021, 12, 31))
+        self.assertEqual(self.bookable('name'), [])
+        self.assertTrue(self.registry.is_archived(self.registry.get_competition_by_name("Full")))
+
+    def test_reindex_competition(self):
+        """
+        Test a competition without places left leaves the listing
+        """
+        competition = self.registry.get_competition_by_name("Fall Classic 2021")
+        self.registry.update_competition(competition, numberOfPlaces=0)
+        self.assertEqual(self.bookable(), ["Spring Festival 2021"])
+        self.registry.update_competition(competition, numberOfPlaces=3)
+        self.assertEqual(self.bookable(), ["Fall Classic 2021", "Spring Festival 2021"])
+
+
+if __name__ == "__main__":
+    unittest.main()
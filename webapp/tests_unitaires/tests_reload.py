@@ -0,0 +1,224 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from webapp import server
+from webapp.booking import BookingEngine
+from webapp.journal import BookingJournal
+from webapp.models import Club, Competition
+from webapp.registry import Registry
+from webapp.reload import DataReloader, ReadWriteLock, ReloadWatcher, diff_records
+from webapp.shared_state import SharedState
+
+
+CLUBS = [
+    {"name": "Simply Lift", "email": "john@simplylift.co", "points": "13"},
+    {"name": "Iron Temple", "email": "admin@irontemple.com", "points": "4"},
+]
+
+COMPETITIONS = [
+    {"name": "Spring Festival", "date": "2030-03-27 10:00:00", "numberOfPlaces": "25"},
+    {"name": "Fall Classic", "date": "2030-10-22 13:30:00", "numberOfPlaces": "13"},
+]
+
+
+class ReadWriteLockUnitTests(unittest.TestCase):
+
+    def test_writer_waits_for_readers(self):
+        """
+        Test a writer enters once the readers left, and readers wait for it
+        """
+        lock = ReadWriteLock()
+        events = []
+        lock.acquire_read()
+        lock.acquire_read()
+
+        def write():
+            lock.acquire_write()
+            events.append('write')
+            lock.release_write()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        time.sleep(0.05)
+        self.assertEqual(events, [])
+        lock.release_read()
+        lock.release_read()
+        writer.join(1)
+        self.assertEqual(events, ['write'])
+        lock.acquire_read()
+        lock.release_read()
+
+
+class DataReloaderUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.clubs_path = os.path.join(self.directory.name, 'clubs.json')
+        self.competitions_path = os.path.join(self.directory.name, 'competitions.json')
+        self.write_files(CLUBS, COMPETITIONS)
+        self.registry = Registry([Club.from_record(c) for c in CLUBS],
+                                 [Competition.from_record(c) for c in COMPETITIONS],
+                                 now=datetime(2021, 1, 1))
+        self.reloader = DataReloader(self.registry, self.clubs_path, self.competitions_path)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write_files(self, clubs, competitions):
+        with open(self.clubs_path, 'w') as clubs_file:
+            json.dump({'clubs': clubs}, clubs_file)
+        with open(self.competitions_path, 'w') as competitions_file:
+            json.dump({'competitions': competitions}, competitions_file)
+
+    def test_diff_records(self):
+        """
+        Test added and removed names and changed fields positions
+        """
+        previous = {'a': ('a', '1'), 'b': ('b', '2')}
+        current = {'b': ('b', '3'), 'c': ('c', '4')}
+        self.assertEqual(diff_records(previous, current), (['c'], ['a'], {'b': [1]}))
+
+    def test_reload(self):
+        """
+        Test only the added, removed and changed records are applied, in place
+        """
+        simply_lift = self.registry.get_club_by_name("Simply Lift")
+        spring = self.registry.get_competition_by_name("Spring Festival")
+        version = self.registry.version
+        clubs = [dict(CLUBS[0], email="contact@simplylift.co"),
+                 {"name": "She Lifts", "email": "kate@shelifts.co.uk", "points": "12"}]
+        competitions = [dict(COMPETITIONS[0], numberOfPlaces="30")]
+        self.write_files(clubs, competitions)
+        changes = self.reloader.reload()
+        self.assertEqual(changes, {'clubs': {'added': 1, 'removed': 1, 'changed': 1},
+                                   'competitions': {'added': 0, 'removed': 1, 'changed': 1}})
+        self.assertIs(self.registry.get_club_by_email("contact@simplylift.co"), simply_lift)
+        self.assertEqual(self.registry.get_club_by_name("She Lifts")['points'], 12)
+        self.assertIs(self.registry.get_competition_by_name("Spring Festival"), spring)
+        self.assertEqual(spring['numberOfPlaces'], 30)
+        with self.assertRaises(IndexError):
+            self.registry.get_club_by_name("Iron Temple")
+        self.assertEqual([c['name'] for c in self.registry.clubs_page('points', 0, 10).items],
+                         ["She Lifts", "Simply Lift"])
+        self.assertEqual([c['name'] for c in self.registry.competitions_page('date', 0, 10).items],
+                         ["Spring Festival"])
+        self.assertGreater(self.registry.version, version)
+
+    def test_bookings_kept(self):
+        """
+        Test points spent since the last read are kept when the file did not change them
+        """
+        club = self.registry.get_club_by_name("Simply Lift")
+        competition = self.registry.get_competition_by_name("Fall Classic")
+        BookingEngine(12).book(club, competition, 3)
+        self.write_files(CLUBS + [{"name": "She Lifts", "email": "kate@shelifts.co.uk", "points": "12"}],
+                         COMPETITIONS)
+        self.reloader.reload()
+        self.assertEqual(club['points'], 10)
+        self.assertEqual(competition['numberOfPlaces'], 10)
+
+    def load_registry(self):
+        with open(self.clubs_path) as clubs_file, open(self.competitions_path) as competitions_file:
+            return Registry([Club.from_record(c) for c in json.load(clubs_file)['clubs']],
+                            [Competition.from_record(c) for c in json.load(competitions_file)['competitions']],
+                            now=datetime(2021, 1, 1))
+
+    def test_journal_compacted(self):
+        """
+        Test a restart keeps the points changed by a reload instead of replaying the bookings made before it
+        """
+        journal_path = os.path.join(self.directory.name, 'bookings.journal')
+        journal = BookingJournal(journal_path, self.registry.state)
+        journal.replay(self.registry)
+        reloader = DataReloader(self.registry, self.clubs_path, self.competitions_path, journal=journal)
+        BookingEngine(12, journal=journal).book(self.registry.get_club_by_name("Simply Lift"),
+                                                self.registry.get_competition_by_name("Fall Classic"), 3)
+        self.write_files([dict(CLUBS[0], points="20"), CLUBS[1]], COMPETITIONS)
+        reloader.reload()
+        journal.close()
+        registry = self.load_registry()
+        BookingJournal(journal_path, registry.state).replay(registry)
+        self.assertEqual(registry.get_club_by_name("Simply Lift")['points'], 20)
+        self.assertEqual(registry.get_competition_by_name("Fall Classic")['numberOfPlaces'], 10)
+
+    def test_shared_state_published(self):
+        """
+        Test points changed by a reload are written to the shared state and pulled by the other workers
+        """
+        path = os.path.join(self.directory.name, 'shared_state.db')
+        workers = []
+        for registry in (self.registry, self.load_registry()):
+            shared_state = SharedState(path)
+            engine = BookingEngine(12, store=shared_state)
+            shared_state.initialize(registry, engine)
+            workers.append((registry, shared_state, engine))
+        reloader = DataReloader(self.registry, self.clubs_path, self.competitions_path,
+                                shared_state=workers[0][1], engine=workers[0][2])
+        self.write_files([dict(CLUBS[0], points="20"), CLUBS[1]], COMPETITIONS)
+        reloader.reload()
+        self.assertEqual(self.registry.get_club_by_name("Simply Lift")['points'], 20)
+        registry, shared_state, engine = workers[1]
+        shared_state.pull(registry, engine)
+        self.assertEqual(registry.get_club_by_name("Simply Lift")['points'], 20)
+
+    def test_invalid_file(self):
+        """
+        Test nothing is applied when a value of the files is not valid
+        """
+        self.write_files([dict(CLUBS[0], points="many"), CLUBS[1]], COMPETITIONS[:1])
+        with self.assertRaises(ValueError):
+            self.reloader.reload()
+        self.assertEqual(len(self.registry.competitions), 2)
+        self.assertEqual(self.registry.get_club_by_name("Simply Lift")['points'], 13)
+        self.write_files(CLUBS, [{"name": "Spring Festival"}])
+        with self.assertRaises(ValueError):
+            self.reloader.reload()
+
+    def test_watcher(self):
+        """
+        Test the watcher reloads the files once they are written
+        """
+        watcher = ReloadWatcher(self.reloader, 0.01)
+        watcher.start()
+        try:
+            self.write_files(CLUBS[:1], COMPETITIONS)
+            for _ in range(200):
+                if self.reloader.reloads:
+                    break
+                time.sleep(0.01)
+        finally:
+            watcher.stop()
+            watcher.join(1)
+        self.assertEqual(self.reloader.reloads, 1)
+        self.assertEqual(len(self.registry.clubs), 1)
+
+    def test_admin_reload(self):
+        """
+        Test the admin route reloads the files, and is refused without the token
+        """
+        reloader = server.reloader
+        server.reloader = self.reloader
+        server.app.config['ADMIN_TOKEN'] = 'secret'
+        try:
+            test_client = server.app.test_client()
+            self.assertEqual(test_client.post('/admin/reload').status_code, 403)
+            self.write_files(CLUBS[:1], COMPETITIONS)
+            response = test_client.post('/admin/reload', headers={'X-Admin-Token': 'secret'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['clubs']['removed'], 1)
+            self.assertEqual(test_client.get('/').status_code, 200)
+            self.write_files(CLUBS, [{"name": "Spring Festival"}])
+            response = test_client.post('/admin/reload', headers={'X-Admin-Token': 'secret'})
+            self.assertEqual(response.status_code, 400)
+        finally:
+            server.reloader = reloader
+            server.app.config['ADMIN_TOKEN'] = None
+        self.assertEqual(server.app.test_client().post('/admin/reload').status_code, 403)
+
+
+if __name__ == "__main__":
+    unittest.main()
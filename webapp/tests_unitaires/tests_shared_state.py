@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from webapp.booking import BookingEngine
+from webapp.ledger import BookingLedger
+from webapp.models import Club, Competition
+from webapp.registry import Registry
+from webapp.shared_state import PullWatcher, SharedState, changes_pulled
+
+
+def make_registry():
+    clubs = [Club("Simply Lift", "john@simplylift.co", "13"), Club("She Lifts", "kate@shelifts.co.uk", "12")]
+    competitions = [Competition("Spring Festival", "2030-03-27 10:00:00", "25")]
+    return Registry(clubs, competitions)
+
+
+def start_worker(path):
+    registry = make_registry()
+    shared_state = SharedState(path)
+    engine = BookingEngine(12, store=shared_state)
+    shared_state.initialize(registry, engine)
+    return registry, shared_state, engine
+
+
+def book_until_refused(path, club_name, results):
+    registry, shared_state, engine = start_worker(path)
+    booked = 0
+    while True:
+        shared_state.pull(registry, engine)
+        try:
+            engine.book(registry.get_club_by_name(club_name),
+                        registry.get_competition_by_name("Spring Festival"), 1)
+        except AssertionError:
+            break
+        booked += 1
+    results.put(booked)
+
+
+class SharedStateUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'shared_state.db')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_pull(self):
+        """
+        Test a booking made by a worker is seen by the others after a pull
+        """
+        registry_1, shared_state_1, engine_1 = start_worker(self.path)
+        registry_2, shared_state_2, engine_2 = start_worker(self.path)
+        engine_1.book(registry_1.get_club_by_name("Simply Lift"),
+                      registry_1.get_competition_by_name("Spring Festival"), 3)
+        version = registry_2.version
+        self.assertEqual(shared_state_2.pull(registry_2, engine_2), 2)
+        self.assertEqual(registry_2.get_club_by_name("Simply Lift")['points'], 10)
+        self.assertEqual(registry_2.get_competition_by_name("Spring Festival")['numberOfPlaces'], 22)
+        self.assertNotEqual(registry_2.version, version)
+        self.assertEqual(shared_state_2.pull(registry_2, engine_2), 0)
+
+    def test_version(self):
+        """
+        Test workers that applied the same shared changes have the same version, and only them
+        """
+        registry_1, shared_state_1, engine_1 = start_worker(self.path)
+        registry_2, shared_state_2, engine_2 = start_worker(self.path)
+        self.assertEqual(registry_1.version, registry_2.version)
+        engine_1.book(registry_1.get_club_by_name("Simply Lift"),
+                      registry_1.get_competition_by_name("Spring Festival"), 1)
+        engine_2.book(registry_2.get_club_by_name("Simply Lift"),
+                      registry_2.get_competition_by_name("Spring Festival"), 1)
+        engine_2.book(registry_2.get_club_by_name("She Lifts"),
+                      registry_2.get_competition_by_name("Spring Festival"), 1)
+        shared_state_2.pull(registry_2, engine_2)
+        self.assertNotEqual(registry_1.version, registry_2.version)
+        shared_state_1.pull(registry_1, engine_1)
+        self.assertEqual(registry_1.version, registry_2.version)
+        self.assertEqual(registry_1.state(), registry_2.state())
+
+    def test_changes_pulled(self):
+        """
+        Test a pull signals the last values booked by the other workers, not those of the worker itself
+        """
+        registry_1, shared_state_1, engine_1 = start_worker(self.path)
+        registry_2, shared_state_2, engine_2 = start_worker(self.path)
+        pulled = []
+        changes_pulled.connect(lambda sender, changes: pulled.append(changes), sender=shared_state_2, weak=False)
+        engine_1.book(registry_1.get_club_by_name("Simply Lift"),
+                      registry_1.get_competition_by_name("Spring Festival"), 1)
+        engine_1.book(registry_1.get_club_by_name("Simply Lift"),
+                      registry_1.get_competition_by_name("Spring Festival"), 2)
+        engine_2.book(registry_2.get_club_by_name("She Lifts"),
+                      registry_2.get_competition_by_name("Spring Festival"), 1)
+        shared_state_2.pull(registry_2, engine_2)
+        self.assertEqual(pulled, [[('club', "Simply Lift", 10)]])
+        shared_state_2.pull(registry_2, engine_2)
+        self.assertEqual(len(pulled), 1)
+
+    def test_pull_watcher(self):
+        """
+        Test a worker without requests applies the bookings of the others
+        """
+        registry_1, shared_state_1, engine_1 = start_worker(self.path)
+        registry_2, shared_state_2, engine_2 = start_worker(self.path)
+        watcher = PullWatcher(shared_state_2, registry_2, engine_2, 0.01)
+        watcher.start()
+        try:
+            engine_1.book(registry_1.get_club_by_name("Simply Lift"),
+                          registry_1.get_competition_by_name("Spring Festival"), 3)
+            deadline = time.monotonic() + 5
+            while registry_2.get_club_by_name("Simply Lift")['points'] != 10 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(registry_2.get_competition_by_name("Spring Festival")['numberOfPlaces'], 22)
+        finally:
+            watcher.stop()
+            watcher.join()
+
+    def test_ledger(self):
+        """
+        Test the places a club booked in a competition are bounded over the bookings of all the workers
+        """
+        workers = []
+        for _ in range(2):
+            registry = make_registry()
+            shared_state = SharedState(self.path)
+            engine = BookingEngine(12, store=shared_state, ledger=BookingLedger(pool=shared_state.pool))
+            shared_state.initialize(registry, engine)
+            workers.append((registry, engine))
+        (registry_1, engine_1), (registry_2, engine_2) = workers
+        engine_1.book(registry_1.get_club_by_name("Simply Lift"),
+                      registry_1.get_competition_by_name("Spring Festival"), 8)
+        with self.assertRaisesRegex(AssertionError, "greater than 4 : 8 of 12 already booked"):
+            engine_2.book(registry_2.get_club_by_name("Simply Lift"),
+                          registry_2.get_competition_by_name("Spring Festival"), 5)
+        self.assertEqual(engine_2.ledger.club_total("Simply Lift"), 8)
+
+    def test_stale_worker(self):
+        """
+        Test a worker checks a booking on the shared values, not on its own
+        """
+        registry_1, shared_state_1, engine_1 = start_worker(self.path)
+        registry_2, shared_state_2, engine_2 = start_worker(self.path)
+        engine_1.book(registry_1.get_club_by_name("Simply Lift"),
+                      registry_1.get_competition_by_name("Spring Festival"), 10)
+        club = registry_2.get_club_by_name("Simply Lift")
+        with self.assertRaisesRegex(AssertionError, "greater than club's points"):
+            engine_2.book(club, registry_2.get_competition_by_name("Spring Festival"), 5)
+        self.assertEqual(club['points'], 3)
+
+    def test_restart(self):
+        """
+        Test a worker started later loads the shared values
+        """
+        registry_1, shared_state_1, engine_1 = start_worker(self.path)
+        engine_1.book(registry_1.get_club_by_name("She Lifts"),
+                      registry_1.get_competition_by_name("Spring Festival"), 4)
+        registry_2, shared_state_2, engine_2 = start_worker(self.path)
+        self.assertEqual(registry_2.get_club_by_name("She Lifts")['points'], 8)
+        self.assertEqual(registry_2.get_competition_by_name("Spring Festival")['numberOfPlaces'], 21)
+
+    def test_no_oversell_across_processes(self):
+        """
+        Test concurrent worker processes never book more places than available
+        """
+        start_worker(self.path)
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=book_until_refused, args=(self.path, club_name, results))
+                   for club_name in ("Simply Lift", "She Lifts", "Simply Lift", "She Lifts")]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(60)
+        booked = sum(results.get(timeout=5) for _ in workers)
+        registry, shared_state, engine = start_worker(self.path)
+        self.assertEqual(booked, 25)
+        self.assertEqual(registry.get_competition_by_name("Spring Festival")['numberOfPlaces'], 0)
+        self.assertEqual(registry.get_club_by_name("Simply Lift")['points']
+                         + registry.get_club_by_name("She Lifts")['points'], 13 + 12 - 25)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from parameterized import parameterized
+from webapp.booking import BookingEngine, BookingError
+from webapp.sqlite_storage import SqliteRegistry
+
+
+CLUBS = [
+    {"name": "Simply Lift", "email": "john@simplylift.co", "points": "13"},
+    {"name": "Iron Temple", "email": "admin@irontemple.com", "points": "4"},
+    {"name": "She Lifts", "email": "kate@shelifts.co.uk", "points": "12"},
+]
+
+COMPETITIONS = [
+    {"name": "Spring Festival", "date": "2030-03-27 10:00:00", "numberOfPlaces": "25"},
+    {"name": "Fall Classic", "date": "2030-10-22 13:30:00", "numberOfPlaces": "13"},
+    {"name": "Past Classic", "date": "2020-10-22 13:30:00", "numberOfPlaces": "13"},
+    {"name": "Full Classic", "date": "2030-01-22 13:30:00", "numberOfPlaces": "0"},
+    {"name": "Date Error", "date": "05-12-2021 13:30:00", "numberOfPlaces": "13"},
+]
+
+
+class SqliteRegistryUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        clubs_path = os.path.join(self.directory.name, 'clubs.json')
+        competitions_path = os.path.join(self.directory.name, 'competitions.json')
+        with open(clubs_path, 'w') as clubs_file:
+            json.dump({'clubs': CLUBS}, clubs_file)
+        with open(competitions_path, 'w') as competitions_file:
+            json.dump({'competitions': COMPETITIONS}, competitions_file)
+        self.registry = SqliteRegistry(os.path.join(self.directory.name, 'gudlft.db'),
+                                       now=datetime(2025, 1, 1))
+        self.registry.import_json(clubs_path, competitions_path)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_import(self):
+        """
+        Test the records of the JSON files are imported
+        """
+        self.assertEqual(len(self.registry.clubs), 3)
+        self.assertEqual([competition['name'] for competition in self.registry.competitions],
+                         [competition['name'] for competition in COMPETITIONS])
+        self.assertEqual(self.registry.state()['clubs']['Iron Temple'], 4)
+
+    def test_lookups(self):
+        """
+        Test lookups by club name, club email and competition name
+        """
+        self.assertEqual(self.registry.get_club_by_name("Iron Temple")['points'], 4)
+        self.assertEqual(self.registry.get_club_by_email("john@simplylift.co")['name'], "Simply Lift")
+        competition = self.registry.get_competition_by_name("Date Error")
+        self.assertRaises(ValueError, competition.get_datetime)
+
+    @parameterized.expand([
+        ("get_club_by_name", "Unknown"),
+        ("get_club_by_email", "john.doe@example.com"),
+        ("get_competition_by_name", "Fall"),
+    ])
+    def test_lookup_index_error(self, method, key):
+        """
+        Test that unknown keys raise IndexError like the in-memory registry
+        """
+        self.assertRaises(IndexError, getattr(self.registry, method), key)
+
+    @parameterized.expand([
+        ('points', False, ["Iron Temple", "She Lifts", "Simply Lift"]),
+        ('points', True, ["Simply Lift", "She Lifts", "Iron Temple"]),
+        ('name', False, ["Iron Temple", "She Lifts", "Simply Lift"]),
+    ])
+    def test_clubs_page(self, sort, reverse, expected):
+        """
+        Test clubs are listed in the order asked
+        """
+        page = self.registry.clubs_page(sort, 0, 10, reverse)
+        self.assertEqual([club['name'] for club in page], expected)
+        self.assertEqual(page.total, 3)
+        self.assertEqual([club['name'] for club in self.registry.clubs_page(sort, 1, 1, reverse)], expected[1:2])
+
+    def test_competitions_page(self):
+        """
+        Test only bookable competitions are listed, and past ones drop out over time
+        """
+        page = self.registry.competitions_page('date', 0, 10)
+        self.assertEqual([competition['name'] for competition in page], ["Spring Festival", "Fall Classic"])
+        self.assertFalse(self.registry.is_archived(self.registry.get_competition_by_name("Spring Festival")))
+        version = self.registry.version
+        self.registry.archive_past_competitions(datetime(2030, 6, 1))
+        self.assertGreater(self.registry.version, version)
+        version = self.registry.version
+        self.registry.archive_past_competitions(datetime(2030, 6, 2))
+        self.assertEqual(self.registry.version, version)
+        page = self.registry.competitions_page('date', 0, 10)
+        self.assertEqual([competition['name'] for competition in page], ["Fall Classic"])
+        self.assertTrue(self.registry.is_archived(self.registry.get_competition_by_name("Spring Festival")))
+
+    def test_page_total_cached(self):
+        """
+        Test the total of a listing is counted once per version
+        """
+        self.assertEqual(self.registry.clubs_page('name', 0, 2).total, 3)
+        with self.registry.pool.connection() as connection:
+            connection.execute("INSERT INTO clubs (name, email, points) VALUES ('New Lift', 'new@lift.co', 1)")
+        self.assertEqual(self.registry.clubs_page('points', 0, 2).total, 3)
+        self.registry.bump_version()
+        self.assertEqual(self.registry.clubs_page('name', 0, 2).total, 4)
+        self.registry.remove_club(self.registry.get_club_by_name("New Lift"))
+        self.assertEqual(self.registry.clubs_page('name', 0, 2).total, 3)
+        total = self.registry.competitions_page('date', 0, 1).total
+        self.registry.update_competition(self.registry.get_competition_by_name("Full Classic"), numberOfPlaces=3)
+        self.assertEqual(self.registry.competitions_page('date', 0, 1).total, total + 1)
+
+    def test_booking(self):
+        """
+        Test a booking is stored and bumps the version
+        """
+        engine = BookingEngine(12, store=self.registry)
+        version = self.registry.version
+        engine.book(self.registry.get_club_by_name("Simply Lift"),
+                    self.registry.get_competition_by_name("Spring Festival"), 3)
+        self.registry.bump_version()
+        self.assertEqual(self.registry.get_club_by_name("Simply Lift")['points'], 10)
+        self.assertEqual(self.registry.get_competition_by_name("Spring Festival")['numberOfPlaces'], 22)
+        self.assertGreater(self.registry.version, version)
+
+    def test_booking_stale_record(self):
+        """
+        Test a booking is checked on the stored values, not on an older record
+        """
+        engine = BookingEngine(12, store=self.registry)
+        club = self.registry.get_club_by_name("Iron Temple")
+        engine.book(self.registry.get_club_by_name("Iron Temple"),
+                    self.registry.get_competition_by_name("Fall Classic"), 3)
+        with self.assertRaisesRegex(AssertionError, "greater than club's points"):
+            engine.book(club, self.registry.get_competition_by_name("Fall Classic"), 3)
+        self.assertEqual(self.registry.get_club_by_name("Iron Temple")['points'], 1)
+
+    def test_constraint_check(self):
+        """
+        Test the database refuses negative places even without the engine checks
+        """
+        club = self.registry.get_club_by_name("Simply Lift")
+        competition = self.registry.get_competition_by_name("Fall Classic")
+        with self.assertRaises(BookingError):
+            with self.registry.transaction():
+                self.registry.write(club, competition, 2)
+                self.registry.write(club, competition, 12)
+        self.assertEqual(self.registry.get_competition_by_name("Fall Classic")['numberOfPlaces'], 13)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+from jinja2 import FileSystemBytecodeCache
+from webapp import server
+from webapp.models import Club, Competition
+
+
+class TemplateWarmUpUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.environment = server.app.jinja_env
+        self.bytecode_cache = self.environment.bytecode_cache
+        self.environment.bytecode_cache = FileSystemBytecodeCache(self.directory.name)
+        self.environment.cache.clear()
+
+    def tearDown(self) -> None:
+        self.environment.bytecode_cache = self.bytecode_cache
+        self.environment.cache.clear()
+        server.warm_up()
+        self.directory.cleanup()
+
+    def test_warm_up(self):
+        """
+        Test every template is compiled into the bytecode cache at warm-up
+        """
+        names = server.warm_up()
+        self.assertTrue({'index.html', 'welcome.html', 'booking.html', 'display_points.html'} <= set(names))
+        self.assertEqual(len(os.listdir(self.directory.name)), len(names))
+        self.assertEqual(len(self.environment.cache), len(names))
+
+    def test_bytecode_cache(self):
+        """
+        Test a fresh worker loads the compiled templates instead of compiling them
+        """
+        server.warm_up()
+        self.environment.cache.clear()
+        compiled = []
+        compile_templates = self.environment.compile
+        self.environment.compile = lambda *args, **kwargs: compiled.append(args) or compile_templates(*args,
+                                                                                                      **kwargs)
+        try:
+            server.warm_up()
+        finally:
+            del self.environment.compile
+        self.assertEqual(compiled, [])
+
+
+class FragmentCacheUnitTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        server.fragment_cache.clear()
+        self.club = Club("Test Lift", "test@lift.co", "10")
+        self.competitions = [Competition(f"Test Festival {i}", "2030-03-27 10:00:00", "25") for i in range(3)]
+
+    def tearDown(self) -> None:
+        server.fragment_cache.clear()
+
+    def test_competition_rows(self):
+        """
+        Test each row is rendered once, then again only when its places change or for another club
+        """
+        with server.app.test_request_context():
+            rows = server.competition_rows(self.competitions, self.club)
+            misses = server.fragment_cache.misses
+            self.assertEqual(server.competition_rows(self.competitions, self.club), rows)
+            self.assertEqual(server.fragment_cache.misses, misses)
+            self.competitions[1]['numberOfPlaces'] = 24
+            rows = server.competition_rows(self.competitions, self.club)
+            self.assertEqual(server.fragment_cache.misses, misses + 1)
+            self.assertIn('<span data-competition-places="Test Festival 1">24</span>', rows)
+            self.assertIn('href="/book/Test%20Festival%202/Test%20Lift"', rows)
+            server.competition_rows(self.competitions, Club("Other Lift", "other@lift.co", "10"))
+            self.assertEqual(server.fragment_cache.misses, misses + 4)
+
+    def test_competition_rows_bookings(self):
+        """
+        Test the places booked by the club are read from the ledger once for all the rows
+        """
+        class CountingLedger:
+            reads = 0
+
+            def club_bookings(self, club):
+                self.reads += 1
+                return {"Test Festival 2": 3}
+
+        ledger, server.ledger = server.ledger, CountingLedger()
+        try:
+            with server.app.test_request_context():
+                rows = server.competition_rows(self.competitions, self.club)
+            self.assertEqual(server.ledger.reads, 1)
+            self.assertEqual(rows.count('Places booked'), 1)
+        finally:
+            server.ledger = ledger
+
+
+if __name__ == "__main__":
+    unittest.main()